@@ -1,30 +1,128 @@
 import os
 import json
+import time
+import hashlib
 import shutil
 import subprocess
 import sys
 import requests
 import zipfile
+import sqlite3
+import re
+import io
+import math
+import random
+import mmap
 import platform
+import traceback
 import configparser
 import webbrowser
+import argparse
+import tempfile
+import csv
+import statistics
+from contextlib import contextmanager
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime
-from threading import Thread
-from queue import Queue
-from urllib.parse import quote
+from threading import Thread, Lock, Event, local, main_thread, current_thread, active_count
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import multiprocessing
+from queue import Queue, Empty
+from collections import OrderedDict, deque
+from array import array
+from urllib.parse import quote, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10 及以下
+    tomllib = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QLineEdit, QComboBox, QProgressBar,
                              QTextEdit, QTabWidget, QFrame, QScrollArea, QGroupBox,
                              QFileDialog, QMessageBox, QTreeWidget, QTreeWidgetItem,
                              QSplitter, QSizePolicy, QDialog, QGridLayout, QListWidget,
-                             QListWidgetItem, QSlider, QCheckBox, QSpacerItem, QStackedWidget)
-from PyQt5.QtCore import Qt, QSize, QThread, pyqtSignal, QRect, QPropertyAnimation, QEasingCurve, QPoint
-from PyQt5.QtGui import QFont, QPalette, QColor, QPixmap, QIcon, QPainter, QPainterPath, QMovie, QBrush
+                             QListWidgetItem, QSlider, QCheckBox, QSpacerItem, QStackedWidget, QTreeView)
+from PyQt5.QtCore import (Qt, QSize, pyqtSignal, QRect, QPropertyAnimation, QEasingCurve, QPoint,
+                          QObject, QTimer, QAbstractTableModel, QModelIndex, QFileSystemWatcher)
+from PyQt5.QtGui import (QFont, QPalette, QColor, QPixmap, QIcon, QPainter, QPainterPath, QMovie, QBrush, QImage,
+                         QImageReader)
 from PyQt5 import QtGui
 
+# Modrinth API 地址
+MODRINTH_API = "https://api.modrinth.com/v2"
+
+# Minecraft 资源文件下载地址
+ASSETS_URL = "https://resources.download.minecraft.net"
+
+# Minecraft 库文件默认下载地址
+LIBRARIES_URL = "https://libraries.minecraft.net/"
+
+# Fabric 和 Quilt 元数据API地址
+FABRIC_META = "https://meta.fabricmc.net"
+QUILT_META = "https://meta.quiltmc.org"
+
+# Forge 和 NeoForge Maven仓库
+FORGE_MAVEN = "https://maven.minecraftforge.net"
+NEOFORGE_MAVEN = "https://maven.neoforged.net/releases"
+
+# CurseForge API 地址
+CURSEFORGE_API = "https://api.curseforge.com"
+
+# 网络请求使用的User-Agent
+USER_AGENT = "XHL-Minecraft-Launcher/2.0"
+
+# 启动器缓存目录
+CACHE_DIR = Path("launcher_cache")
+
+# 每页搜索结果数量
+SEARCH_PAGE_SIZE = 20
+
+# 多个搜索源共用的截止时间 (秒), 以及合并排名时的名次常数
+SEARCH_DEADLINE = 10
+SEARCH_RANK_CONSTANT = 60
+
+# 可选的模组搜索源
+MOD_SEARCH_APIS = ["全部", "Modrinth", "CurseForge", "本地目录"]
+
+# 下载源不可用时的替代地址 (BMCLAPI 镜像)
+MIRROR_ALTERNATES = {
+    "https://launchermeta.mojang.com": "https://bmclapi2.bangbang93.com",
+    "https://launcher.mojang.com": "https://bmclapi2.bangbang93.com",
+    "https://piston-meta.mojang.com": "https://bmclapi2.bangbang93.com",
+    "https://piston-data.mojang.com": "https://bmclapi2.bangbang93.com",
+    "https://resources.download.minecraft.net": "https://bmclapi2.bangbang93.com/assets",
+    "https://libraries.minecraft.net": "https://bmclapi2.bangbang93.com/maven",
+    "https://maven.minecraftforge.net": "https://bmclapi2.bangbang93.com/maven",
+    "https://meta.fabricmc.net": "https://bmclapi2.bangbang93.com/fabric-meta",
+}
+
+# 任务运行时各线程池的最大线程数
+TASK_POOLS = {"default": 4, "download": 3, "search": 4, "scan": 2, "launch": 4, "icons": 6}
+
+# 游戏输出中表示启动进度的标记: LWJGL已加载、渲染线程开始输出、窗口就绪 (声音引擎启动)
+LAUNCH_MARKERS = {
+    "lwjgl": ("Backend library: LWJGL", "LWJGL Version"),
+    "render_thread": ("[Render thread/", "[Client thread/"),
+    "ready": ("Sound engine started", "OpenAL initialized"),
+}
+
+# 本地监控接口 (Prometheus 文本格式) 的默认地址, 只监听本机
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9465
+
+# 主线程卡顿超过该时长 (秒) 时记录调用栈, 以及诊断日志位置
+STALL_THRESHOLD = 0.25
+DIAGNOSTICS_LOG = CACHE_DIR / 'diagnostics.log'
+
 # 自定义圆角按钮类
 class RoundedButton(QPushButton):
     def __init__(self, text, parent=None, radius=10, bg_color="#4A6FA5", text_color="#FFFFFF"):
@@ -158,510 +256,5241 @@ class LoadingLabel(QLabel):
         self.setStyleSheet("")
         self.clear()
 
-# 游戏下载模块
-class GameDownloadWidget(QWidget):
-    progress_signal = pyqtSignal(int, str)
-    log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, str)
+# 有界工作线程池 (守护线程按需创建, 空闲一段时间后退出, 不会阻止程序退出)
+class WorkerPool:
+    IDLE_TIMEOUT = 30
+    
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue = Queue()
+        self.lock = Lock()
+        self.workers = 0
+        self.idle = 0
     
-    def __init__(self, minecraft_dir, mirrors, current_mirror):
+    def submit(self, fn):
+        """排队执行, 没有空闲线程且未达到上限时创建新线程"""
+        with self.lock:
+            self.queue.put(fn)
+            if self.queue.qsize() > self.idle and self.workers < self.max_workers:
+                self.workers += 1
+                self.idle += 1
+                Thread(target=self.worker, name=f"{self.name}-worker-{self.workers}", daemon=True).start()
+    
+    def worker(self):
+        while True:
+            try:
+                fn = self.queue.get(timeout=self.IDLE_TIMEOUT)
+            except Empty:
+                with self.lock:
+                    if self.queue.empty():
+                        self.idle -= 1
+                        self.workers -= 1
+                        return
+                continue
+            
+            with self.lock:
+                self.idle -= 1
+            try:
+                fn()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self.lock:
+                    self.idle += 1
+
+# 后台任务基类 (在任务运行时的线程池中执行; 对象属于GUI线程, 运行中发出的信号自动排队到GUI线程)
+class BackgroundTask(QObject):
+    finished = pyqtSignal()
+    
+    # 使用的线程池, 以及退出时是否取消
+    pool = "default"
+    cancellable = True
+    
+    def __init__(self):
         super().__init__()
-        self.minecraft_dir = minecraft_dir
-        self.mirrors = mirrors
-        self.current_mirror = current_mirror
-        self.download_thread = None
-        self.init_ui()
+        self.stop_requested = False
+        self.state = "idle"
+        self.done_event = Event()
+        self.finished.connect(task_runtime.on_task_finished)
     
-    def init_ui(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(15)
-        
-        # 版本选择
-        version_layout = QHBoxLayout()
-        version_layout.addWidget(QLabel("选择版本:"))
-        self.version_combobox = TransparentComboBox()
-        version_layout.addWidget(self.version_combobox)
-        layout.addLayout(version_layout)
-        
-        # 按钮框架
-        btn_layout = QHBoxLayout()
-        self.download_btn = RoundedButton("下载选中版本", bg_color="#388E3C")
-        self.download_btn.clicked.connect(self.start_download_thread)
-        btn_layout.addWidget(self.download_btn)
-        
-        refresh_btn = RoundedButton("刷新列表", bg_color="#5A7FB5")
-        refresh_btn.clicked.connect(self.load_version_list)
-        btn_layout.addWidget(refresh_btn)
-        
-        layout.addLayout(btn_layout)
-        
-        # 进度条
-        self.progress = TransparentProgressBar()
-        layout.addWidget(self.progress)
-        
-        # 进度标签
-        self.progress_label = QLabel("就绪")
-        self.progress_label.setAlignment(Qt.AlignCenter)
-        self.progress_label.setStyleSheet("color: #666666;")
-        layout.addWidget(self.progress_label)
+    def start(self):
+        """提交到任务运行时"""
+        task_runtime.submit(self)
     
-    def load_version_list(self):
-        """加载版本列表"""
+    def cancel(self):
+        """请求取消, 任务在检查点自行结束"""
+        self.stop_requested = True
+    
+    def is_cancelled(self):
+        return self.stop_requested
+    
+    def isRunning(self):
+        """排队中或运行中"""
+        return self.state in ("queued", "running")
+    
+    def wait(self, timeout=None):
+        """等待任务结束 (秒), 返回是否已结束"""
+        return self.done_event.wait(timeout)
+    
+    def run(self):
+        raise NotImplementedError
+    
+    def execute(self):
+        """在工作线程中执行"""
+        self.state = "running"
         try:
-            # 获取版本列表
-            version_manifest_url = f"{self.mirrors[self.current_mirror]}/mc/game/version_manifest.json"
-            response = requests.get(version_manifest_url)
-            version_manifest = response.json()
-            versions = [v['id'] for v in version_manifest['versions']]
-            
-            # 过滤旧版本 (只显示1.7.10及以上)
-            filtered_versions = [v for v in versions if self.is_version_supported(v)]
-            
-            # 更新版本选择框
-            self.version_combobox.clear()
-            self.version_combobox.addItems(filtered_versions)
-            
-            if filtered_versions:
-                # 默认选择1.12.2
-                if "1.12.2" in filtered_versions:
-                    self.version_combobox.setCurrentText("1.12.2")
-                else:
-                    self.version_combobox.setCurrentIndex(0)
-                    
-        except Exception as e:
-            # 切换下载源
-            self.current_mirror = (self.current_mirror + 1) % len(self.mirrors)
-            self.log_signal.emit(f"错误: {str(e)}")
-            self.load_version_list()
+            self.run()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self.state = "finished"
+            self.done_event.set()
+            self.finished.emit()
+
+# 在任务运行时中执行普通函数, 结果或错误通过信号回到GUI线程
+class FunctionTask(BackgroundTask):
+    result_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
     
-    def is_version_supported(self, version_str):
-        """检查版本是否支持 (1.7.10及以上)"""
+    def __init__(self, fn, args, kwargs, pool="default"):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.pool = pool
+    
+    def run(self):
         try:
-            parts = version_str.split('.')
-            major = int(parts[0])
-            minor = int(parts[1]) if len(parts) > 1 else 0
-            patch = int(parts[2]) if len(parts) > 2 else 0
-            
-            # 支持1.7.10及以上版本
-            if major > 1:
-                return True
-            if major == 1 and minor > 7:
-                return True
-            if major == 1 and minor == 7 and patch >= 10:
-                return True
-            return False
-        except:
-            return False
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.stop_requested:
+                self.error_signal.emit(str(e))
+            return
+        if not self.stop_requested:
+            self.result_signal.emit(result)
+
+# 任务运行时 (按用途划分的有界线程池, 并跟踪运行中的任务以便统一取消)
+class TaskRuntime(QObject):
+    def __init__(self, pool_sizes=None):
+        super().__init__()
+        self.pools = {name: WorkerPool(name, size) for name, size in (pool_sizes or TASK_POOLS).items()}
+        self.active = set()
+        self.lock = Lock()
     
-    def start_download_thread(self):
-        """启动下载线程"""
-        selected_version = self.version_combobox.currentText()
-        if not selected_version:
-            self.log_signal.emit("请先选择一个版本！")
+    def get_pool(self, name):
+        return self.pools.get(name) or self.pools["default"]
+    
+    def submit(self, task):
+        """提交后台任务 (在GUI线程中调用), 排队或运行中的任务不会重复提交"""
+        if task.isRunning():
             return
-        
-        # 获取版本数据
-        try:
-            version_manifest_url = f"{self.mirrors[self.current_mirror]}/mc/game/version_manifest.json"
-            response = requests.get(version_manifest_url)
-            version_manifest = response.json()
-            
-            version_data = None
-            for v in version_manifest['versions']:
-                if v['id'] == selected_version:
-                    version_data = v
-                    break
-            
-            if not version_data:
-                self.log_signal.emit(f"找不到版本数据: {selected_version}")
+        task.state = "queued"
+        task.done_event.clear()
+        with self.lock:
+            self.active.add(task)
+        self.get_pool(task.pool).submit(task.execute)
+    
+    def call(self, fn, *args, on_result=None, on_error=None, pool="default", **kwargs):
+        """在线程池中执行函数, 回调在GUI线程中调用"""
+        task = FunctionTask(fn, args, kwargs, pool)
+        if on_result:
+            task.result_signal.connect(on_result)
+        if on_error:
+            task.error_signal.connect(on_error)
+        task.start()
+        return task
+    
+    def execute(self, pool, fn):
+        """在指定线程池中执行不需要跟踪的函数"""
+        self.get_pool(pool).submit(fn)
+    
+    def on_task_finished(self):
+        """任务结束 (GUI线程), 此前发出的信号都已处理, 可以释放引用"""
+        with self.lock:
+            self.active.discard(self.sender())
+    
+    def running_tasks(self):
+        with self.lock:
+            return [task for task in self.active if task.isRunning()]
+    
+    def shutdown(self, timeout=2):
+        """取消所有可取消的任务, 并等待它们结束"""
+        deadline = time.monotonic() + timeout
+        tasks = [task for task in self.running_tasks() if task.cancellable]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            task.wait(max(0, deadline - time.monotonic()))
+
+# 全局任务运行时
+task_runtime = TaskRuntime()
+
+# 线程本地的HTTP会话, 同一线程内复用连接
+http_local = local()
+
+def http_session():
+    """获取当前线程的HTTP会话"""
+    session = getattr(http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        http_local.session = session
+    return session
+
+# 追踪区间 (记录开始和结束时间)
+class TraceSpan:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+    
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+    
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+        return False
+    
+    def set(self, **args):
+        self.args.update(args)
+
+# 未启用追踪时使用的空区间
+class NullSpan:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **args):
+        pass
+
+NULL_SPAN = NullSpan()
+
+# 性能追踪, 导出为 Chrome Trace Event 格式 (可在 Perfetto 中查看); 未启用时只有一次属性判断
+class Tracer:
+    MAX_EVENTS = 500000
+    
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.events = []
+        self.threads = {}
+        self.dropped = 0
+        self.lock = Lock()
+        self.origin = time.perf_counter_ns()
+    
+    def enable(self, output=None):
+        self.output = output
+        self.enabled = True
+    
+    def span(self, name, category="launcher", **args):
+        """with 语句使用的追踪区间"""
+        if not self.enabled:
+            return NULL_SPAN
+        return TraceSpan(self, name, category, args)
+    
+    def complete(self, name, category, start, end, args=None):
+        """记录已结束的区间 (时间为 perf_counter_ns)"""
+        if self.enabled:
+            self.add({"name": name, "cat": category, "ph": "X", "ts": (start - self.origin) / 1000,
+                      "dur": (end - start) / 1000, "args": args or {}})
+    
+    def instant(self, name, category="launcher", **args):
+        """记录瞬时事件"""
+        if self.enabled:
+            self.add({"name": name, "cat": category, "ph": "i", "s": "t",
+                      "ts": (time.perf_counter_ns() - self.origin) / 1000, "args": args})
+    
+    def add(self, event):
+        thread = current_thread()
+        event['pid'] = os.getpid()
+        event['tid'] = thread.ident
+        with self.lock:
+            if len(self.events) >= self.MAX_EVENTS:
+                self.dropped += 1
                 return
-        except Exception as e:
-            self.log_signal.emit(f"获取版本数据失败: {str(e)}")
+            self.events.append(event)
+            self.threads.setdefault(thread.ident, thread.name)
+    
+    def export(self, path=None):
+        """写出追踪文件"""
+        path = path or self.output
+        if not self.enabled or not path:
             return
-        
-        # 创建并启动下载线程
-        self.download_thread = DownloadThread(
-            version_data, self.minecraft_dir, "", "Player", "2048"
-        )
-        self.download_thread.progress_signal.connect(self.on_download_progress)
-        self.download_thread.log_signal.connect(self.log_signal.emit)
-        self.download_thread.finished_signal.connect(self.on_download_finished)
-        
-        self.download_btn.setEnabled(False)
-        self.download_thread.start()
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+            dropped = self.dropped
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "XHL Minecraft Launcher"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in threads.items()]
+        data = {"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": {"dropped_events": dropped}}
+        try:
+            path = Path(path)
+            os.makedirs(path.parent, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+# 全局追踪器 (命令行 --trace 启用)
+tracer = Tracer()
+
+def format_metric(value):
+    """Prometheus 文本格式中的数值"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+# Prometheus 指标 (每种标签组合分别记录)
+class Metric:
+    kind = "untyped"
     
-    def on_download_progress(self, progress, message):
-        """下载进度更新"""
-        self.progress.setValue(progress)
-        self.progress_label.setText(message)
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = Lock()
     
-    def on_download_finished(self, success, message):
-        """下载完成"""
-        if success:
-            self.progress.setValue(100)
-            self.progress_label.setText("下载完成")
-            self.finished_signal.emit(True, message)
-        else:
-            self.progress_label.setText(f"下载失败: {message}")
-            self.finished_signal.emit(False, message)
-        
-        self.download_btn.setEnabled(True)
+    def key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+    
+    def label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+    
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+    
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{self.label_text(key)} {format_metric(value)}" for key, value in items]
 
-# 工作线程类
-class DownloadThread(QThread):
-    progress_signal = pyqtSignal(int, str)
-    log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, str)
+class CounterMetric(Metric):
+    kind = "counter"
     
-    def __init__(self, version_data, minecraft_dir, java_path, username, memory):
-        super().__init__()
-        self.version_data = version_data
-        self.minecraft_dir = minecraft_dir
-        self.java_path = java_path
-        self.username = username
-        self.memory = memory
-        self.stop_requested = False
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+# 仪表; 指定 callback 时在读取时计算 (返回数值, 或 标签元组->数值 的字典, None 表示没有数据)
+class GaugeMetric(Metric):
+    kind = "gauge"
     
-    def run(self):
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+    
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+    
+    def samples(self):
+        if self.callback is None:
+            return super().samples()
         try:
-            version_id = self.version_data['id']
-            self.log_signal.emit(f"开始下载版本: {version_id}")
-            
-            # 创建版本目录
-            version_dir = self.minecraft_dir / 'versions' / version_id
-            os.makedirs(version_dir, exist_ok=True)
-            
-            # 下载版本JSON文件
-            json_url = self.version_data['url']
-            self.log_signal.emit(f"下载版本清单: {json_url}")
-            self.progress_signal.emit(10, "下载版本清单")
-            
-            response = requests.get(json_url)
-            version_json = response.json()
-            
-            # 保存版本JSON
-            json_path = version_dir / f"{version_id}.json"
-            with open(json_path, 'w') as f:
-                json.dump(version_json, f, indent=2)
-            
-            # 下载客户端JAR文件
-            client_jar_url = version_json['downloads']['client']['url']
-            client_jar_path = version_dir / f"{version_id}.jar"
-            
-            self.log_signal.emit(f"下载客户端: {client_jar_url}")
-            self.progress_signal.emit(30, "下载客户端")
-            
-            self.download_file(client_jar_url, client_jar_path)
-            
-            # 下载资源文件
-            self.progress_signal.emit(50, "下载资源文件")
-            assets_index_url = version_json['assetIndex']['url']
-            assets_index_path = self.minecraft_dir / 'assets' / 'indexes' / f"{version_json['assetIndex']['id']}.json"
-            
-            os.makedirs(assets_index_path.parent, exist_ok=True)
-            
-            self.download_file(assets_index_url, assets_index_path)
-            
-            # 下载库文件
-            self.progress_signal.emit(70, "下载库文件")
-            libraries_dir = self.minecraft_dir / 'libraries'
-            os.makedirs(libraries_dir, exist_ok=True)
-            
-            total_libs = len(version_json['libraries'])
-            for i, lib in enumerate(version_json['libraries']):
-                if self.stop_requested:
-                    break
-                    
-                # 检查库规则（如操作系统限制）
-                if 'rules' in lib:
-                    allow = False
-                    for rule in lib['rules']:
-                        if rule['action'] == 'allow':
-                            if 'os' in rule:
-                                if rule['os']['name'] == platform.system().lower():
-                                    allow = True
-                                else:
-                                    allow = False
-                            else:
-                                allow = True
-                        elif rule['action'] == 'disallow':
-                            if 'os' in rule and rule['os']['name'] == platform.system().lower():
-                                allow = False
-                    
-                    if not allow:
-                        continue
-                
-                # 下载库文件
-                lib_path = None
-                if 'downloads' in lib and 'artifact' in lib['downloads']:
-                    lib_url = lib['downloads']['artifact']['url']
-                    lib_path = libraries_dir / lib['downloads']['artifact']['path']
-                elif 'url' in lib:
-                    # 旧版本格式
-                    base_url = lib['url']
-                    lib_name = lib['name']
-                    group_id, artifact_id, version = lib_name.split(':')
-                    lib_path = libraries_dir / group_id.replace('.', '/') / artifact_id / version / f"{artifact_id}-{version}.jar"
-                    lib_url = f"{base_url}{group_id.replace('.', '/')}/{artifact_id}/{version}/{artifact_id}-{version}.jar"
-                
-                if lib_path and lib_url:
-                    os.makedirs(lib_path.parent, exist_ok=True)
-                    if not lib_path.exists():
-                        self.log_signal.emit(f"下载库: {lib_path.name}")
-                        self.download_file(lib_url, lib_path)
-                
-                # 更新进度
-                progress = 70 + int(30 * (i + 1) / total_libs)
-                self.progress_signal.emit(progress, f"下载库文件 ({i+1}/{total_libs})")
-            
-            if not self.stop_requested:
-                self.progress_signal.emit(100, "下载完成")
-                self.log_signal.emit("版本下载完成")
-                self.finished_signal.emit(True, "")
-            else:
-                self.finished_signal.emit(False, "下载被取消")
-                
-        except Exception as e:
-            self.log_signal.emit(f"下载错误: {str(e)}")
-            self.finished_signal.emit(False, str(e))
+            values = self.callback()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{self.label_text(key)} {format_metric(value)}" for key, value in sorted(values.items())]
+
+class HistogramMetric(Metric):
+    kind = "histogram"
     
-    def download_file(self, url, path):
-        """下载文件并显示进度"""
-        response = requests.get(url, stream=True)
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(path, 'wb') as f:
-            downloaded = 0
-            for data in response.iter_content(chunk_size=4096):
-                if self.stop_requested:
-                    raise Exception("下载被取消")
-                
-                downloaded += len(data)
-                f.write(data)
-                
-                # 计算进度百分比
-                if total_size > 0:
-                    progress = int(downloaded / total_size * 100)
-                    self.progress_signal.emit(progress, f"下载 {path.name}")
+    def __init__(self, name, help_text, buckets, labels=()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+    
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self.label_text(key, [('le', format_metric(bound))])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self.label_text(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{self.label_text(key)} {format_metric(round(total, 6))}")
+            lines.append(f"{self.name}_count{self.label_text(key)} {count}")
+        return lines
 
-# 启动线程类
-class LaunchThread(QThread):
-    log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, str)
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+    
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self):
+        """所有指标的 Prometheus 文本格式"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def resident_memory_bytes():
+    """当前进程的常驻内存; 没有 /proc 时使用峰值"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    peak = peak_rss_mb()
+    return None if peak is None else int(peak * 1024 * 1024)
+
+# 全局指标
+metrics = MetricsRegistry()
+process_started = time.time()
+download_bytes_metric = metrics.add(CounterMetric(
+    "launcher_download_bytes_total", "下载的字节数", ("host",)))
+download_files_metric = metrics.add(CounterMetric(
+    "launcher_download_files_total", "下载完成的文件数", ("host",)))
+download_failures_metric = metrics.add(CounterMetric(
+    "launcher_download_failures_total", "下载失败的文件数", ("host", "reason")))
+download_seconds_metric = metrics.add(HistogramMetric(
+    "launcher_download_file_seconds", "单个文件的下载耗时", (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60), ("host",)))
+download_throughput_metric = metrics.add(HistogramMetric(
+    "launcher_download_throughput_bytes_per_second", "每批下载的平均速度",
+    (1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)))
+http_requests_metric = metrics.add(CounterMetric(
+    "launcher_http_requests_total", "HTTP请求数 (按主机和状态码, 网络错误为 error)", ("host", "code")))
+launches_metric = metrics.add(CounterMetric(
+    "launcher_launches_total", "启动次数 (started 为已启动游戏进程, failed 为启动前出错)", ("result",)))
+game_exits_metric = metrics.add(CounterMetric(
+    "launcher_game_exits_total", "游戏进程退出次数 (按退出码)", ("code",)))
+launch_seconds_metric = metrics.add(HistogramMetric(
+    "launcher_launch_seconds", "从点击启动到窗口就绪的时间", (1, 2, 5, 10, 20, 30, 60, 120)))
+game_session_metric = metrics.add(HistogramMetric(
+    "launcher_game_session_seconds", "游戏进程运行时间", (60, 300, 900, 1800, 3600, 7200, 14400)))
+metrics.add(GaugeMetric(
+    "launcher_circuit_open", "下载源熔断状态 (1 为熔断中)", ("host",),
+    lambda: {(host,): int(breaker.is_open()) for host, breaker in list(circuit_breakers.items())}))
+metrics.add(GaugeMetric("launcher_resident_memory_bytes", "常驻内存", callback=resident_memory_bytes))
+metrics.add(GaugeMetric("launcher_cpu_seconds", "进程使用的CPU时间", callback=time.process_time))
+metrics.add(GaugeMetric("launcher_threads", "线程数", callback=active_count))
+metrics.add(GaugeMetric("launcher_running_tasks", "运行中的后台任务数",
+                        callback=lambda: len(task_runtime.running_tasks())))
+metrics.add(GaugeMetric("launcher_uptime_seconds", "启动器运行时间",
+                        callback=lambda: round(time.time() - process_started, 3)))
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+# 本地监控接口
+class MetricsServer:
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self.server = None
+    
+    def start(self):
+        """开始监听, 端口被占用时抛出 OSError"""
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.1},
+               name="metrics-server", daemon=True).start()
+    
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+# 重试策略 (有限次数, 带随机抖动的指数退避)
+class RetryPolicy:
+    # 可以重试的HTTP状态码
+    RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+    
+    def __init__(self, attempts=4, base_delay=0.5, max_delay=8, timeout=15):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+    
+    def retryable(self, error):
+        """连接失败、超时、传输中断以及服务器暂时性错误可以重试"""
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in self.RETRYABLE_STATUS
+        return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+    
+    def delay(self, attempt, retry_after=None):
+        """第 attempt 次重试前的等待时间 (全抖动), 服务器要求的等待时间优先"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+    
+    def sleep(self, attempt, error=None, is_cancelled=None):
+        """等待后重试, 期间可以被取消"""
+        retry_after = None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get('Retry-After', ''))
+            except ValueError:
+                pass
+        delay = self.delay(attempt, retry_after)
+        with tracer.span("backoff", "http", attempt=attempt, delay=round(delay, 3)):
+            self.wait(delay, is_cancelled)
+    
+    def wait(self, seconds, is_cancelled=None):
+        """可取消的等待"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if is_cancelled and is_cancelled():
+                raise Exception("请求被取消")
+            time.sleep(min(0.1, max(0, deadline - time.monotonic())))
+
+# 重试预算 (重试次数不超过请求数的一定比例, 避免故障时重试风暴)
+class RetryBudget:
+    def __init__(self, ratio=0.2, min_per_second=2, max_tokens=100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens / 2
+        self.updated = time.monotonic()
+        self.lock = Lock()
+    
+    def refill(self, amount):
+        self.tokens = min(self.max_tokens, self.tokens + amount)
+    
+    def deposit(self):
+        """每个请求存入一部分重试额度"""
+        with self.lock:
+            self.refill(self.ratio)
+    
+    def withdraw(self):
+        """取出一次重试额度, 额度不足时不再重试"""
+        with self.lock:
+            now = time.monotonic()
+            self.refill((now - self.updated) * self.min_per_second)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+# 熔断器打开时的错误
+class CircuitOpenError(Exception):
+    pass
+
+# 熔断器 (每个主机一个; 最近请求的失败率过高时暂停请求, 冷却后放行一个探测请求)
+class CircuitBreaker:
+    def __init__(self, host, window=20, min_requests=10, failure_rate=0.8, reset_timeout=15):
+        self.host = host
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.probing = False
+        self.lock = Lock()
+    
+    def allow(self):
+        """是否允许请求; 冷却结束后只放行一个探测请求"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.probing:
+                return False
+            self.probing = True
+            return True
+    
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+    
+    def retry_after(self):
+        """距离下次允许请求的秒数 (探测进行中时稍后再看)"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            return remaining if remaining > 0 else 1.0
+    
+    def record_success(self):
+        with self.lock:
+            self.outcomes.append(False)
+            if self.opened_at is not None:
+                # 探测成功, 恢复请求
+                self.opened_at = None
+                self.probing = False
+                self.outcomes.clear()
+    
+    def record_failure(self):
+        with self.lock:
+            self.outcomes.append(True)
+            failures = sum(self.outcomes)
+            if self.probing or (len(self.outcomes) >= self.min_requests and
+                                failures >= self.failure_rate * len(self.outcomes)):
+                self.opened_at = time.monotonic()
+                self.probing = False
+                self.outcomes.clear()
+
+# 所有网络请求共用的熔断器和重试预算
+circuit_breakers = {}
+circuit_breakers_lock = Lock()
+retry_budget = RetryBudget()
+
+# 下载时等待熔断恢复的最长时间 (秒)
+CIRCUIT_WAIT = 60
+
+# 默认、搜索和图标请求的重试策略
+DEFAULT_RETRY = RetryPolicy()
+SEARCH_RETRY = RetryPolicy(attempts=2, max_delay=2, timeout=10)
+ICON_RETRY = RetryPolicy(attempts=1, timeout=10)
+
+def url_origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def circuit_breaker(url):
+    """URL所在主机的熔断器"""
+    origin = url_origin(url)
+    with circuit_breakers_lock:
+        breaker = circuit_breakers.get(origin)
+        if breaker is None:
+            breaker = circuit_breakers[origin] = CircuitBreaker(origin)
+        return breaker
+
+def route_url(url):
+    """主机的熔断器打开时改用替代地址, 都不可用时抛出 CircuitOpenError"""
+    breaker = circuit_breaker(url)
+    if breaker.allow():
+        return url, breaker
+    
+    origin = url_origin(url)
+    alternate = MIRROR_ALTERNATES.get(origin)
+    if alternate:
+        alternate_url = alternate + url[len(origin):]
+        alternate_breaker = circuit_breaker(alternate_url)
+        if alternate_breaker.allow():
+            return alternate_url, alternate_breaker
+    raise CircuitOpenError(f"{origin} 暂时不可用, {math.ceil(breaker.retry_after())} 秒后重试")
+
+def http_request(method, url, policy=None, retry=True, is_cancelled=None, **kwargs):
+    """带重试、退避和熔断的HTTP请求, 返回状态码正常的响应"""
+    policy = policy or DEFAULT_RETRY
+    kwargs.setdefault('timeout', policy.timeout)
+    attempt = 0
+    while True:
+        target, breaker = route_url(url)
+        host = urlsplit(target).netloc
+        retry_budget.deposit()
+        try:
+            # 流式下载时这里只等到响应头, 即连接、TLS和服务器处理的时间; 未启用追踪时不构造区间名称
+            span = tracer.span(f"{method} {host}", "http", url=target, attempt=attempt) if tracer.enabled else NULL_SPAN
+            with span:
+                response = http_session().request(method, target, **kwargs)
+                span.set(status=response.status_code)
+            http_requests_metric.inc(host=host, code=response.status_code)
+            try:
+                response.raise_for_status()
+            except requests.HTTPError:
+                response.close()
+                raise
+            breaker.record_success()
+            return response
+        except requests.RequestException as e:
+            if getattr(e, 'response', None) is None:
+                http_requests_metric.inc(host=host, code="error")
+            if not policy.retryable(e):
+                # 服务器正常响应了客户端错误
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            attempt += 1
+            if not retry or attempt >= policy.attempts or not retry_budget.withdraw():
+                raise
+            policy.sleep(attempt, e, is_cancelled)
+
+def file_hash(path, algorithm='sha1'):
+    """计算文件哈希 (通过mmap读取, 避免逐块复制)"""
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+    return hasher.hexdigest()
+
+def hash_file_worker(args):
+    """进程池中计算文件哈希"""
+    path, algorithm = args
+    try:
+        return path, file_hash(path, algorithm)
+    except OSError:
+        return path, None
+
+# 文件哈希缓存 (按路径、大小和修改时间判断文件是否变化)
+class FileHashCache:
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.entries = {}
+        self.lock = Lock()
+        self.dirty = False
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    def get(self, path, stat, algorithm='sha1'):
+        """文件未变化时返回缓存的哈希"""
+        with self.lock:
+            entry = self.entries.get(str(path))
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2].get(algorithm)
+        return None
+    
+    def put(self, path, stat, algorithm, digest):
+        """记录文件哈希"""
+        with self.lock:
+            entry = self.entries.get(str(path))
+            if not entry or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+                entry = [stat.st_size, stat.st_mtime_ns, {}]
+                self.entries[str(path)] = entry
+            entry[2][algorithm] = digest
+            self.dirty = True
+    
+    def save(self):
+        """写回磁盘"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.entries)
+            self.dirty = False
+        try:
+            os.makedirs(self.cache_file.parent, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+    
+    def hash_files(self, paths, algorithm='sha1', progress_callback=None):
+        """批量计算哈希, 未变化的文件使用缓存, 其余在进程池中计算"""
+        results = {}
+        uncached = []
+        stats = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats[str(path)] = stat
+            digest = self.get(path, stat, algorithm)
+            if digest:
+                results[str(path)] = digest
+            else:
+                uncached.append(str(path))
+        
+        done = len(results)
+        total = len(stats)
+        if progress_callback:
+            progress_callback(done, total)
+        
+        if len(uncached) >= 16:
+            # 文件较多时使用进程池, 避免受GIL限制; 使用spawn避免在多线程进程中fork
+            workers = min(os.cpu_count() or 2, 8)
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                hashed = executor.map(hash_file_worker, [(p, algorithm) for p in uncached],
+                                      chunksize=max(1, len(uncached) // (workers * 4)))
+                for path, digest in hashed:
+                    done += 1
+                    if digest:
+                        results[path] = digest
+                        self.put(path, stats[path], algorithm, digest)
+                    if progress_callback:
+                        progress_callback(done, total)
+        else:
+            for path in uncached:
+                done += 1
+                path, digest = hash_file_worker((path, algorithm))
+                if digest:
+                    results[path] = digest
+                    self.put(path, stats[path], algorithm, digest)
+                if progress_callback:
+                    progress_callback(done, total)
+        
+        self.save()
+        return results
+
+# 全局文件哈希缓存
+file_hash_cache = FileHashCache(CACHE_DIR / 'file_hashes.json')
+
+# 文件下载任务
+class DownloadTask:
+    def __init__(self, url, path, sha1=None, sha512=None, size=None):
+        self.url = url
+        self.path = Path(path)
+        self.sha1 = sha1
+        self.sha512 = sha512
+        self.size = size
+        # 实际接收的字节数 (断点续传只计新下载的部分, 包括失败重试时接收的数据)
+        self.received = 0
+    
+    def is_valid(self):
+        """目标文件已存在且校验通过 (未变化的文件使用哈希缓存)"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        if self.size is not None and stat.st_size != self.size:
+            return False
+        
+        for algorithm in ('sha1', 'sha512'):
+            expected = getattr(self, algorithm)
+            if not expected:
+                continue
+            digest = file_hash_cache.get(self.path, stat, algorithm)
+            if digest is None:
+                digest = file_hash(self.path, algorithm)
+                file_hash_cache.put(self.path, stat, algorithm, digest)
+            return digest == expected
+        return True
+    
+    def download(self, is_cancelled=None, policy=None):
+        """下载文件, 连接失败或传输中断时按重试策略重新下载; 下载源熔断时等待其恢复"""
+        policy = policy or DEFAULT_RETRY
+        attempt = 0
+        circuit_deadline = time.monotonic() + CIRCUIT_WAIT
+        while True:
+            if is_cancelled and is_cancelled():
+                raise Exception("下载被取消")
+            try:
+                return self.download_once(is_cancelled, policy)
+            except CircuitOpenError:
+                # 短暂的整体故障: 等待探测请求的结果, 不计入重试次数
+                remaining = circuit_deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                policy.wait(min(circuit_breaker(self.url).retry_after(), remaining), is_cancelled)
+            except requests.RequestException as e:
+                attempt += 1
+                if not policy.retryable(e) or attempt >= policy.attempts or not retry_budget.withdraw():
+                    raise
+                policy.sleep(attempt, e, is_cancelled)
+    
+    def download_once(self, is_cancelled=None, policy=None):
+        """下载到临时文件, 校验哈希后替换目标文件"""
+        with tracer.span("download", "download", file=self.path.name, url=self.url):
+            self.fetch(is_cancelled, policy)
+    
+    def fetch(self, is_cancelled=None, policy=None):
+        started = time.perf_counter()
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.part')
+        
+        hashers = {}
+        if self.sha1:
+            hashers['sha1'] = hashlib.sha1()
+        if self.sha512:
+            hashers['sha512'] = hashlib.sha512()
+        
+        # 上次中断留下的临时文件, 从断点继续下载
+        offset = 0
+        if self.size and tmp_path.exists():
+            offset = tmp_path.stat().st_size
+            if offset >= self.size:
+                os.remove(tmp_path)
+                offset = 0
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        
+        with http_request('GET', self.url, policy, retry=False, stream=True, timeout=30, headers=headers) as response:
+            mode = 'wb'
+            if offset and response.status_code == 206:
+                # 已下载的部分也要计入哈希
+                with open(tmp_path, 'rb') as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b''):
+                        for hasher in hashers.values():
+                            hasher.update(block)
+                mode = 'ab'
+            # 传输时间中写入磁盘的部分单独统计
+            transfer_start = time.perf_counter_ns()
+            write_time = 0
+            received = 0
+            with open(tmp_path, mode) as f:
+                try:
+                    for data in response.iter_content(chunk_size=64 * 1024):
+                        if is_cancelled and is_cancelled():
+                            raise Exception("下载被取消")
+                        write_start = time.perf_counter_ns()
+                        f.write(data)
+                        write_time += time.perf_counter_ns() - write_start
+                        received += len(data)
+                        for hasher in hashers.values():
+                            hasher.update(data)
+                except requests.RequestException:
+                    # 传输中断也计入该主机的失败次数
+                    circuit_breaker(response.url).record_failure()
+                    raise
+                finally:
+                    host = urlsplit(response.url).netloc
+                    download_bytes_metric.inc(received, host=host)
+                    self.received += received
+                    tracer.complete("transfer", "download", transfer_start, time.perf_counter_ns(),
+                                    {"bytes": received, "resumed_from": offset if mode == 'ab' else 0,
+                                     "write_ms": round(write_time / 1e6, 3)})
+        
+        with tracer.span("verify", "download"):
+            for algorithm, hasher in hashers.items():
+                expected = getattr(self, algorithm)
+                if hasher.hexdigest() != expected:
+                    os.remove(tmp_path)
+                    raise Exception(f"{self.path.name} 校验失败 ({algorithm})")
+            
+            os.replace(tmp_path, self.path)
+            
+            # 记录刚校验过的哈希, 下次检查时无需重新计算
+            stat = self.path.stat()
+            for algorithm, hasher in hashers.items():
+                file_hash_cache.put(self.path, stat, algorithm, hasher.hexdigest())
+        
+        download_files_metric.inc(host=host)
+        download_seconds_metric.observe(time.perf_counter() - started, host=host)
+
+def failure_reason(error):
+    """监控指标中的下载失败原因"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return f"http_{response.status_code}"
+    if isinstance(error, requests.RequestException):
+        return "network"
+    return "other"
+
+# 并行下载器
+class ParallelDownloader:
+    def __init__(self, max_workers=8, progress_callback=None, is_cancelled=None):
+        self.max_workers = max_workers
+        self.progress_callback = progress_callback
+        self.is_cancelled = is_cancelled
+    
+    def run(self, tasks):
+        """并行下载所有任务, 返回失败的 (任务, 错误信息) 列表"""
+        failures = []
+        if not tasks:
+            return failures
+        
+        # 下载源持续不可用时停止其余下载
+        aborted = Event()
+        def is_cancelled():
+            return aborted.is_set() or bool(self.is_cancelled and self.is_cancelled())
+        
+        started = time.perf_counter()
+        received_before = sum(task.received for task in tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(task.download, is_cancelled): task for task in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                task = futures[future]
+                try:
+                    future.result()
+                except CircuitOpenError as e:
+                    aborted.set()
+                    failures.append((task, str(e)))
+                    download_failures_metric.inc(host=urlsplit(task.url).netloc, reason=failure_reason(e))
+                except Exception as e:
+                    failures.append((task, str(e)))
+                    download_failures_metric.inc(host=urlsplit(task.url).netloc, reason=failure_reason(e))
+                
+                if self.progress_callback:
+                    self.progress_callback(done, len(tasks), task)
+        
+        # 本批下载的平均速度
+        elapsed = time.perf_counter() - started
+        transferred = sum(task.received for task in tasks) - received_before
+        if elapsed > 0 and transferred:
+            download_throughput_metric.observe(transferred / elapsed)
+        
+        file_hash_cache.save()
+        return failures
+
+def os_name():
+    """版本JSON规则中使用的系统名称"""
+    system = platform.system().lower()
+    return "osx" if system == "darwin" else system
+
+# 架构名称的别名
+ARCH_ALIASES = {"amd64": "x86_64", "x64": "x86_64", "aarch64": "arm64"}
+
+def os_arch():
+    """版本JSON规则中使用的系统架构 (32位Python视为 x86)"""
+    if sys.maxsize <= 2 ** 32:
+        return "x86"
+    machine = platform.machine().lower()
+    return ARCH_ALIASES.get(machine, machine)
+
+def os_version():
+    """与Java的 os.version 对应的系统版本号"""
+    system = platform.system()
+    if system == "Darwin":
+        return platform.mac_ver()[0]
+    if system == "Windows":
+        return platform.version()
+    return platform.release()
+
+def os_rule_matches(rule_os):
+    """规则中的系统条件: 只比较出现的名称、架构和版本 (正则)"""
+    if 'name' in rule_os and rule_os['name'] != os_name():
+        return False
+    if 'arch' in rule_os:
+        if ARCH_ALIASES.get(rule_os['arch'], rule_os['arch']) != os_arch():
+            return False
+    if 'version' in rule_os:
+        try:
+            return re.search(rule_os['version'], os_version()) is not None
+        except re.error:
+            return False
+    return True
+
+def library_allowed(lib):
+    """按库规则判断当前系统是否需要该库"""
+    return rules_allow(lib.get('rules'))
+
+def rules_allow(rules):
+    """判断规则列表是否允许当前系统 (最后一条匹配的规则生效)"""
+    if not rules:
+        return True
+    
+    allow = False
+    for rule in rules:
+        if 'os' in rule and not os_rule_matches(rule['os']):
+            continue
+        # 依赖启动器特性的规则 (如演示模式) 不适用
+        if 'features' in rule:
+            continue
+        allow = rule['action'] == 'allow'
+    return allow
+
+# Maven坐标 (组:名称:版本[:分类器][@扩展名])
+class MavenCoordinate:
+    def __init__(self, group_id, artifact_id, version, classifier=None, extension="jar"):
+        self.group_id = group_id
+        self.artifact_id = artifact_id
+        self.version = version
+        self.classifier = classifier
+        self.extension = extension
+    
+    @classmethod
+    def parse(cls, coordinate):
+        text, _, extension = coordinate.strip().partition('@')
+        parts = text.split(':')
+        if not 3 <= len(parts) <= 4 or not all(parts):
+            raise ValueError(f"无效的Maven坐标: {coordinate}")
+        return cls(parts[0], parts[1], parts[2], parts[3] if len(parts) > 3 else None, extension or "jar")
+    
+    @classmethod
+    def from_path(cls, path):
+        """从仓库中的相对路径推断坐标"""
+        parts = path.replace('\\', '/').split('/')
+        if len(parts) < 4:
+            raise ValueError(f"无法识别的库路径: {path}")
+        artifact_id, version, filename = parts[-3:]
+        stem, dot, extension = filename.rpartition('.')
+        prefix = f"{artifact_id}-{version}"
+        if not dot or not (stem == prefix or stem.startswith(prefix + '-')):
+            raise ValueError(f"无法识别的库路径: {path}")
+        return cls('.'.join(parts[:-3]), artifact_id, version, stem[len(prefix) + 1:] or None, extension)
+    
+    def key(self):
+        """不含版本的标识 (组:名称[:分类器]), 同一个库的不同版本相同"""
+        return ':'.join(filter(None, [self.group_id, self.artifact_id, self.classifier]))
+    
+    def path(self):
+        """在Maven仓库中的相对路径"""
+        classifier = f"-{self.classifier}" if self.classifier else ""
+        return (f"{self.group_id.replace('.', '/')}/{self.artifact_id}/{self.version}/"
+                f"{self.artifact_id}-{self.version}{classifier}.{self.extension}")
+    
+    def __str__(self):
+        text = f"{self.group_id}:{self.artifact_id}:{self.version}"
+        if self.classifier:
+            text += f":{self.classifier}"
+        return text if self.extension == "jar" else f"{text}@{self.extension}"
+
+def maven_path(coordinate):
+    """Maven坐标对应的相对路径"""
+    return MavenCoordinate.parse(coordinate).path()
+
+def library_coordinate(lib):
+    """库的Maven坐标; 只有下载路径的库从路径推断, 无法识别时返回 None"""
+    try:
+        if 'name' in lib:
+            return MavenCoordinate.parse(lib['name'])
+        path = lib.get('downloads', {}).get('artifact', {}).get('path')
+        if path:
+            return MavenCoordinate.from_path(path)
+    except ValueError:
+        pass
+    return None
+
+def resolve_libraries(libraries):
+    """同一个库 (组:名称[:分类器]) 只保留版本最新的一个, 放在该库首次出现的位置; 返回 (保留的库, 被替换的库)"""
+    # 加载器和原版JSON合并时已优先保留加载器的库, 这里处理同一个JSON中重复列出的库
+    chosen = {}
+    order = []
+    superseded = []
+    for lib in libraries:
+        coordinate = library_coordinate(lib)
+        if coordinate is None:
+            order.append(lib)
+            continue
+        # 旧版本的natives库与同名的普通库分开
+        key = coordinate.key() + (":natives" if 'natives' in lib else "")
+        current = chosen.get(key)
+        if current is None:
+            chosen[key] = [lib, coordinate]
+            order.append(key)
+        elif version_sort_key(coordinate.version) > version_sort_key(current[1].version):
+            superseded.append(current[0])
+            chosen[key] = [lib, coordinate]
+        else:
+            superseded.append(lib)
+    return [chosen[item][0] if isinstance(item, str) else item for item in order], superseded
+
+def library_tasks(lib, libraries_dir):
+    """库文件以及当前系统natives的下载任务"""
+    tasks = []
+    downloads = lib.get('downloads', {})
+    artifact = downloads.get('artifact')
+    if artifact and artifact.get('path'):
+        tasks.append(DownloadTask(artifact.get('url'), libraries_dir / artifact['path'],
+                                  artifact.get('sha1'), size=artifact.get('size')))
+    elif not downloads and 'name' in lib:
+        # 旧版本格式, 只有Maven坐标
+        relative = maven_path(lib['name'])
+        base_url = lib.get('url') or LIBRARIES_URL
+        tasks.append(DownloadTask(base_url.rstrip('/') + '/' + relative, libraries_dir / relative,
+                                  lib.get('sha1'), size=lib.get('size')))
+    
+    classifier = native_classifier(lib)
+    if classifier:
+        native = downloads.get('classifiers', {}).get(classifier)
+        if native:
+            tasks.append(DownloadTask(native.get('url'), libraries_dir / native['path'],
+                                      native.get('sha1'), size=native.get('size')))
+    return tasks
+
+def native_classifier(lib):
+    """库在当前系统上的natives分类器, 没有时返回 None"""
+    classifier = lib.get('natives', {}).get(os_name())
+    if classifier:
+        return classifier.replace('${arch}', '64' if sys.maxsize > 2 ** 32 else '32')
+    return None
+
+def extract_natives(version_json, libraries_dir, natives_dir):
+    """把旧版本natives库中的本地库解压到natives目录, 已解压且大小一致的文件跳过; 返回解压的文件数"""
+    extracted = 0
+    for lib in version_json.get('libraries', []):
+        classifier = native_classifier(lib)
+        if not classifier or not library_allowed(lib):
+            continue
+        native = lib.get('downloads', {}).get('classifiers', {}).get(classifier)
+        if native:
+            jar_path = libraries_dir / native['path']
+        elif 'name' in lib:
+            jar_path = libraries_dir / maven_path(f"{lib['name']}:{classifier}")
+        else:
+            continue
+        if not jar_path.exists():
+            continue
+        
+        exclude = lib.get('extract', {}).get('exclude', [])
+        with zipfile.ZipFile(jar_path) as jar:
+            for info in jar.infolist():
+                name = info.filename
+                if info.is_dir() or any(name.startswith(prefix) for prefix in exclude):
+                    continue
+                try:
+                    target = safe_join(natives_dir, name)
+                except Exception:
+                    # 跳过绝对路径或跳出natives目录的条目
+                    continue
+                if target.exists() and target.stat().st_size == info.file_size:
+                    continue
+                os.makedirs(target.parent, exist_ok=True)
+                with jar.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                extracted += 1
+    return extracted
+
+def version_file_tasks(minecraft_dir, version_json):
+    """版本需要的客户端、库文件、natives和资源索引"""
+    tasks = []
+    version_id = version_json['id']
+    
+    client = version_json.get('downloads', {}).get('client')
+    if client:
+        client_path = minecraft_dir / 'versions' / version_id / f"{version_id}.jar"
+        tasks.append(DownloadTask(client['url'], client_path, client.get('sha1'), size=client.get('size')))
+    
+    libraries, _ = resolve_libraries([lib for lib in version_json.get('libraries', []) if library_allowed(lib)])
+    for lib in libraries:
+        tasks.extend(library_tasks(lib, minecraft_dir / 'libraries'))
+    
+    asset_index = version_json.get('assetIndex')
+    if asset_index:
+        index_path = minecraft_dir / 'assets' / 'indexes' / f"{asset_index['id']}.json"
+        tasks.append(DownloadTask(asset_index['url'], index_path, asset_index.get('sha1'), size=asset_index.get('size')))
+    return tasks
+
+def asset_object_tasks(minecraft_dir, index_path):
+    """资源索引中列出的资源对象"""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    
+    objects_dir = minecraft_dir / 'assets' / 'objects'
+    tasks = []
+    for asset in index.get('objects', {}).values():
+        digest = asset['hash']
+        tasks.append(DownloadTask(f"{ASSETS_URL}/{digest[:2]}/{digest}", objects_dir / digest[:2] / digest,
+                                  digest, size=asset.get('size')))
+    return tasks
+
+def asset_layout_dir(minecraft_dir, index_id, index):
+    """旧版资源索引要求按名称存放资源的目录, 不需要时返回 None"""
+    if index.get('map_to_resources'):
+        return minecraft_dir / 'resources'
+    if index.get('virtual'):
+        return minecraft_dir / 'assets' / 'virtual' / index_id
+    return None
+
+def link_or_copy(source, target, use_link=True):
+    """用硬链接放置文件, 不支持硬链接时复制; 返回是否为硬链接"""
+    tmp_path = target.with_name(target.name + '.tmp')
+    if use_link:
+        try:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            os.link(source, tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except OSError:
+            pass
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+    return False
+
+# 旧版资源布局 (virtual / map_to_resources): 用硬链接把资源对象按名称放到目录中, 只更新变化的条目
+class AssetLayout:
+    MANIFEST = '.launcher_assets.json'
+    
+    def __init__(self, minecraft_dir, index_path):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.index_path = Path(index_path)
+    
+    def is_current(self, source, target, mode, size):
+        """已放置的文件是否仍然有效: 硬链接必须指向同一个资源对象, 复制的文件比较大小"""
+        try:
+            target_stat = os.stat(target)
+        except OSError:
+            return False
+        if mode == "link":
+            try:
+                return os.path.samestat(target_stat, os.stat(source))
+            except OSError:
+                # 资源对象已被清理, 链接的内容仍然可用
+                return size is None or target_stat.st_size == size
+        return size is None or target_stat.st_size == size
+    
+    def build(self):
+        """建立或更新资源布局, 返回 (目录, 统计); 索引不需要布局时返回 (None, None)"""
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        root = asset_layout_dir(self.minecraft_dir, self.index_path.stem, index)
+        if root is None:
+            return None, None
+        
+        manifest_path = root / self.MANIFEST
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        
+        objects_dir = self.minecraft_dir / 'assets' / 'objects'
+        objects = index.get('objects', {})
+        manifest = {}
+        stats = {"linked": 0, "copied": 0, "unchanged": 0, "missing": 0, "removed": 0}
+        use_link = True
+        for name, asset in objects.items():
+            if Path(name).is_absolute() or '..' in Path(name).parts:
+                continue
+            digest = asset['hash']
+            source = objects_dir / digest[:2] / digest
+            target = root / name
+            entry = previous.get(name)
+            if entry and entry[0] == digest and self.is_current(source, target, entry[1], asset.get('size')):
+                manifest[name] = entry
+                stats["unchanged"] += 1
+                continue
+            if not source.exists():
+                stats["missing"] += 1
+                continue
+            
+            os.makedirs(target.parent, exist_ok=True)
+            linked = link_or_copy(source, target, use_link)
+            # 同一文件系统上一次链接失败, 其余文件直接复制
+            use_link = linked
+            manifest[name] = [digest, "link" if linked else "copy"]
+            stats["linked" if linked else "copied"] += 1
+        
+        # 删除索引中已不存在的条目
+        for name in previous.keys() - objects.keys():
+            try:
+                os.remove(root / name)
+                stats["removed"] += 1
+            except OSError:
+                pass
+        
+        if manifest != previous:
+            os.makedirs(root, exist_ok=True)
+            tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, manifest_path)
+        return root, stats
+
+# 游戏文件完整性检查 (先比较大小, 再查哈希缓存, 最后在进程池中计算SHA-1)
+class GameFileVerifier:
+    def __init__(self, minecraft_dir, hash_cache=None):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.hash_cache = hash_cache or file_hash_cache
+    
+    def installed_versions(self):
+        """已安装的版本 (有版本JSON的目录)"""
+        versions_dir = self.minecraft_dir / 'versions'
+        if not versions_dir.exists():
+            return []
+        return sorted(d.name for d in versions_dir.iterdir() if (d / f"{d.name}.json").exists())
+    
+    def load_version(self, version_id):
+        """读取版本JSON"""
+        with open(self.minecraft_dir / 'versions' / version_id / f"{version_id}.json", 'r', encoding='utf-8') as f:
+            version_json = json.load(f)
+        version_json.setdefault('id', version_id)
+        return version_json
+    
+    def collect(self, version_ids):
+        """收集版本 (以及其继承的版本) 的文件, 返回 (按路径去重的任务, 资源索引路径)"""
+        tasks = {}
+        index_paths = set()
+        pending = list(version_ids)
+        seen = set()
+        while pending:
+            version_id = pending.pop()
+            if version_id in seen:
+                continue
+            seen.add(version_id)
+            
+            version_json = self.load_version(version_id)
+            if version_json.get('inheritsFrom'):
+                pending.append(version_json['inheritsFrom'])
+            for task in version_file_tasks(self.minecraft_dir, version_json):
+                tasks.setdefault(str(task.path), task)
+            if version_json.get('assetIndex'):
+                index_paths.add(self.minecraft_dir / 'assets' / 'indexes' / f"{version_json['assetIndex']['id']}.json")
+        return list(tasks.values()), sorted(index_paths)
+    
+    def collect_assets(self, index_paths):
+        """收集资源对象 (按路径去重), 以及无法读取的资源索引"""
+        tasks = {}
+        unreadable = []
+        for index_path in index_paths:
+            try:
+                for task in asset_object_tasks(self.minecraft_dir, index_path):
+                    tasks.setdefault(str(task.path), task)
+            except (OSError, ValueError, KeyError):
+                unreadable.append(index_path)
+        return list(tasks.values()), unreadable
+    
+    def verify(self, tasks, progress_callback=None):
+        """返回缺失或损坏的文件"""
+        broken = []
+        to_hash = []
+        for task in tasks:
+            # 第一层: 文件是否存在, 大小是否一致
+            try:
+                size = os.stat(task.path).st_size
+            except OSError:
+                broken.append(task)
+                continue
+            if task.size is not None and size != task.size:
+                broken.append(task)
+            elif task.sha1:
+                to_hash.append(task)
+        
+        # 第二层: 未变化的文件使用哈希缓存; 第三层: 其余文件在进程池中计算SHA-1
+        digests = self.hash_cache.hash_files([task.path for task in to_hash], 'sha1', progress_callback)
+        for task in to_hash:
+            if digests.get(str(task.path)) != task.sha1:
+                broken.append(task)
+        return broken
+
+# 游戏文件检查和修复线程
+class GameRepairThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "scan"
+    
+    def __init__(self, minecraft_dir, version_ids=None, repair=True):
+        super().__init__()
+        self.minecraft_dir = Path(minecraft_dir)
+        self.version_ids = version_ids
+        self.repair = repair
+    
+    def run(self):
+        try:
+            verifier = GameFileVerifier(self.minecraft_dir)
+            version_ids = self.version_ids or verifier.installed_versions()
+            if not version_ids:
+                self.finished_signal.emit(True, "没有已安装的版本")
+                return
+            
+            # 检查客户端、库文件和资源索引
+            self.progress_signal.emit(0, "检查版本文件")
+            tasks, index_paths = verifier.collect(version_ids)
+            broken = verifier.verify(tasks, lambda done, total: self.progress_signal.emit(
+                int(20 * done / max(total, 1)), f"检查版本文件 ({done}/{total})"))
+            checked = len(tasks)
+            repaired = 0
+            failures = []
+            
+            # 资源索引需要先修复, 才能列出资源对象
+            broken_indexes = [task for task in broken if task.path in index_paths]
+            if self.repair and broken_indexes:
+                self.log_signal.emit(f"修复 {len(broken_indexes)} 个资源索引")
+                index_failures = ParallelDownloader(is_cancelled=lambda: self.stop_requested).run(broken_indexes)
+                repaired += len(broken_indexes) - len(index_failures)
+                failures.extend(index_failures)
+                broken = [task for task in broken if task not in broken_indexes]
+            
+            # 检查资源对象
+            self.progress_signal.emit(20, "检查资源文件")
+            asset_tasks, unreadable = verifier.collect_assets(index_paths)
+            for index_path in unreadable:
+                self.log_signal.emit(f"无法读取资源索引: {index_path.name}")
+            broken += verifier.verify(asset_tasks, lambda done, total: self.progress_signal.emit(
+                20 + int(50 * done / max(total, 1)), f"检查资源文件 ({done}/{total})"))
+            checked += len(asset_tasks)
+            
+            for task in broken[:50]:
+                self.log_signal.emit(f"文件缺失或损坏: {task.path}")
+            if len(broken) > 50:
+                self.log_signal.emit(f"... 以及另外 {len(broken) - 50} 个文件")
+            
+            if self.stop_requested:
+                self.finished_signal.emit(False, "检查被取消")
+                return
+            if not self.repair:
+                self.progress_signal.emit(100, "检查完成")
+                self.finished_signal.emit(True, f"检查了 {checked} 个文件, {len(broken)} 个缺失或损坏")
+                return
+            
+            # 只重新下载有问题的文件
+            downloader = ParallelDownloader(
+                progress_callback=lambda done, total, task: self.progress_signal.emit(
+                    70 + int(30 * done / total), f"修复文件 ({done}/{total})"),
+                is_cancelled=lambda: self.stop_requested
+            )
+            repair_failures = downloader.run([task for task in broken if task.url])
+            repair_failures.extend((task, "没有下载地址") for task in broken if not task.url)
+            repaired += len(broken) - len(repair_failures)
+            failures.extend(repair_failures)
+            for task, error in failures:
+                self.log_signal.emit(f"修复失败: {task.path.name}: {error}")
+            
+            self.progress_signal.emit(100, "修复完成")
+            message = f"检查了 {checked} 个文件, 修复 {repaired} 个"
+            if failures:
+                message += f", {len(failures)} 个修复失败"
+            self.finished_signal.emit(not failures, message)
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
+# 磁盘占用分析和未引用文件清理 (标记-清除, 文件列表保存在SQLite中而不是内存中)
+class DiskUsageAnalyzer:
+    # 参与清理的目录 (相对于 .minecraft)
+    MANAGED_DIRS = ("libraries", "assets/objects", "assets/indexes")
+    # 最近修改的文件可能正在下载, 不清理
+    MIN_AGE = 600
+    # 未记录处理器输出的 Forge/NeoForge 版本, 其处理器可能写入的目录整体不清理
+    LOADER_GROUPS = ("net.minecraftforge", "net.neoforged")
+    PROCESSOR_OUTPUT_DIRS = ("libraries/net/minecraft/client/", "libraries/net/minecraftforge/",
+                             "libraries/net/neoforged/")
+    
+    def __init__(self, minecraft_dir, db_path):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.db_path = Path(db_path)
+        self.errors = []
+    
+    def connect(self):
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS refs (path TEXT, owner TEXT, PRIMARY KEY (path, owner)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS owners (version TEXT, owner TEXT, PRIMARY KEY (version, owner)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS marked (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS protected (prefix TEXT PRIMARY KEY) WITHOUT ROWID;
+        """)
+        return conn
+    
+    def relative(self, path):
+        """相对于 .minecraft 的路径 (统一使用 / 分隔)"""
+        return os.path.relpath(path, self.minecraft_dir).replace(os.sep, '/')
+    
+    def mark(self, conn):
+        """标记阶段: 从所有版本JSON和资源索引建立引用集合"""
+        conn.execute("DELETE FROM refs")
+        conn.execute("DELETE FROM owners")
+        conn.execute("DELETE FROM protected")
+        self.errors = []
+        verifier = GameFileVerifier(self.minecraft_dir)
+        indexes = set()
+        direct_owners = {}
+        parents = {}
+        
+        for version_id in verifier.installed_versions():
+            try:
+                version_json = verifier.load_version(version_id)
+            except (OSError, ValueError) as e:
+                self.errors.append(f"无法读取版本 {version_id}: {str(e)}")
+                continue
+            
+            owner = f"version:{version_id}"
+            conn.executemany("INSERT OR IGNORE INTO refs (path, owner) VALUES (?, ?)",
+                             ((self.relative(task.path), owner)
+                              for task in version_file_tasks(self.minecraft_dir, version_json)))
+            if 'processorOutputs' in version_json:
+                conn.executemany("INSERT OR IGNORE INTO refs (path, owner) VALUES (?, ?)",
+                                 ((f"libraries/{path}", owner) for path in version_json['processorOutputs']))
+            elif self.has_processors(version_json):
+                conn.executemany("INSERT OR IGNORE INTO protected (prefix) VALUES (?)",
+                                 ((prefix,) for prefix in self.PROCESSOR_OUTPUT_DIRS))
+            direct_owners[version_id] = [owner]
+            parents[version_id] = version_json.get('inheritsFrom')
+            
+            asset_index = version_json.get('assetIndex', {}).get('id')
+            if asset_index:
+                direct_owners[version_id].append(f"assets:{asset_index}")
+                indexes.add(asset_index)
+        
+        # 版本的文件包括其继承链上所有版本的文件
+        for version_id in direct_owners:
+            current = version_id
+            seen = set()
+            while current and current not in seen:
+                seen.add(current)
+                conn.executemany("INSERT OR IGNORE INTO owners (version, owner) VALUES (?, ?)",
+                                 ((version_id, owner) for owner in direct_owners.get(current, [])))
+                current = parents.get(current)
+        
+        # 同一个资源索引只展开一次
+        for asset_index in sorted(indexes):
+            index_path = self.minecraft_dir / 'assets' / 'indexes' / f"{asset_index}.json"
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    objects = json.load(f).get('objects', {})
+            except OSError:
+                # 资源索引缺失时其资源对象尚未下载, 无需保护
+                continue
+            except ValueError as e:
+                self.errors.append(f"无法读取资源索引 {asset_index}: {str(e)}")
+                continue
+            owner = f"assets:{asset_index}"
+            conn.executemany("INSERT OR IGNORE INTO refs (path, owner) VALUES (?, ?)",
+                             ((f"assets/objects/{asset['hash'][:2]}/{asset['hash']}", owner)
+                              for asset in objects.values()))
+            del objects
+        conn.commit()
+    
+    def has_processors(self, version_json):
+        """是否为安装时可能运行过处理器的加载器版本"""
+        return any(lib.get('name', '').split(':', 1)[0] in self.LOADER_GROUPS
+                   for lib in version_json.get('libraries', []))
+    
+    def walk(self):
+        """逐个产生受管理目录中的文件 (相对路径, 大小, 修改时间)"""
+        for managed in self.MANAGED_DIRS:
+            pending = [self.minecraft_dir / managed]
+            while pending:
+                try:
+                    entries = os.scandir(pending.pop())
+                except OSError:
+                    continue
+                with entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            yield self.relative(entry.path), stat.st_size, stat.st_mtime_ns
+    
+    def scan(self, conn, progress_callback=None):
+        """扫描受管理目录中的文件, 分批写入数据库"""
+        conn.execute("DELETE FROM files")
+        batch = []
+        count = 0
+        for row in self.walk():
+            batch.append(row)
+            if len(batch) >= 5000:
+                conn.executemany("INSERT OR REPLACE INTO files (path, size, mtime) VALUES (?, ?, ?)", batch)
+                count += len(batch)
+                batch = []
+                if progress_callback:
+                    progress_callback(count)
+        conn.executemany("INSERT OR REPLACE INTO files (path, size, mtime) VALUES (?, ?, ?)", batch)
+        conn.commit()
+    
+    def analyze(self, progress_callback=None):
+        """统计每个版本的占用和未引用文件, 并记录待清理文件"""
+        conn = self.connect()
+        try:
+            self.mark(conn)
+            self.scan(conn, progress_callback)
+            
+            # 版本引用的文件总大小, 以及只被该版本引用的文件大小
+            conn.execute("DROP TABLE IF EXISTS temp.version_files")
+            conn.execute("""CREATE TEMP TABLE version_files AS
+                            SELECT DISTINCT o.version AS version, r.path AS path
+                            FROM refs r JOIN owners o ON o.owner = r.owner""")
+            conn.execute("CREATE INDEX temp.version_files_path ON version_files (path)")
+            versions = {}
+            for version, total in conn.execute("""SELECT v.version, SUM(f.size) FROM version_files v
+                                                  JOIN files f ON f.path = v.path GROUP BY v.version"""):
+                versions[version] = {"size": total or 0, "exclusive": 0}
+            for version, exclusive in conn.execute("""SELECT v.version, SUM(f.size) FROM version_files v
+                                                      JOIN files f ON f.path = v.path
+                                                      WHERE v.path IN (SELECT path FROM version_files
+                                                                       GROUP BY path HAVING COUNT(*) = 1)
+                                                      GROUP BY v.version"""):
+                versions.setdefault(version, {"size": 0, "exclusive": 0})["exclusive"] = exclusive or 0
+            
+            # 标记未被引用的文件, 清理时再次确认
+            conn.execute("DELETE FROM marked")
+            conn.execute("""INSERT INTO marked (path, size, mtime)
+                            SELECT path, size, mtime FROM files
+                            WHERE NOT EXISTS (SELECT 1 FROM refs WHERE refs.path = files.path)
+                            AND NOT EXISTS (SELECT 1 FROM protected
+                                            WHERE substr(files.path, 1, length(protected.prefix)) = protected.prefix)""")
+            orphan_count, orphan_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM marked").fetchone()
+            total_count, total_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            conn.commit()
+            
+            return {
+                "versions": versions,
+                "total_count": total_count,
+                "total_size": total_size,
+                "orphan_count": orphan_count,
+                "orphan_size": orphan_size,
+                "errors": list(self.errors)
+            }
+        finally:
+            conn.close()
+    
+    def sweep(self, progress_callback=None):
+        """清除阶段: 重新标记引用后, 删除仍未被引用且未被修改的文件, 返回 (数量, 大小)"""
+        conn = self.connect()
+        try:
+            # 分析之后可能安装了新版本
+            self.mark(conn)
+            if self.errors:
+                raise Exception("部分版本文件无法读取, 为避免误删已停止清理: " + "; ".join(self.errors[:3]))
+            
+            deadline = time.time_ns() - self.MIN_AGE * 1000000000
+            cursor = conn.execute("""SELECT path, size, mtime FROM marked
+                                     WHERE NOT EXISTS (SELECT 1 FROM refs WHERE refs.path = marked.path)
+                                     AND NOT EXISTS (SELECT 1 FROM protected
+                                                     WHERE substr(marked.path, 1, length(protected.prefix)) = protected.prefix)""")
+            removed = 0
+            removed_size = 0
+            parents = set()
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for path, size, mtime in rows:
+                    full_path = self.minecraft_dir / path
+                    try:
+                        stat = os.stat(full_path)
+                    except OSError:
+                        continue
+                    if stat.st_size != size or stat.st_mtime_ns != mtime or stat.st_mtime_ns > deadline:
+                        continue
+                    try:
+                        os.remove(full_path)
+                    except OSError:
+                        continue
+                    removed += 1
+                    removed_size += size
+                    parents.add(full_path.parent)
+                if progress_callback:
+                    progress_callback(removed)
+            conn.execute("DELETE FROM marked")
+            conn.commit()
+            
+            # 删除清理后留下的空目录
+            for directory in sorted(parents, key=lambda path: len(path.parts), reverse=True):
+                while directory != self.minecraft_dir and directory.name not in ("libraries", "objects", "indexes"):
+                    try:
+                        directory.rmdir()
+                    except OSError:
+                        break
+                    directory = directory.parent
+            return removed, removed_size
+        finally:
+            conn.close()
+
+# 磁盘分析和清理线程
+class DiskCleanupThread(BackgroundTask):
+    progress_signal = pyqtSignal(str)
+    result_signal = pyqtSignal(dict)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "scan"
+    
+    def __init__(self, analyzer, sweep=False):
+        super().__init__()
+        self.analyzer = analyzer
+        self.sweep = sweep
+    
+    def run(self):
+        try:
+            if self.sweep:
+                removed, removed_size = self.analyzer.sweep(
+                    lambda count: self.progress_signal.emit(f"已删除 {count} 个文件"))
+                self.finished_signal.emit(True, f"已删除 {removed} 个未引用文件, 释放 {format_size(removed_size)}")
+                return
+            
+            report = self.analyzer.analyze(lambda count: self.progress_signal.emit(f"已扫描 {count} 个文件"))
+            self.result_signal.emit(report)
+            self.finished_signal.emit(True, f"未引用文件: {report['orphan_count']} 个, 共 {format_size(report['orphan_size'])}")
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
+def format_size(size):
+    """可读的文件大小"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+def argument_values(arguments):
+    """展开版本JSON中的参数列表, 带规则的参数只保留当前系统适用的"""
+    values = []
+    for arg in arguments:
+        if isinstance(arg, str):
+            values.append(arg)
+        elif rules_allow(arg.get('rules')):
+            value = arg.get('value', [])
+            values.extend([value] if isinstance(value, str) else value)
+    return values
+
+def substitute_placeholders(arg, placeholders):
+    """替换参数中的 ${名称} 占位符, 未知的占位符保持原样"""
+    return re.sub(r'\$\{(\w+)\}', lambda m: placeholders.get(m.group(1), m.group(0)), arg)
+
+def library_key(lib):
+    """库的唯一标识 (组:名称[:分类器]), 用于合并继承链时去重"""
+    coordinate = library_coordinate(lib)
+    if coordinate is None:
+        return lib.get('name', '')
+    return coordinate.key()
+
+def merge_version_json(parent, child):
+    """将子版本JSON合并到父版本上, 子版本的设置优先"""
+    merged = dict(parent)
+    for key, value in child.items():
+        if key in ('libraries', 'arguments', 'inheritsFrom'):
+            continue
+        merged[key] = value
+    
+    # 子版本的库覆盖父版本的同名库; 父版本中按系统区分的同名库全部保留, 按规则筛选后再去重
+    child_libraries = child.get('libraries', [])
+    child_keys = {library_key(lib) for lib in child_libraries} - {''}
+    merged['libraries'] = child_libraries + [lib for lib in parent.get('libraries', [])
+                                             if library_key(lib) not in child_keys]
+    
+    # 参数按父版本在前追加
+    arguments = {}
+    for kind in ('game', 'jvm'):
+        values = parent.get('arguments', {}).get(kind, []) + child.get('arguments', {}).get(kind, [])
+        if values:
+            arguments[kind] = values
+    if arguments:
+        merged['arguments'] = arguments
+    else:
+        merged.pop('arguments', None)
+    
+    # 使用根版本的客户端JAR
+    merged['jar'] = parent.get('jar', parent['id'])
+    merged.pop('inheritsFrom', None)
+    return merged
+
+def resolve_version(minecraft_dir, version_id, cache_dir=None):
+    """读取版本JSON并合并其 inheritsFrom 链; 合并结果按链上各JSON的大小和修改时间缓存"""
+    minecraft_dir = Path(minecraft_dir)
+    cache_path = Path(cache_dir or CACHE_DIR / 'versions') / f"{version_id}.json"
+    
+    def signature(chain):
+        result = []
+        for chain_id in chain:
+            stat = os.stat(minecraft_dir / 'versions' / chain_id / f"{chain_id}.json")
+            result.append([chain_id, stat.st_size, stat.st_mtime_ns])
+        return result
+    
+    # 缓存命中时只需检查链上每个JSON的状态
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('minecraft_dir') == str(minecraft_dir) and \
+                signature([entry[0] for entry in cached['signature']]) == cached['signature']:
+            return cached['version']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    chain = []
+    versions = []
+    current = version_id
+    while current:
+        if current in chain:
+            raise Exception(f"版本继承链存在循环: {' -> '.join(chain + [current])}")
+        json_path = minecraft_dir / 'versions' / current / f"{current}.json"
+        if not json_path.exists():
+            raise Exception(f"缺少依赖的版本: {current}")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data.setdefault('id', current)
+        chain.append(current)
+        versions.append(data)
+        current = data.get('inheritsFrom')
+    
+    merged = versions[-1]
+    for child in reversed(versions[:-1]):
+        merged = merge_version_json(merged, child)
+    
+    if len(chain) > 1:
+        try:
+            os.makedirs(cache_path.parent, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"minecraft_dir": str(minecraft_dir), "signature": signature(chain), "version": merged}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return merged
+
+# Fabric / Quilt 加载器安装 (通过元数据API获取版本配置)
+class MetaLoaderInstaller:
+    # 加载器 -> 元数据API版本
+    API_VERSIONS = {"fabric": "v2", "quilt": "v3"}
+    
+    def __init__(self, loader, base_url=None):
+        if loader not in self.API_VERSIONS:
+            raise ValueError(f"不支持的加载器: {loader}")
+        self.loader = loader
+        base_url = base_url or (FABRIC_META if loader == "fabric" else QUILT_META)
+        self.base_url = f"{base_url.rstrip('/')}/{self.API_VERSIONS[loader]}"
+    
+    def get(self, path):
+        return http_request('GET', f"{self.base_url}{path}").json()
+    
+    def latest_loader(self, game_version):
+        """游戏版本可用的最新加载器版本, 优先稳定版"""
+        versions = self.get(f"/versions/loader/{quote(game_version)}")
+        if not versions:
+            raise Exception(f"{self.loader} 不支持游戏版本 {game_version}")
+        for entry in versions:
+            if entry['loader'].get('stable', True):
+                return entry['loader']['version']
+        return versions[0]['loader']['version']
+    
+    def install(self, minecraft_dir, game_version, loader_version=None, progress_callback=None, is_cancelled=None):
+        """写入加载器版本JSON并下载其库文件, 返回版本ID (需要先安装对应的游戏版本)"""
+        minecraft_dir = Path(minecraft_dir)
+        if not (minecraft_dir / 'versions' / game_version / f"{game_version}.json").exists():
+            raise Exception(f"请先安装游戏版本 {game_version}")
+        
+        loader_version = loader_version or self.latest_loader(game_version)
+        profile = self.get(f"/versions/loader/{quote(game_version)}/{quote(loader_version)}/profile/json")
+        version_id = profile['id']
+        
+        version_dir = minecraft_dir / 'versions' / version_id
+        os.makedirs(version_dir, exist_ok=True)
+        with open(version_dir / f"{version_id}.json", 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        
+        # 并行下载加载器的库文件
+        tasks = []
+        for lib in profile.get('libraries', []):
+            if library_allowed(lib):
+                tasks.extend(library_tasks(lib, minecraft_dir / 'libraries'))
+        tasks = GameFileVerifier(minecraft_dir).verify(tasks)
+        failures = ParallelDownloader(progress_callback=progress_callback, is_cancelled=is_cancelled).run(tasks)
+        if failures:
+            task, error = failures[0]
+            raise Exception(f"{len(failures)} 个库文件下载失败, 例如 {task.path.name}: {error}")
+        return version_id
+
+def version_sort_key(version):
+    """按版本号中的数字排序"""
+    return [int(part) for part in re.findall(r'\d+', version)]
+
+# Forge / NeoForge 安装 (解析安装器中的 install_profile.json 并在本地运行处理器)
+class ForgeInstaller:
+    LOADERS = ("forge", "neoforge")
+    
+    # 同时运行的处理器数量 (每个处理器都是一个Java进程)
+    MAX_PROCESSORS = 4
+    
+    def __init__(self, loader, java_path="java", maven_url=None, cache_dir=None):
+        if loader not in self.LOADERS:
+            raise ValueError(f"不支持的加载器: {loader}")
+        self.loader = loader
+        self.java_path = java_path or "java"
+        self.maven_url = (maven_url or (FORGE_MAVEN if loader == "forge" else NEOFORGE_MAVEN)).rstrip('/')
+        self.cache_dir = Path(cache_dir or CACHE_DIR / 'forge')
+        self.log_callback = None
+    
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+    
+    def artifact(self, game_version):
+        """安装器的Maven构件路径, 以及该游戏版本的加载器版本前缀"""
+        if self.loader == "forge":
+            return "net/minecraftforge/forge", f"{game_version}-"
+        if game_version == "1.20.1":
+            # NeoForge 在 1.20.1 上沿用 forge 构件名
+            return "net/neoforged/forge", "1.20.1-"
+        parts = game_version.split('.')
+        return "net/neoforged/neoforge", f"{parts[1]}.{parts[2] if len(parts) > 2 else 0}."
+    
+    def full_version(self, game_version, loader_version):
+        """补全加载器版本 (整合包中的Forge版本不含游戏版本)"""
+        _, prefix = self.artifact(game_version)
+        if prefix.endswith('-') and not loader_version.startswith(prefix):
+            return prefix + loader_version
+        return loader_version
+    
+    def latest_loader(self, game_version):
+        """游戏版本可用的最新加载器版本, 优先非测试版"""
+        path, prefix = self.artifact(game_version)
+        response = http_request('GET', f"{self.maven_url}/{path}/maven-metadata.xml")
+        versions = [v for v in re.findall(r'<version>([^<]+)</version>', response.text) if v.startswith(prefix)]
+        if not versions:
+            raise Exception(f"{self.loader} 不支持游戏版本 {game_version}")
+        stable = [v for v in versions if 'beta' not in v and 'alpha' not in v]
+        return max(stable or versions, key=version_sort_key)
+    
+    def install(self, minecraft_dir, game_version, loader_version=None, progress_callback=None, is_cancelled=None):
+        """下载安装器, 安装库文件并运行处理器, 返回版本ID (需要先安装对应的游戏版本)"""
+        minecraft_dir = Path(minecraft_dir)
+        if not (minecraft_dir / 'versions' / game_version / f"{game_version}.jar").exists():
+            raise Exception(f"请先安装游戏版本 {game_version}")
+        
+        loader_version = self.full_version(game_version, loader_version or self.latest_loader(game_version))
+        path, _ = self.artifact(game_version)
+        name = path.rsplit('/', 1)[1]
+        installer_path = self.cache_dir / 'installers' / f"{name}-{loader_version}-installer.jar"
+        if not installer_path.exists():
+            self.log(f"下载安装器: {installer_path.name}")
+            DownloadTask(f"{self.maven_url}/{path}/{loader_version}/{installer_path.name}", installer_path).download(is_cancelled)
+        
+        with zipfile.ZipFile(installer_path) as zf:
+            profile = json.loads(zf.read('install_profile.json').decode('utf-8'))
+            if 'versionInfo' in profile:
+                return self.install_legacy(zf, profile, minecraft_dir, game_version, progress_callback, is_cancelled)
+            
+            version_json = json.loads(zf.read(profile.get('json', '/version.json').lstrip('/')).decode('utf-8'))
+            version_id = version_json['id']
+            version_json.setdefault('inheritsFrom', game_version)
+            
+            library_paths = self.install_libraries(zf, minecraft_dir, version_json.get('libraries', []) + profile.get('libraries', []),
+                                                   progress_callback, is_cancelled)
+            # 处理器写入库目录的文件不在库列表中, 记录到版本JSON, 磁盘清理时视为该版本的文件
+            version_json['processorOutputs'] = self.run_processors(zf, installer_path, minecraft_dir, game_version, profile,
+                                                                   library_paths, progress_callback, is_cancelled)
+        
+        # 处理器全部完成后再写入版本JSON, 避免留下无法启动的版本
+        self.write_version(minecraft_dir, version_json)
+        return version_id
+    
+    def install_legacy(self, zf, profile, minecraft_dir, game_version, progress_callback, is_cancelled):
+        """旧版安装器 (1.12.2及以前): 解压通用jar, 无需运行处理器"""
+        install = profile['install']
+        version_json = profile['versionInfo']
+        version_json['id'] = install.get('target') or version_json['id']
+        version_json.setdefault('inheritsFrom', game_version)
+        
+        universal_path = minecraft_dir / 'libraries' / maven_path(install['path'])
+        os.makedirs(universal_path.parent, exist_ok=True)
+        with zf.open(install['filePath']) as src, open(universal_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        
+        libraries = []
+        for lib in version_json.get('libraries', []):
+            # 旧地址已迁移到新的Maven仓库
+            if lib.get('url') and 'files.minecraftforge.net/maven' in lib['url']:
+                lib = dict(lib, url=FORGE_MAVEN + '/')
+            libraries.append(lib)
+        self.install_libraries(zf, minecraft_dir, libraries, progress_callback, is_cancelled)
+        version_json['processorOutputs'] = []
+        self.write_version(minecraft_dir, version_json)
+        return version_json['id']
+    
+    def write_version(self, minecraft_dir, version_json):
+        version_dir = minecraft_dir / 'versions' / version_json['id']
+        os.makedirs(version_dir, exist_ok=True)
+        with open(version_dir / f"{version_json['id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(version_json, f, indent=2)
+    
+    def install_libraries(self, zf, minecraft_dir, libraries, progress_callback, is_cancelled):
+        """并行下载库文件, 安装器内嵌的库直接解压; 返回所有库文件路径"""
+        libraries_dir = minecraft_dir / 'libraries'
+        tasks = {}
+        for lib in libraries:
+            if library_allowed(lib):
+                for task in library_tasks(lib, libraries_dir):
+                    tasks.setdefault(str(task.path), task)
+        
+        missing = GameFileVerifier(minecraft_dir).verify(list(tasks.values()))
+        for task in [t for t in missing if not t.url]:
+            # 下载地址为空的库打包在安装器的 maven/ 目录中
+            entry = 'maven/' + task.path.relative_to(libraries_dir).as_posix()
+            try:
+                info = zf.getinfo(entry)
+            except KeyError:
+                raise Exception(f"安装器中缺少库文件: {entry}")
+            os.makedirs(task.path.parent, exist_ok=True)
+            with zf.open(info) as src, open(task.path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        
+        remote = [t for t in missing if t.url]
+        self.log(f"下载加载器库文件: {len(remote)} 个")
+        failures = ParallelDownloader(progress_callback=progress_callback, is_cancelled=is_cancelled).run(remote)
+        if failures:
+            task, error = failures[0]
+            raise Exception(f"{len(failures)} 个库文件下载失败, 例如 {task.path.name}: {error}")
+        return set(tasks)
+    
+    def run_processors(self, zf, installer_path, minecraft_dir, game_version, profile, library_paths,
+                       progress_callback=None, is_cancelled=None):
+        """按依赖关系分批运行处理器, 互不依赖的处理器并行运行; 返回处理器写入库目录的文件 (相对于库目录)"""
+        plan = self.plan_processors(zf, installer_path, minecraft_dir, game_version, profile, library_paths)
+        if not plan:
+            return []
+        libraries_dir = minecraft_dir / 'libraries'
+        outputs = set()
+        for task in plan:
+            for path in task['outputs']:
+                try:
+                    outputs.add(Path(path).relative_to(libraries_dir).as_posix())
+                except ValueError:
+                    continue
+        
+        done = 0
+        for wave in self.processor_waves(plan):
+            if is_cancelled and is_cancelled():
+                raise Exception("安装被取消")
+            with ThreadPoolExecutor(max_workers=min(len(wave), self.MAX_PROCESSORS)) as executor:
+                futures = {executor.submit(self.run_processor, task, minecraft_dir): task for task in wave}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    result = future.result()
+                    done += 1
+                    self.log(f"处理器 {task['name']}: {result}")
+                    if progress_callback:
+                        progress_callback(done, len(plan), None)
+        return sorted(outputs)
+    
+    def plan_processors(self, zf, installer_path, minecraft_dir, game_version, profile, library_paths):
+        """解析处理器的参数, 以及每个处理器读取和写入的文件"""
+        libraries_dir = minecraft_dir / 'libraries'
+        data_dir = self.cache_dir / 'data' / installer_path.stem
+        minecraft_jar = str(minecraft_dir / 'versions' / game_version / f"{game_version}.jar")
+        data = {
+            'SIDE': 'client',
+            'MINECRAFT_JAR': minecraft_jar,
+            'MINECRAFT_VERSION': game_version,
+            'ROOT': str(minecraft_dir),
+            'INSTALLER': str(installer_path),
+            'LIBRARY_DIR': str(libraries_dir),
+        }
+        # 安装开始时已存在的文件, 其余涉及的文件都是处理器的输出
+        known = set(library_paths) | {minecraft_jar, str(installer_path)}
+        file_values = {minecraft_jar, str(installer_path)}
+        
+        for key, value in profile.get('data', {}).items():
+            value = value.get('client', '')
+            if value.startswith('[') and value.endswith(']'):
+                data[key] = str(libraries_dir / maven_path(value[1:-1]))
+                file_values.add(data[key])
+            elif value.startswith("'") and value.endswith("'"):
+                data[key] = value[1:-1]
+            elif value.startswith('/'):
+                # 安装器中的数据文件 (如二进制补丁)
+                target = data_dir / value.lstrip('/')
+                if not target.exists():
+                    os.makedirs(target.parent, exist_ok=True)
+                    with zf.open(value.lstrip('/')) as src, open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                data[key] = str(target)
+                file_values.add(data[key])
+                known.add(data[key])
+            else:
+                data[key] = value
+        
+        def resolve(arg, paths):
+            if arg.startswith('[') and arg.endswith(']'):
+                path = str(libraries_dir / maven_path(arg[1:-1]))
+                paths.append(path)
+                return path
+            def replace(match):
+                value = data.get(match.group(1), match.group(0))
+                if value in file_values:
+                    paths.append(value)
+                return value
+            return re.sub(r'\{(\w+)\}', replace, arg)
+        
+        plan = []
+        for processor in profile.get('processors', []):
+            if 'client' not in processor.get('sides', ['client']):
+                continue
+            paths = []
+            args = [resolve(arg, paths) for arg in processor.get('args', [])]
+            expected = {}
+            for key, value in processor.get('outputs', {}).items():
+                expected[resolve(key, [])] = resolve(value, [])
+            
+            jar = str(libraries_dir / maven_path(processor['jar']))
+            classpath = [str(libraries_dir / maven_path(coordinate)) for coordinate in processor.get('classpath', [])]
+            inputs = [jar] + classpath + [path for path in paths if path in known]
+            outputs = set(expected) | {path for path in paths if path not in known}
+            known |= outputs
+            plan.append({
+                'name': MavenCoordinate.parse(processor['jar']).artifact_id,
+                'jar': jar,
+                'classpath': classpath,
+                'args': args,
+                'inputs': sorted(set(inputs)),
+                'outputs': sorted(outputs),
+                'expected': expected,
+            })
+        return plan
+    
+    def processor_waves(self, plan):
+        """按文件依赖把处理器分批: 读写同一文件的处理器保持原有顺序"""
+        levels = []
+        for i, task in enumerate(plan):
+            reads = set(task['inputs'])
+            writes = set(task['outputs'])
+            level = 0
+            for j in range(i):
+                other = plan[j]
+                other_writes = set(other['outputs'])
+                if other_writes & (reads | writes) or writes & set(other['inputs']):
+                    level = max(level, levels[j] + 1)
+            levels.append(level)
+        
+        waves = [[] for _ in range(max(levels) + 1)]
+        for task, level in zip(plan, levels):
+            waves[level].append(task)
+        return waves
+    
+    def relative(self, path, minecraft_dir):
+        """缓存中使用与安装目录无关的路径"""
+        for prefix, root in (("${root}", str(minecraft_dir)), ("${cache}", str(self.cache_dir))):
+            if path.startswith(root):
+                return prefix + path[len(root):].replace(os.sep, '/')
+        return path
+    
+    def absolute(self, path, minecraft_dir):
+        for prefix, root in (("${root}", minecraft_dir), ("${cache}", self.cache_dir)):
+            if path.startswith(prefix):
+                return Path(str(root) + path[len(prefix):])
+        return Path(path)
+    
+    def processor_key(self, task, minecraft_dir):
+        """处理器缓存键: 处理器、参数以及所有输入文件的哈希"""
+        digests = file_hash_cache.hash_files(task['inputs'])
+        missing = [path for path in task['inputs'] if path not in digests]
+        if missing:
+            raise Exception(f"处理器 {task['name']} 缺少输入文件: {missing[0]}")
+        key = {
+            'jar': self.relative(task['jar'], minecraft_dir),
+            'classpath': [self.relative(path, minecraft_dir) for path in task['classpath']],
+            'args': [arg.replace(str(minecraft_dir), "${root}").replace(str(self.cache_dir), "${cache}") for arg in task['args']],
+            'inputs': {self.relative(path, minecraft_dir): digests[path] for path in task['inputs']},
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def run_processor(self, task, minecraft_dir):
+        """运行单个处理器: 输出已存在或已缓存时跳过"""
+        if task['expected']:
+            digests = file_hash_cache.hash_files(list(task['expected']))
+            if all(digests.get(path) == sha1 for path, sha1 in task['expected'].items()):
+                return "输出已存在"
+        
+        key = self.processor_key(task, minecraft_dir)
+        if self.restore_outputs(key, task, minecraft_dir):
+            return "使用缓存的输出"
+        
+        with zipfile.ZipFile(task['jar']) as jar:
+            main_class = read_jar_manifest(jar).get('Main-Class')
+        if not main_class:
+            raise Exception(f"处理器 {task['name']} 没有主类")
+        
+        cmd = [self.java_path, '-cp', os.pathsep.join([task['jar']] + task['classpath']), main_class] + task['args']
+        with tracer.span("processor", "loader", name=task['name']):
+            result = subprocess.run(cmd, cwd=str(minecraft_dir), capture_output=True, text=True,
+                                    creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0)
+        if result.returncode != 0:
+            output = (result.stderr or result.stdout).strip().splitlines()[-5:]
+            raise Exception(f"处理器 {task['name']} 运行失败 (返回码 {result.returncode}): {' '.join(output)}")
+        
+        if task['expected']:
+            digests = file_hash_cache.hash_files(list(task['expected']))
+            for path, sha1 in task['expected'].items():
+                if digests.get(path) != sha1:
+                    raise Exception(f"处理器 {task['name']} 的输出校验失败: {Path(path).name}")
+        
+        self.store_outputs(key, task, minecraft_dir)
+        return "完成"
+    
+    def store_outputs(self, key, task, minecraft_dir):
+        """按内容保存处理器的输出文件"""
+        cache_dir = self.cache_dir / 'processors'
+        digests = file_hash_cache.hash_files(task['outputs'])
+        outputs = {}
+        try:
+            for path, digest in digests.items():
+                if not os.path.isfile(path):
+                    continue
+                target = cache_dir / 'objects' / digest[:2] / digest
+                if not target.exists():
+                    os.makedirs(target.parent, exist_ok=True)
+                    shutil.copyfile(path, target)
+                outputs[self.relative(path, minecraft_dir)] = digest
+            tmp_path = cache_dir / f"{key}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"name": task['name'], "outputs": outputs}, f)
+            os.replace(tmp_path, cache_dir / f"{key}.json")
+        except OSError:
+            pass
+    
+    def restore_outputs(self, key, task, minecraft_dir):
+        """从缓存恢复处理器的输出; 缺少文件或恢复的文件校验失败时返回False (需要重新运行处理器)"""
+        cache_dir = self.cache_dir / 'processors'
+        try:
+            with open(cache_dir / f"{key}.json", 'r', encoding='utf-8') as f:
+                outputs = json.load(f)['outputs']
+        except (OSError, ValueError, KeyError):
+            return False
+        
+        sources = {path: cache_dir / 'objects' / digest[:2] / digest for path, digest in outputs.items()}
+        if not all(source.exists() for source in sources.values()):
+            return False
+        targets = {}
+        for path, source in sources.items():
+            target = self.absolute(path, minecraft_dir)
+            os.makedirs(target.parent, exist_ok=True)
+            shutil.copyfile(source, target)
+            targets[str(target)] = path
+        
+        # 缓存的文件可能已损坏或不完整: 同时核对缓存记录的哈希和处理器声明的输出哈希
+        digests = file_hash_cache.hash_files(list(targets))
+        for target, path in targets.items():
+            expected = task['expected'].get(target, outputs[path])
+            if digests.get(target) != outputs[path] or digests.get(target) != expected:
+                self.log(f"处理器 {task['name']} 的缓存输出校验失败: {Path(target).name}")
+                for stale in (sources[path], cache_dir / f"{key}.json"):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                return False
+        return True
+
+def detect_loader(version_json):
+    """根据版本JSON中的库判断模组加载器"""
+    names = " ".join(lib.get('name', '') for lib in version_json.get('libraries', []))
+    for marker, loader in (("net.fabricmc:fabric-loader", "fabric"), ("org.quiltmc:quilt-loader", "quilt"),
+                           ("net.neoforged", "neoforge"), ("net.minecraftforge", "forge"),
+                           ("optifine", "optifine")):
+        if marker in names:
+            return loader
+    return "vanilla"
+
+def directory_size(path):
+    """目录中所有文件的总大小"""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def scan_version(version_dir, previous=None):
+    """读取一个版本目录的信息; 版本JSON和客户端未变化时沿用之前的结果"""
+    version_id = version_dir.name
+    try:
+        json_stat = os.stat(version_dir / f"{version_id}.json")
+    except OSError:
+        return None
+    try:
+        jar_stat = os.stat(version_dir / f"{version_id}.jar")
+        jar_signature = [jar_stat.st_size, jar_stat.st_mtime_ns]
+    except OSError:
+        jar_signature = [-1, -1]
+    
+    signature = [json_stat.st_size, json_stat.st_mtime_ns] + jar_signature
+    if previous and previous.get('signature') == signature:
+        return previous
+    
+    try:
+        with open(version_dir / f"{version_id}.json", 'r', encoding='utf-8') as f:
+            version_json = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    return {
+        "id": version_id,
+        "type": version_json.get('type', 'release'),
+        "inheritsFrom": version_json.get('inheritsFrom'),
+        "loader": detect_loader(version_json),
+        "size": directory_size(version_dir),
+        "has_jar": jar_signature[0] >= 0,
+        "signature": signature,
+        "last_played": previous.get('last_played') if previous else None
+    }
+
+# 已安装版本扫描线程
+class VersionScanThread(BackgroundTask):
+    result_signal = pyqtSignal(str, dict)
+    pool = "scan"
+    
+    def __init__(self, versions_dir, entries, full_scan, names):
+        super().__init__()
+        self.versions_dir = Path(versions_dir)
+        self.entries = entries
+        self.full_scan = full_scan
+        self.names = names
+    
+    def run(self):
+        entries = dict(self.entries)
+        if self.full_scan:
+            try:
+                names = {entry.name for entry in os.scandir(self.versions_dir) if entry.is_dir()}
+            except OSError:
+                names = set()
+            for version_id in list(entries):
+                if version_id not in names:
+                    del entries[version_id]
+        else:
+            names = self.names
+        
+        for version_id in names:
+            entry = scan_version(self.versions_dir / version_id, entries.get(version_id))
+            if entry is None:
+                entries.pop(version_id, None)
+            else:
+                entries[version_id] = entry
+        self.result_signal.emit(str(self.versions_dir), entries)
+
+# 已安装版本索引 (持久化到磁盘, 由文件系统监视器防抖后增量更新)
+class InstalledVersionIndex(QObject):
+    changed = pyqtSignal()
+    
+    def __init__(self, cache_file, debounce_ms=300):
+        super().__init__()
+        self.cache_file = Path(cache_file)
+        self.versions_dir = None
+        self.entries = {}
+        self.full_scan = False
+        self.dirty = set()
+        self.scan_thread = None
+        
+        self.watcher = QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.start_scan)
+    
+    def set_directory(self, versions_dir):
+        """切换版本目录: 立即使用持久化的索引, 再在后台校验"""
+        self.versions_dir = Path(versions_dir)
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self.entries = self.load()
+        
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.watcher.addPath(str(self.versions_dir))
+        self.watch_versions()
+        
+        self.changed.emit()
+        self.rescan()
+    
+    def load(self):
+        """读取持久化的索引, 目录不同时丢弃"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('versions_dir') != str(self.versions_dir):
+            return {}
+        return data.get('entries', {})
+    
+    def save(self):
+        """写回磁盘"""
+        try:
+            os.makedirs(self.cache_file.parent, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"versions_dir": str(self.versions_dir), "entries": self.entries}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+    
+    def watch_versions(self):
+        """监视每个版本目录, 以便发现客户端或版本JSON的变化"""
+        watched = set(self.watcher.directories())
+        wanted = {str(self.versions_dir / version_id) for version_id in self.entries}
+        removed = [path for path in watched - wanted if path != str(self.versions_dir)]
+        if removed:
+            self.watcher.removePaths(removed)
+        added = [path for path in wanted - watched if os.path.isdir(path)]
+        if added:
+            self.watcher.addPaths(added)
+    
+    def rescan(self):
+        """重新校验所有版本"""
+        self.full_scan = True
+        self.timer.start()
+    
+    def on_directory_changed(self, path):
+        """目录变化, 合并短时间内的多次变化后再扫描"""
+        if Path(path) == self.versions_dir:
+            self.full_scan = True
+        else:
+            self.dirty.add(Path(path).name)
+        self.timer.start()
+    
+    def start_scan(self):
+        if self.versions_dir is None:
+            return
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            # 等上一次扫描结束后再扫描
+            self.timer.start()
+            return
+        
+        self.scan_thread = VersionScanThread(self.versions_dir, self.entries, self.full_scan, self.dirty)
+        self.full_scan = False
+        self.dirty = set()
+        self.scan_thread.result_signal.connect(self.on_scanned)
+        self.scan_thread.start()
+    
+    def on_scanned(self, versions_dir, entries):
+        """扫描完成, 只在有变化时保存并通知"""
+        if Path(versions_dir) != self.versions_dir:
+            return
+        
+        # 扫描期间记录的游玩时间以当前索引为准
+        for version_id, entry in entries.items():
+            current = self.entries.get(version_id)
+            if current and current.get('last_played') != entry.get('last_played'):
+                entries[version_id] = dict(entry, last_played=current.get('last_played'))
+        
+        if entries == self.entries:
+            return
+        self.entries = entries
+        self.watch_versions()
+        self.save()
+        self.changed.emit()
+    
+    def mark_played(self, version_id):
+        """记录版本的最近游玩时间"""
+        entry = self.entries.get(version_id)
+        if entry is None:
+            return
+        self.entries[version_id] = dict(entry, last_played=time.time())
+        self.save()
+        self.changed.emit()
+    
+    def launchable(self):
+        """可启动的版本, 最近游玩的在前"""
+        versions = [entry for entry in self.entries.values() if entry.get('has_jar') or entry.get('inheritsFrom')]
+        versions.sort(key=lambda entry: entry['id'])
+        versions.sort(key=lambda entry: entry.get('last_played') or 0, reverse=True)
+        return versions
+
+def fetch_version_manifest(mirrors, start=0):
+    """从 start 开始依次尝试各个下载源获取版本清单, 返回 (清单, 可用的下载源序号)"""
+    # 熔断中的下载源放到最后
+    order = [(start + offset) % len(mirrors) for offset in range(len(mirrors))]
+    order.sort(key=lambda index: circuit_breaker(mirrors[index]).is_open())
+    
+    errors = []
+    for index in order:
+        try:
+            with tracer.span("manifest", "install", mirror=mirrors[index]):
+                response = http_request('GET', f"{mirrors[index]}/mc/game/version_manifest.json",
+                                        RetryPolicy(attempts=2))
+                return response.json(), index
+        except Exception as e:
+            errors.append(f"{mirrors[index]}: {str(e)}")
+    raise Exception("所有下载源均不可用: " + "; ".join(errors))
+
+def supported_versions(manifest):
+    """版本清单中支持的版本 (1.7.10及以上)"""
+    versions = []
+    for entry in manifest['versions']:
+        try:
+            parts = [int(part) for part in entry['id'].split('.')[:3]]
+        except ValueError:
+            continue
+        if parts + [0] * (3 - len(parts)) >= [1, 7, 10]:
+            versions.append(entry['id'])
+    return versions
+
+# 游戏下载模块
+class GameDownloadWidget(QWidget):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    
+    def __init__(self, minecraft_dir, mirrors, current_mirror, java_path_getter=None):
+        super().__init__()
+        self.minecraft_dir = minecraft_dir
+        self.mirrors = mirrors
+        self.current_mirror = current_mirror
+        self.java_path_getter = java_path_getter
+        self.version_manifest = None
+        self.download_thread = None
+        self.init_ui()
+    
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(15)
+        
+        # 版本选择
+        version_layout = QHBoxLayout()
+        version_layout.addWidget(QLabel("选择版本:"))
+        self.version_combobox = TransparentComboBox()
+        version_layout.addWidget(self.version_combobox)
+        
+        # 模组加载器
+        version_layout.addWidget(QLabel("加载器:"))
+        self.loader_combobox = TransparentComboBox()
+        self.loader_combobox.addItems(["无", "Fabric", "Quilt", "Forge", "NeoForge"])
+        version_layout.addWidget(self.loader_combobox)
+        layout.addLayout(version_layout)
+        
+        # 按钮框架
+        btn_layout = QHBoxLayout()
+        self.download_btn = RoundedButton("下载选中版本", bg_color="#388E3C")
+        self.download_btn.clicked.connect(self.start_download_thread)
+        btn_layout.addWidget(self.download_btn)
+        
+        refresh_btn = RoundedButton("刷新列表", bg_color="#5A7FB5")
+        refresh_btn.clicked.connect(self.load_version_list)
+        btn_layout.addWidget(refresh_btn)
+        
+        layout.addLayout(btn_layout)
+        
+        # 进度条
+        self.progress = TransparentProgressBar()
+        layout.addWidget(self.progress)
+        
+        # 进度标签
+        self.progress_label = QLabel("就绪")
+        self.progress_label.setAlignment(Qt.AlignCenter)
+        self.progress_label.setStyleSheet("color: #666666;")
+        layout.addWidget(self.progress_label)
+    
+    def load_version_list(self):
+        """在后台加载版本列表"""
+        self.progress_label.setText("正在加载版本列表...")
+        task_runtime.call(fetch_version_manifest, self.mirrors, self.current_mirror,
+                          on_result=self.set_version_manifest, on_error=self.on_version_list_error)
+    
+    def set_version_manifest(self, result):
+        """显示版本列表 (GUI线程)"""
+        self.version_manifest, self.current_mirror = result
+        filtered_versions = supported_versions(self.version_manifest)
+        
+        # 更新版本选择框, 保留当前选择
+        selected = self.version_combobox.currentText()
+        self.version_combobox.clear()
+        self.version_combobox.addItems(filtered_versions)
+        
+        if selected in filtered_versions:
+            self.version_combobox.setCurrentText(selected)
+        elif "1.12.2" in filtered_versions:
+            # 默认选择1.12.2
+            self.version_combobox.setCurrentText("1.12.2")
+        elif filtered_versions:
+            self.version_combobox.setCurrentIndex(0)
+        self.progress_label.setText("就绪")
+    
+    def on_version_list_error(self, error):
+        """版本列表加载失败"""
+        self.progress_label.setText("版本列表加载失败")
+        self.log_signal.emit(f"错误: {error}")
+    
+    def start_download_thread(self):
+        """启动下载线程, 下载中再次点击则取消下载"""
+        if self.download_thread is not None and self.download_thread.isRunning():
+            self.download_thread.cancel()
+            self.download_btn.setEnabled(False)
+            self.progress_label.setText("正在取消下载...")
+            return
+        
+        selected_version = self.version_combobox.currentText()
+        if not selected_version:
+            self.log_signal.emit("请先选择一个版本！")
+            return
+        
+        # 从已加载的版本清单中获取版本数据
+        if self.version_manifest is None:
+            self.log_signal.emit("版本列表尚未加载, 请稍后再试")
+            self.load_version_list()
+            return
+        version_data = next((v for v in self.version_manifest['versions'] if v['id'] == selected_version), None)
+        if not version_data:
+            self.log_signal.emit(f"找不到版本数据: {selected_version}")
+            return
+        
+        # 创建并启动下载线程
+        loader = self.loader_combobox.currentText()
+        java_path = self.java_path_getter() if self.java_path_getter else "java"
+        self.download_thread = DownloadThread(
+            version_data, self.minecraft_dir, java_path, "Player", "2048",
+            loader=None if loader == "无" else loader.lower()
+        )
+        self.download_thread.progress_signal.connect(self.on_download_progress)
+        self.download_thread.log_signal.connect(self.log_signal.emit)
+        self.download_thread.finished_signal.connect(self.on_download_finished)
+        
+        self.download_btn.setText("取消下载")
+        self.download_thread.start()
+    
+    def on_download_progress(self, progress, message):
+        """下载进度更新"""
+        self.progress.setValue(progress)
+        self.progress_label.setText(message)
+    
+    def on_download_finished(self, success, message):
+        """下载完成"""
+        if success:
+            self.progress.setValue(100)
+            self.progress_label.setText("下载完成")
+            self.finished_signal.emit(True, message)
+        else:
+            self.progress_label.setText(f"下载失败: {message}")
+            self.finished_signal.emit(False, message)
+        
+        self.download_btn.setText("下载选中版本")
+        self.download_btn.setEnabled(True)
+
+# 原版游戏安装 (版本JSON、客户端、库文件和资源文件), 在调用者线程中执行
+class GameInstaller:
+    def __init__(self, version_data):
+        self.version_data = version_data
+        self.log_callback = None
+        # 进度回调: (百分比, 说明)
+        self.progress_callback = None
+    
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+    
+    def progress(self, value, message):
+        if self.progress_callback:
+            self.progress_callback(value, message)
+    
+    def install(self, minecraft_dir, is_cancelled=None):
+        """下载版本JSON、客户端、库文件和资源文件"""
+        minecraft_dir = Path(minecraft_dir)
+        is_cancelled = is_cancelled or (lambda: False)
+        version_id = self.version_data['id']
+        self.log(f"开始下载版本: {version_id}")
+        
+        # 创建版本目录
+        version_dir = minecraft_dir / 'versions' / version_id
+        os.makedirs(version_dir, exist_ok=True)
+        
+        # 下载版本JSON文件
+        json_url = self.version_data['url']
+        self.log(f"下载版本清单: {json_url}")
+        self.progress(10, "下载版本清单")
+        
+        with tracer.span("version_json", "install", version=version_id):
+            version_json = http_request('GET', json_url, is_cancelled=is_cancelled).json()
+        
+        # 保存版本JSON
+        json_path = version_dir / f"{version_id}.json"
+        with open(json_path, 'w') as f:
+            json.dump(version_json, f, indent=2)
+        
+        # 客户端、库文件、natives和资源索引, 只下载缺失或损坏的文件
+        verifier = GameFileVerifier(minecraft_dir)
+        self.progress(20, "检查游戏文件")
+        with tracer.span("check_files", "install"):
+            tasks = verifier.verify(version_file_tasks(minecraft_dir, version_json))
+        self.download_tasks(tasks, 20, 50, "下载游戏文件", is_cancelled)
+        
+        # 资源对象
+        if is_cancelled() or 'assetIndex' not in version_json:
+            return
+        self.progress(50, "检查资源文件")
+        index_path = minecraft_dir / 'assets' / 'indexes' / f"{version_json['assetIndex']['id']}.json"
+        with tracer.span("check_assets", "install"):
+            tasks = verifier.verify(asset_object_tasks(minecraft_dir, index_path))
+        self.download_tasks(tasks, 50, 100, "下载资源文件", is_cancelled)
+        
+        # 旧版本需要按名称存放的资源
+        if is_cancelled():
+            return
+        with tracer.span("asset_layout", "install"):
+            root, stats = AssetLayout(minecraft_dir, index_path).build()
+        if root is not None:
+            self.log(f"资源布局 {root}: 硬链接 {stats['linked']} 个, 复制 {stats['copied']} 个, "
+                     f"未变化 {stats['unchanged']} 个")
+    
+    def download_tasks(self, tasks, start, end, message, is_cancelled):
+        """并行下载文件, 进度映射到 start-end 区间"""
+        if not tasks:
+            return
+        self.log(f"{message}: {len(tasks)} 个文件")
+        downloader = ParallelDownloader(
+            progress_callback=lambda done, total, task: self.progress(
+                start + int((end - start) * done / total), f"{message} ({done}/{total})"),
+            is_cancelled=is_cancelled
+        )
+        with tracer.span("download_files", "install", stage=message, files=len(tasks)):
+            failures = downloader.run(tasks)
+        if failures and not is_cancelled():
+            task, error = failures[0]
+            raise Exception(f"{len(failures)} 个文件下载失败, 例如 {task.path.name}: {error}")
+
+# 工作线程类
+class DownloadThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "download"
+    
+    def __init__(self, version_data, minecraft_dir, java_path, username, memory, loader=None):
+        super().__init__()
+        self.version_data = version_data
+        self.minecraft_dir = minecraft_dir
+        self.java_path = java_path
+        self.username = username
+        self.memory = memory
+        self.loader = loader
+    
+    def run(self):
+        try:
+            installer = GameInstaller(self.version_data)
+            installer.log_callback = self.log_signal.emit
+            installer.progress_callback = self.progress_signal.emit
+            installer.install(self.minecraft_dir, is_cancelled=lambda: self.stop_requested)
+            if self.loader and not self.stop_requested:
+                self.install_loader()
+            
+            if not self.stop_requested:
+                self.progress_signal.emit(100, "下载完成")
+                self.log_signal.emit("版本下载完成")
+                self.finished_signal.emit(True, "")
+            else:
+                self.finished_signal.emit(False, "下载被取消")
+                
+        except Exception as e:
+            self.log_signal.emit(f"下载错误: {str(e)}")
+            self.finished_signal.emit(False, str(e))
+    
+    def install_loader(self):
+        """在游戏版本上安装模组加载器"""
+        self.log_signal.emit(f"安装 {self.loader} 加载器")
+        self.progress_signal.emit(0, f"安装 {self.loader} 加载器")
+        if self.loader in ForgeInstaller.LOADERS:
+            installer = ForgeInstaller(self.loader, self.java_path)
+            installer.log_callback = self.log_signal.emit
+        else:
+            installer = MetaLoaderInstaller(self.loader)
+        version_id = installer.install(
+            self.minecraft_dir, self.version_data['id'],
+            progress_callback=lambda done, total, task: self.progress_signal.emit(
+                int(100 * done / total), f"安装加载器 ({done}/{total})"),
+            is_cancelled=lambda: self.stop_requested
+        )
+        self.log_signal.emit(f"已安装加载器版本: {version_id}")
+
+def java_runtime_version(java_path):
+    """从Java安装目录的 release 文件读取版本 (不启动Java进程), 读取失败时返回空字符串"""
+    path = shutil.which(java_path) or java_path
+    try:
+        with open(Path(path).resolve().parent.parent / 'release', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('JAVA_VERSION='):
+                    return line.split('=', 1)[1].strip().strip('"')
+    except OSError:
+        pass
+    return ""
+
+# 启动耗时记录 (CSV文件, 每次启动一行, 游戏退出后按记录ID追加退出代码; 按版本和Java运行时汇总)
+class LaunchHistory:
+    FIELDS = ["id", "time", "version", "java", "java_version", "load_json", "rules", "classpath", "natives",
+              "spawn", "first_output", "lwjgl", "render_thread", "ready", "exit_code"]
+    # 各阶段耗时 (秒) 以及从点击启动到各标记出现的时间 (秒)
+    PHASES = FIELDS[5:10]
+    MARKS = FIELDS[10:14]
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = Lock()
+    
+    def append(self, row):
+        with self.lock:
+            os.makedirs(self.path.parent, exist_ok=True)
+            new_file = not self.path.exists()
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+    
+    def add(self, version_id, java_path, timings, exit_code=None):
+        """追加一次启动的记录"""
+        record = {field: timings.get(field, "") for field in self.FIELDS}
+        record.update({
+            "id": uuid4().hex,
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "version": version_id,
+            "java": java_path,
+            "java_version": java_runtime_version(java_path),
+            "exit_code": "" if exit_code is None else exit_code,
+        })
+        self.append(record)
+        return record
+    
+    def set_exit_code(self, record, exit_code):
+        """游戏退出后追加该记录的退出代码 (只追加, 不改写已有的行)"""
+        self.append({"id": record["id"], "exit_code": exit_code})
+        record["exit_code"] = exit_code
+    
+    def records(self):
+        """所有启动记录, 退出代码合并到对应的记录中"""
+        with self.lock:
+            try:
+                with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                    rows = list(csv.DictReader(f))
+            except OSError:
+                return []
+        records = OrderedDict()
+        for row in rows:
+            record = records.get(row["id"])
+            if record is None:
+                records[row["id"]] = row
+            elif row["exit_code"]:
+                record["exit_code"] = row["exit_code"]
+        return list(records.values())
+    
+    def summary(self):
+        """按版本和Java运行时分组, 各项取中位数"""
+        groups = OrderedDict()
+        for record in self.records():
+            key = (record['version'], record['java'], record['java_version'])
+            groups.setdefault(key, []).append(record)
+        
+        rows = []
+        for (version_id, java_path, java_version), records in groups.items():
+            row = {"version": version_id, "java": java_path, "java_version": java_version, "launches": len(records)}
+            for field in self.PHASES + self.MARKS:
+                values = []
+                for record in records:
+                    try:
+                        values.append(float(record[field]))
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                row[field] = statistics.median(values) if values else None
+            rows.append(row)
+        return rows
+    
+    def export(self, target):
+        """导出为CSV文件 (每次启动一行)"""
+        records = self.records()
+        with open(target, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+# 全局启动耗时记录
+launch_history = LaunchHistory(CACHE_DIR / 'launch_history.csv')
+
+# 启动线程类
+class LaunchThread(BackgroundTask):
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    timing_signal = pyqtSignal(dict)
+    pool = "launch"
+    # 游戏进程不随启动器退出而结束
+    cancellable = False
+    
+    def __init__(self, version_id, minecraft_dir, java_path, username, memory):
+        super().__init__()
+        self.version_id = version_id
+        self.minecraft_dir = minecraft_dir
+        self.java_path = java_path
+        self.username = username
+        self.memory = memory
+        # 从点击启动开始计时
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.record = None
+    
+    @contextmanager
+    def phase(self, name):
+        """记录启动阶段的耗时 (同时写入性能追踪)"""
+        start = time.perf_counter()
+        with tracer.span(name, "launch", version=self.version_id):
+            yield
+        self.timings[name] = round(time.perf_counter() - start, 3)
+    
+    def mark(self, name):
+        """记录从点击启动到该事件的时间"""
+        self.timings[name] = round(time.perf_counter() - self.started, 3)
+        tracer.instant(name, "launch")
+    
+    def save_timings(self, exit_code=None):
+        ready = self.timings.get('ready', self.timings.get('render_thread'))
+        if ready is not None:
+            launch_seconds_metric.observe(ready)
+        try:
+            self.record = launch_history.add(self.version_id, self.java_path, self.timings, exit_code)
+        except OSError as e:
+            self.log_signal.emit(f"无法保存启动耗时: {str(e)}")
+            return
+        self.timing_signal.emit(self.record)
+    
+    def run(self):
+        try:
+            # 读取版本JSON (合并 inheritsFrom 链, 结果已缓存)
+            with self.phase("load_json"):
+                version_data = resolve_version(self.minecraft_dir, self.version_id)
+            
+            # 按当前系统筛选库文件和参数
+            with self.phase("rules"):
+                libraries, superseded = resolve_libraries(
+                    [lib for lib in version_data['libraries'] if library_allowed(lib)])
+                jvm_args = argument_values(version_data.get('arguments', {}).get('jvm', []))
+                if 'arguments' in version_data and 'game' in version_data['arguments']:
+                    game_args = argument_values(version_data['arguments']['game'])
+                elif 'minecraftArguments' in version_data:
+                    # 1.12.2及更早版本使用空格分隔的参数字符串
+                    game_args = version_data['minecraftArguments'].split()
+                else:
+                    # 旧版本参数
+                    game_args = [
+                        "--username", "${auth_player_name}",
+                        "--version", "${version_name}",
+                        "--gameDir", "${game_directory}",
+                        "--assetsDir", "${assets_root}",
+                        "--assetIndex", "${assets_index_name}",
+                        "--uuid", "${auth_uuid}",
+                        "--accessToken", "${auth_access_token}",
+                        "--userProperties", "${user_properties}",
+                        "--userType", "${user_type}"
+                    ]
+            
+            # 构建Java命令
+            cmd = [self.java_path]
+            
+            # 添加JVM参数
+            if self.memory:
+                cmd.extend([f"-Xmx{self.memory}M", f"-Xms{self.memory}M"])
+            
+            for lib in superseded:
+                self.log_signal.emit(f"类路径中跳过较旧的重复库: {library_coordinate(lib)}")
+            
+            libraries_dir = self.minecraft_dir / 'libraries'
+            with self.phase("classpath"):
+                # 添加库路径 (同一个文件只添加一次)
+                classpath_entries = []
+                seen = set()
+                for lib in libraries:
+                    lib_path = None
+                    if 'downloads' in lib and 'artifact' in lib['downloads']:
+                        lib_path = libraries_dir / lib['downloads']['artifact']['path']
+                    elif 'name' in lib and 'natives' not in lib:
+                        # 旧版本格式, 只有Maven坐标
+                        lib_path = libraries_dir / maven_path(lib['name'])
+                    
+                    if lib_path and str(lib_path) not in seen and lib_path.exists():
+                        seen.add(str(lib_path))
+                        classpath_entries.append(str(lib_path))
+                
+                # 添加客户端JAR (加载器版本使用其继承的游戏版本的JAR)
+                jar_id = version_data.get('jar', self.version_id)
+                client_jar = self.minecraft_dir / 'versions' / jar_id / f"{jar_id}.jar"
+                if not client_jar.exists():
+                    raise Exception(f"客户端JAR不存在: {client_jar}")
+                
+                # 构建类路径
+                classpath = os.pathsep.join(classpath_entries + [str(client_jar)])
+            
+            # 解压natives (1.19以前的版本)
+            natives_dir = self.minecraft_dir / 'natives' / self.version_id
+            with self.phase("natives"):
+                extracted = extract_natives(version_data, libraries_dir, natives_dir)
+            if extracted:
+                self.log_signal.emit(f"已解压 {extracted} 个本地库文件")
+            
+            # 旧版资源索引需要按名称存放的资源 (安装时已建立, 这里只补上变化的条目)
+            asset_index = version_data.get('assetIndex', {}).get('id', version_data.get('assets', 'legacy'))
+            game_assets = self.minecraft_dir / 'assets'
+            index_path = game_assets / 'indexes' / f"{asset_index}.json"
+            if index_path.exists():
+                try:
+                    with self.phase("assets"):
+                        root, stats = AssetLayout(self.minecraft_dir, index_path).build()
+                except (OSError, ValueError) as e:
+                    self.log_signal.emit(f"无法建立资源布局: {str(e)}")
+                    root = None
+                if root is not None:
+                    game_assets = root
+                    if stats['linked'] or stats['copied']:
+                        self.log_signal.emit(f"已更新资源布局: {stats['linked'] + stats['copied']} 个文件")
+            
+            # 参数中的占位符
+            placeholders = {
+                "auth_player_name": self.username,
+                "version_name": self.version_id,
+                "version_type": version_data.get('type', 'release'),
+                "game_directory": str(self.minecraft_dir),
+                "assets_root": str(self.minecraft_dir / 'assets'),
+                "game_assets": str(game_assets),
+                "assets_index_name": asset_index,
+                "auth_uuid": str(uuid4()),
+                "auth_access_token": "token",
+                "auth_session": "token",
+                "user_properties": "{}",
+                "user_type": "mojang",
+                "natives_directory": str(natives_dir),
+                "library_directory": str(libraries_dir),
+                "classpath_separator": os.pathsep,
+                "classpath": classpath,
+                "launcher_name": "XHL-Minecraft-Launcher",
+                "launcher_version": "2.0"
+            }
+            
+            # 版本JSON中的JVM参数; 没有指定类路径时自行添加
+            cmd.extend(substitute_placeholders(arg, placeholders) for arg in jvm_args)
+            if not jvm_args:
+                # 旧版本JSON没有JVM参数, 自行指定本地库目录
+                cmd.append(f"-Djava.library.path={natives_dir}")
+            if not any("${classpath}" in arg for arg in jvm_args):
+                cmd.extend(["-cp", classpath])
+            
+            # 添加主类
+            main_class = version_data['mainClass']
+            cmd.append(main_class)
+            
+            # 添加游戏参数
+            cmd.extend(substitute_placeholders(arg, placeholders) for arg in game_args)
+            
+            self.log_signal.emit(f"启动命令: {' '.join(cmd)}")
+            
+            with self.phase("spawn"):
+                # 启动游戏 - 隐藏命令提示符窗口
+                if platform.system() == "Windows":
+                    startupinfo = subprocess.STARTUPINFO()
+                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                    startupinfo.wShowWindow = 0  # SW_HIDE
+                    process = subprocess.Popen(
+                        cmd,
+                        cwd=str(self.minecraft_dir),
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True,
+                        startupinfo=startupinfo,
+                        creationflags=subprocess.CREATE_NO_WINDOW
+                    )
+                else:
+                    # 对于非Windows系统，使用常规方式启动
+                    process = subprocess.Popen(
+                        cmd,
+                        cwd=str(self.minecraft_dir),
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True
+                    )
+            
+            launches_metric.inc(result="started")
+            spawned = time.perf_counter()
+            
+            # 输出游戏日志, 记录首次输出和启动标记出现的时间; 窗口就绪后即保存记录, 退出后补充退出代码
+            pending = dict(LAUNCH_MARKERS)
+            saved = False
+            for line in process.stdout:
+                if 'first_output' not in self.timings:
+                    self.mark('first_output')
+                if pending:
+                    for name, markers in list(pending.items()):
+                        if any(marker in line for marker in markers):
+                            self.mark(name)
+                            del pending[name]
+                    if not saved and 'ready' in self.timings:
+                        self.save_timings()
+                        saved = True
+                self.log_signal.emit(line.strip())
+            
+            process.wait()
+            if not saved:
+                self.save_timings(process.returncode)
+            elif self.record is not None:
+                try:
+                    launch_history.set_exit_code(self.record, process.returncode)
+                except OSError as e:
+                    self.log_signal.emit(f"无法保存退出代码: {str(e)}")
+            game_exits_metric.inc(code=process.returncode)
+            game_session_metric.observe(time.perf_counter() - spawned)
+            
+            if process.returncode == 0:
+                self.finished_signal.emit(True, "游戏正常退出")
+            else:
+                self.finished_signal.emit(False, f"游戏异常退出，代码: {process.returncode}")
+                
+        except Exception as e:
+            if 'spawn' not in self.timings:
+                launches_metric.inc(result="failed")
+            self.log_signal.emit(f"启动错误: {str(e)}")
+            self.finished_signal.emit(False, str(e))
+
+# 进行中的请求 (用于合并相同请求)
+class InflightRequest:
+    def __init__(self):
+        self.event = Event()
+        self.value = None
+        self.error = None
+
+# 搜索结果缓存 (内存LRU + 磁盘, 带过期时间)
+class SearchCache:
+    def __init__(self, cache_dir, max_entries=200, max_disk_entries=2000, ttl=600):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = Lock()
+        self.puts_since_prune = 0
+    
+    def make_key(self, *parts):
+        """根据请求参数生成缓存键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """读取缓存, 未命中或已过期时返回None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self.entries.move_to_end(key)
+                    return entry[1]
+                del self.entries[key]
+        
+        # 内存未命中时读取磁盘缓存
+        path = self.cache_dir / f"{key}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if now - data.get('time', 0) >= self.ttl:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        
+        self.remember(key, data['time'], data['value'])
+        return data['value']
+    
+    def put(self, key, value):
+        """写入内存和磁盘缓存"""
+        now = time.time()
+        self.remember(key, now, value)
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.cache_dir / f"{key}.json"
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'time': now, 'value': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        
+        self.puts_since_prune += 1
+        if self.puts_since_prune >= 50:
+            self.puts_since_prune = 0
+            self.prune_disk()
+    
+    def remember(self, key, timestamp, value):
+        """放入内存LRU, 超出容量时淘汰最久未使用的条目"""
+        with self.lock:
+            self.entries[key] = (timestamp, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def prune_disk(self):
+        """清理过期和超出数量上限的磁盘缓存"""
+        try:
+            files = [(p.stat().st_mtime, p) for p in self.cache_dir.glob('*.json')]
+        except OSError:
+            return
+        
+        files.sort()
+        now = time.time()
+        excess = len(files) - self.max_disk_entries
+        for i, (mtime, path) in enumerate(files):
+            if i < excess or now - mtime >= self.ttl:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+    
+    def get_or_fetch(self, key, fetch):
+        """读取缓存, 未命中时调用fetch; 相同的进行中请求只发送一次"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        
+        with self.lock:
+            request = self.inflight.get(key)
+            owner = request is None
+            if owner:
+                request = InflightRequest()
+                self.inflight[key] = request
+        
+        # 已有相同请求进行中, 等待其结果
+        if not owner:
+            request.event.wait()
+            if request.error is not None:
+                raise request.error
+            return request.value
+        
+        try:
+            value = fetch()
+            self.put(key, value)
+            request.value = value
+            return value
+        except Exception as e:
+            request.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            request.event.set()
+
+# 全局搜索缓存, 模组和光影选项卡共用
+search_cache = SearchCache(CACHE_DIR / 'search')
+
+def tokenize(text):
+    """分词: 小写的字母数字词"""
+    return re.findall(r'\w+', (text or '').lower())
+
+def term_grams(term):
+    """词的二元组集合 (首尾加边界符), 用于查找拼写相近的词"""
+    padded = f"^{term}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def within_edit_distance(a, b, max_distance):
+    """两个词的编辑距离 (含相邻交换) 是否不超过 max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return False
+        previous2, previous = previous, current
+    return previous[-1] <= max_distance
+
+# 离线模组目录 (本地快照 + 磁盘倒排索引)
+class ModCatalog:
+    # 各字段在索引中的权重
+    FIELD_WEIGHTS = (("title", 3.0), ("slug", 2.0), ("categories", 1.5), ("description", 1.0))
+    
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+    
+    def connect(self):
+        """打开数据库 (每个线程使用自己的连接)"""
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS projects (
+                doc INTEGER PRIMARY KEY,
+                project_id TEXT UNIQUE,
+                project_type TEXT,
+                slug TEXT,
+                title TEXT,
+                description TEXT,
+                categories TEXT,
+                versions TEXT,
+                downloads INTEGER,
+                icon_url TEXT,
+                date_modified TEXT
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT,
+                doc INTEGER,
+                weight REAL,
+                PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                length INTEGER
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS grams (
+                gram TEXT,
+                length INTEGER,
+                term TEXT,
+                PRIMARY KEY (gram, length, term)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS projects_type_downloads ON projects (project_type, downloads DESC);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # 旧版本的目录没有二元组索引, 从已有的词补建
+        if self.get_meta(conn, "grams") is None:
+            terms = [term for (term,) in conn.execute("SELECT term FROM terms")]
+            self.add_grams(conn, terms)
+            self.set_meta(conn, "grams", "1")
+            conn.commit()
+        return conn
+    
+    def add_grams(self, conn, terms):
+        conn.executemany("INSERT OR IGNORE INTO grams (gram, length, term) VALUES (?, ?, ?)",
+                         [(gram, len(term), term) for term in terms for gram in term_grams(term)])
+    
+    def count(self, project_type=None):
+        """目录中的项目数量"""
+        if not self.db_path.exists():
+            return 0
+        conn = self.connect()
+        try:
+            if project_type:
+                return conn.execute("SELECT COUNT(*) FROM projects WHERE project_type = ?", (project_type,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def get_meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+    
+    def set_meta(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    
+    def upsert(self, conn, projects):
+        """写入或更新项目, 并重建这些项目的倒排索引"""
+        for project in projects:
+            row = conn.execute("SELECT doc FROM projects WHERE project_id = ?", (project["project_id"],)).fetchone()
+            values = (project["project_type"], project.get("slug", ""), project.get("title", ""),
+                      project.get("description", ""), json.dumps(project.get("categories", [])),
+                      json.dumps(project.get("versions", [])), project.get("downloads", 0),
+                      project.get("icon_url", ""), project.get("date_modified", ""))
+            if row:
+                doc = row[0]
+                conn.execute("""UPDATE projects SET project_type = ?, slug = ?, title = ?, description = ?,
+                                categories = ?, versions = ?, downloads = ?, icon_url = ?, date_modified = ?
+                                WHERE doc = ?""", values + (doc,))
+                conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+            else:
+                doc = conn.execute("""INSERT INTO projects (project_type, slug, title, description, categories,
+                                      versions, downloads, icon_url, date_modified, project_id)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   values + (project["project_id"],)).lastrowid
+            
+            # 每个词取其出现字段中的最高权重
+            weights = {}
+            for field, weight in self.FIELD_WEIGHTS:
+                value = project.get(field, "")
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for term in tokenize(value):
+                    if weights.get(term, 0) < weight:
+                        weights[term] = weight
+            conn.executemany("INSERT OR REPLACE INTO postings (term, doc, weight) VALUES (?, ?, ?)",
+                             [(term, doc, weight) for term, weight in weights.items()])
+            new_terms = [term for term in weights
+                         if not conn.execute("SELECT 1 FROM terms WHERE term = ?", (term,)).fetchone()]
+            conn.executemany("INSERT INTO terms (term, length) VALUES (?, ?)",
+                             [(term, len(term)) for term in new_terms])
+            self.add_grams(conn, new_terms)
+    
+    def match_term(self, conn, token):
+        """查找一个查询词匹配的文档: 精确 > 前缀 > 拼写相近, 返回 文档 -> 得分"""
+        scores = {}
+        for term, doc, weight in conn.execute(
+                "SELECT term, doc, weight FROM postings WHERE term >= ? AND term < ?", (token, token + "\uffff")):
+            quality = 1.0 if term == token else 0.7
+            scores[doc] = max(scores.get(doc, 0), weight * quality)
+        
+        # 较长的词允许拼写错误; 每次编辑最多破坏3个二元组, 共有二元组不足的词不可能相近, 无需计算编辑距离
+        if len(token) >= 4:
+            max_distance = 2 if len(token) >= 8 else 1
+            grams = sorted(term_grams(token))
+            placeholders = ",".join("?" * len(grams))
+            candidates = conn.execute(
+                f"""SELECT term FROM grams WHERE gram IN ({placeholders}) AND length BETWEEN ? AND ?
+                    GROUP BY term HAVING COUNT(*) >= ?""",
+                grams + [len(token) - max_distance, len(token) + max_distance, len(grams) - 3 * max_distance])
+            similar = [term for (term,) in candidates
+                       if not term.startswith(token) and within_edit_distance(token, term, max_distance)]
+            for term in similar:
+                for doc, weight in conn.execute("SELECT doc, weight FROM postings WHERE term = ?", (term,)):
+                    scores[doc] = max(scores.get(doc, 0), weight * 0.5)
+        return scores
+    
+    def search(self, query, project_type, version_filter=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        """在本地索引中搜索, 返回 (结果, 总数)"""
+        conn = self.connect()
+        try:
+            tokens = tokenize(query)
+            # 版本列表以JSON保存, 带引号查找可精确匹配版本号, 无需逐个解析
+            version_needle = json.dumps(version_filter) if version_filter else None
+            if tokens:
+                combined = {}
+                matched = {}
+                for token in dict.fromkeys(tokens):
+                    for doc, score in self.match_term(conn, token).items():
+                        combined[doc] = combined.get(doc, 0) + score
+                        matched[doc] = matched.get(doc, 0) + 1
+                candidates = list(combined)
+                
+                # 读取候选项目的下载量用于排序, 类型和版本在查询中过滤
+                rows = {}
+                for i in range(0, len(candidates), 500):
+                    batch = candidates[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for doc, downloads in conn.execute(
+                            f"""SELECT doc, downloads FROM projects WHERE doc IN ({placeholders}) AND project_type = ?
+                                AND (? IS NULL OR instr(versions, ?) > 0)""",
+                            batch + [project_type, version_needle, version_needle]):
+                        rows[doc] = downloads or 0
+                
+                # 匹配的查询词越多越靠前, 其次按相关度和下载量排序
+                ranked = sorted(rows, key=lambda doc: (-matched.get(doc, 0),
+                                                       -(combined.get(doc, 0) + math.log10(rows[doc] + 1) * 0.3)))
+                page = ranked[offset:offset + limit]
+                total = len(ranked)
+            else:
+                # 没有查询词时直接按下载量分页
+                where = "WHERE project_type = ? AND (? IS NULL OR instr(versions, ?) > 0)"
+                params = (project_type, version_needle, version_needle)
+                total = conn.execute(f"SELECT COUNT(*) FROM projects {where}", params).fetchone()[0]
+                page = [doc for (doc,) in conn.execute(
+                    f"SELECT doc FROM projects {where} ORDER BY downloads DESC, doc LIMIT ? OFFSET ?",
+                    params + (limit, offset))]
+            
+            results = []
+            for doc in page:
+                (project_id, ptype, slug, title, description, versions, downloads, icon_url) = conn.execute(
+                    """SELECT project_id, project_type, slug, title, description, versions, downloads, icon_url
+                       FROM projects WHERE doc = ?""", (doc,)).fetchone()
+                results.append({
+                    "id": project_id,
+                    "name": title or "未知",
+                    "description": description or "无描述",
+                    "downloads": downloads or 0,
+                    "versions": json.loads(versions),
+                    "url": f"https://modrinth.com/{ptype}/{slug}",
+                    "slug": slug,
+                    "icon_url": icon_url or "",
+                    "source": "Modrinth"
+                })
+            return results, total
+        finally:
+            conn.close()
+    
+    def sync(self, project_types=("mod", "shader"), max_projects=20000, progress_callback=None, is_cancelled=None):
+        """从Modrinth同步目录: 首次按下载量获取, 之后按更新时间增量获取"""
+        client = ModrinthClient()
+        conn = self.connect()
+        total_synced = 0
+        try:
+            for project_type in project_types:
+                last_sync = self.get_meta(conn, f"last_modified:{project_type}")
+                index = "updated" if last_sync else "downloads"
+                newest = last_sync or ""
+                offset = 0
+                while offset < max_projects:
+                    if is_cancelled and is_cancelled():
+                        return total_synced
+                    data = client.get("/search", facets=[[f"project_type:{project_type}"]],
+                                      index=index, offset=offset, limit=100)
+                    hits = data.get("hits", [])
+                    if not hits:
+                        break
+                    
+                    fresh = [hit for hit in hits if not last_sync or hit.get("date_modified", "") > last_sync]
+                    self.upsert(conn, [dict(hit, project_type=project_type) for hit in fresh])
+                    conn.commit()
+                    
+                    for hit in fresh:
+                        newest = max(newest, hit.get("date_modified", ""))
+                    total_synced += len(fresh)
+                    offset += len(hits)
+                    if progress_callback:
+                        progress_callback(project_type, offset, data.get("total_hits", offset))
+                    
+                    # 增量同步遇到已同步过的项目即可停止
+                    if len(fresh) < len(hits) or offset >= data.get("total_hits", 0):
+                        break
+                
+                self.set_meta(conn, f"last_modified:{project_type}", newest)
+                self.set_meta(conn, "synced_at", datetime.now().isoformat(timespec='seconds'))
+                conn.commit()
+            return total_synced
+        finally:
+            conn.close()
+    
+    def export_snapshot(self, path):
+        """导出目录快照 (JSON Lines), 用于离线网络"""
+        conn = self.connect()
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for row in conn.execute("""SELECT project_id, project_type, slug, title, description, categories,
+                                           versions, downloads, icon_url, date_modified FROM projects"""):
+                    project = dict(zip(("project_id", "project_type", "slug", "title", "description", "categories",
+                                        "versions", "downloads", "icon_url", "date_modified"), row))
+                    project["categories"] = json.loads(project["categories"])
+                    project["versions"] = json.loads(project["versions"])
+                    f.write(json.dumps(project, ensure_ascii=False) + "\n")
+        finally:
+            conn.close()
+    
+    def import_snapshot(self, path):
+        """导入目录快照, 返回导入的项目数量"""
+        conn = self.connect()
+        count = 0
+        try:
+            batch = []
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        batch.append(json.loads(line))
+                    if len(batch) >= 500:
+                        self.upsert(conn, batch)
+                        count += len(batch)
+                        batch = []
+            self.upsert(conn, batch)
+            count += len(batch)
+            
+            # 快照中最新的修改时间作为增量同步的起点
+            for project_type, newest in conn.execute(
+                    "SELECT project_type, MAX(date_modified) FROM projects GROUP BY project_type"):
+                if newest and newest > self.get_meta(conn, f"last_modified:{project_type}", ""):
+                    self.set_meta(conn, f"last_modified:{project_type}", newest)
+            conn.commit()
+            return count
+        finally:
+            conn.close()
+
+# 全局离线模组目录
+mod_catalog = ModCatalog(CACHE_DIR / 'catalog.sqlite')
+
+# 离线目录同步线程
+class CatalogSyncThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "download"
+    
+    def __init__(self, catalog, snapshot_path=None):
+        super().__init__()
+        self.catalog = catalog
+        self.snapshot_path = snapshot_path
+    
+    def run(self):
+        try:
+            if self.snapshot_path:
+                count = self.catalog.import_snapshot(self.snapshot_path)
+                self.finished_signal.emit(True, f"已导入 {count} 个项目")
+                return
+            
+            count = self.catalog.sync(
+                progress_callback=lambda ptype, done, total: self.progress_signal.emit(
+                    int(100 * min(done, total) / max(total, 1)), f"同步{ptype}目录 ({done}/{total})"),
+                is_cancelled=lambda: self.stop_requested
+            )
+            self.finished_signal.emit(True, f"同步完成, 更新了 {count} 个项目")
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
+# 分页搜索状态
+class PagedSearch:
+    def __init__(self, api, query, version_filter, mod_type):
+        self.api = api
+        self.query = query
+        self.version_filter = version_filter
+        self.mod_type = mod_type
+        self.next_offset = 0
+        self.total = None
+        self.loading = False
+    
+    def has_more(self):
+        """是否还有未加载的结果"""
+        return self.total is None or self.next_offset < self.total
+
+# 搜索提供方基类
+class SearchProvider:
+    name = ""
+    # 结果是否写入搜索缓存
+    cacheable = True
+    
+    def search(self, query, mod_type, version_filter=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        """搜索一页结果, 返回 (结果, 总数); 相同的查询命中缓存或合并到进行中的请求"""
+        if not self.cacheable:
+            page = self.fetch(query, mod_type, version_filter, offset, limit)
+        else:
+            key = search_cache.make_key(self.name, query, mod_type, version_filter or "", offset, limit)
+            page = search_cache.get_or_fetch(
+                key, lambda: self.fetch(query, mod_type, version_filter, offset, limit)
+            )
+        return page["results"], page["total_hits"]
+    
+    def fetch(self, query, mod_type, version_filter, offset, limit):
+        """请求一页结果, 返回 {"results", "total_hits"}"""
+        raise NotImplementedError
+
+# Modrinth 搜索
+class ModrinthProvider(SearchProvider):
+    name = "Modrinth"
+    
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+    
+    def search(self, query, mod_type, version_filter=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        # 优先在离线目录中搜索, 目录为空或无结果时请求API
+        if self.catalog and self.catalog.count(mod_type):
+            try:
+                results, total = self.catalog.search(query, mod_type, version_filter, offset, limit)
+                if total:
+                    return results, total
+            except sqlite3.Error:
+                pass
+        return super().search(query, mod_type, version_filter, offset, limit)
+    
+    def fetch(self, query, mod_type, version_filter, offset, limit):
+        facets = [["project_type:" + mod_type]]
+        if version_filter:
+            facets.append([f"versions:{version_filter}"])
+        
+        url = f"{MODRINTH_API}/search?query={quote(query)}&facets={quote(json.dumps(facets))}&limit={limit}&offset={offset}"
+        data = http_request('GET', url, SEARCH_RETRY).json()
+        
+        results = []
+        for project in data.get("hits", []):
+            results.append({
+                "id": project.get("project_id", ""),
+                "name": project.get("title", "未知"),
+                "description": project.get("description", "无描述"),
+                "downloads": project.get("downloads", 0),
+                "versions": project.get("versions", []),
+                "url": f"https://modrinth.com/{project.get('project_type', 'mod')}/{project.get('slug', '')}",
+                "slug": project.get("slug", ""),
+                "icon_url": project.get("icon_url", ""),
+                "source": self.name
+            })
+        
+        return {"results": results, "total_hits": data.get("total_hits", len(results))}
+
+# CurseForge 搜索 (需要API密钥)
+class CurseForgeProvider(SearchProvider):
+    name = "CurseForge"
+    GAME_ID = 432
+    CLASS_IDS = {"mod": 6, "shader": 6552}
+    # CurseForge 只允许翻到第10000条结果
+    MAX_RESULTS = 10000
+    
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url or CURSEFORGE_API
+    
+    def fetch(self, query, mod_type, version_filter, offset, limit):
+        if not self.api_key:
+            raise ValueError("未配置CurseForge API密钥")
+        
+        limit = min(limit, 50, self.MAX_RESULTS - offset)
+        if limit <= 0:
+            return {"results": [], "total_hits": self.MAX_RESULTS}
+        
+        params = {
+            "gameId": self.GAME_ID,
+            "classId": self.CLASS_IDS.get(mod_type, self.CLASS_IDS["mod"]),
+            "searchFilter": query,
+            "sortField": 2,
+            "sortOrder": "desc",
+            "index": offset,
+            "pageSize": limit
+        }
+        if version_filter:
+            params["gameVersion"] = version_filter
+        
+        data = http_request(
+            'GET', f"{self.base_url}/v1/mods/search", SEARCH_RETRY, params=params,
+            headers={"x-api-key": self.api_key, "Accept": "application/json"}
+        ).json()
+        
+        results = []
+        for project in data.get("data", []):
+            versions = []
+            for file_index in project.get("latestFilesIndexes", []):
+                version = file_index.get("gameVersion")
+                if version and version not in versions:
+                    versions.append(version)
+            results.append({
+                "id": str(project.get("id", "")),
+                "name": project.get("name", "未知"),
+                "description": project.get("summary", "无描述"),
+                "downloads": int(project.get("downloadCount", 0)),
+                "versions": versions,
+                "url": (project.get("links") or {}).get("websiteUrl", "https://www.curseforge.com"),
+                "slug": project.get("slug", ""),
+                "icon_url": (project.get("logo") or {}).get("thumbnailUrl", ""),
+                "source": self.name
+            })
+        
+        total = data.get("pagination", {}).get("totalCount", offset + len(results))
+        return {"results": results, "total_hits": min(total, self.MAX_RESULTS)}
+
+# 本地目录搜索 (目录中的JSON文件, 每个文件是一个项目或项目列表)
+class LocalDirectoryProvider(SearchProvider):
+    name = "本地"
+    cacheable = False
+    
+    def __init__(self, directory):
+        # 未设置目录时不能使用 Path(""), 否则会读取当前工作目录
+        self.directory = Path(directory) if directory else None
+    
+    def load_projects(self):
+        """读取目录中的所有项目"""
+        projects = []
+        for path in sorted(self.directory.glob("*.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            projects.extend(data if isinstance(data, list) else [data])
+        return projects
+    
+    def fetch(self, query, mod_type, version_filter, offset, limit):
+        if self.directory is None or not self.directory.is_dir():
+            raise FileNotFoundError(f"目录不存在: {self.directory or '未设置'}")
+        
+        tokens = tokenize(query)
+        matches = []
+        for project in self.load_projects():
+            if project.get("project_type", "mod") != mod_type:
+                continue
+            if version_filter and version_filter not in project.get("versions", []):
+                continue
+            words = tokenize(f"{project.get('name', '')} {project.get('description', '')}")
+            if all(any(word.startswith(token) for word in words) for token in tokens):
+                matches.append(project)
+        
+        matches.sort(key=lambda project: -project.get("downloads", 0))
+        results = [{
+            "id": str(project.get("id", "")),
+            "name": project.get("name", "未知"),
+            "description": project.get("description", "无描述"),
+            "downloads": project.get("downloads", 0),
+            "versions": project.get("versions", []),
+            "url": project.get("url", ""),
+            "slug": project.get("slug", ""),
+            "icon_url": project.get("icon_url", ""),
+            "source": project.get("source", self.name)
+        } for project in matches[offset:offset + limit]]
+        return {"results": results, "total_hits": len(matches)}
+
+# 模组搜索线程 (同时查询多个提供方, 每个提供方返回后立即发送结果)
+class ModSearchThread(BackgroundTask):
+    results_signal = pyqtSignal(list, str)
+    finished_signal = pyqtSignal(str, int, int, int)
+    warning_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str)
+    pool = "search"
+    
+    def __init__(self, api, providers, query, version_filter=None, mod_type="mod", offset=0,
+                 limit=SEARCH_PAGE_SIZE, deadline=None):
+        super().__init__()
+        self.api = api
+        self.providers = providers
+        self.query = query
+        self.version_filter = version_filter
+        self.mod_type = mod_type
+        self.offset = offset
+        self.limit = limit
+        self.deadline = deadline if deadline is not None else SEARCH_DEADLINE
+    
+    def run(self):
+        if not self.providers:
+            self.error_signal.emit("没有可用的搜索源")
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=len(self.providers))
+        futures = {
+            executor.submit(provider.search, self.query, self.mod_type, self.version_filter,
+                            self.offset, self.limit): provider
+            for provider in self.providers
+        }
+        errors = []
+        answered = []
+        page_size = 0
+        total = 0
+        try:
+            # 所有提供方共用一个截止时间
+            for future in as_completed(futures, timeout=self.deadline):
+                provider = futures[future]
+                try:
+                    results, provider_total = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {str(e)}")
+                    continue
+                if self.stop_requested:
+                    return
+                
+                # 按各提供方内的名次计算融合得分, 同一项目出现在多个提供方时得分相加
+                ranked = [dict(result, score=1.0 / (SEARCH_RANK_CONSTANT + self.offset + i + 1))
+                          for i, result in enumerate(results)]
+                self.results_signal.emit(ranked, provider.name)
+                
+                answered.append((provider, provider_total))
+                page_size = max(page_size, len(results))
+                total = max(total, provider_total)
+        except FuturesTimeoutError:
+            slow = [futures[future].name for future in futures if not future.done()]
+            errors.append(f"{', '.join(slow)}: 超时")
+        finally:
+            executor.shutdown(wait=False)
+        
+        if self.stop_requested:
+            return
+        if not answered:
+            self.error_signal.emit("; ".join(errors))
+            return
+        if errors:
+            self.warning_signal.emit("; ".join(errors))
+        self.finished_signal.emit(self.api, self.offset, page_size, total)
+        
+        # 用户浏览当前页时预取下一页到缓存
+        next_offset = self.offset + self.limit
+        for provider, provider_total in answered:
+            if self.stop_requested:
+                break
+            if provider.cacheable and next_offset < provider_total:
+                try:
+                    provider.search(self.query, self.mod_type, self.version_filter, next_offset, self.limit)
+                except Exception:
+                    pass
+
+# 图标缩略图磁盘缓存 (按总大小淘汰最久未使用的文件)
+class ThumbnailCache:
+    def __init__(self, cache_dir, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+    
+    def path_for(self, url):
+        """缩略图文件路径"""
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.png"
+    
+    def load(self, url):
+        """读取缩略图, 未命中返回None"""
+        path = self.path_for(url)
+        image = QImage(str(path))
+        if image.isNull():
+            return None
+        
+        # 更新访问时间, 用于淘汰
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return image
+    
+    def store(self, url, image):
+        """保存缩略图并按大小上限清理"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path_for(url)
+            tmp_path = path.with_suffix('.tmp')
+            if image.save(str(tmp_path), "PNG"):
+                os.replace(tmp_path, path)
+        except OSError:
+            return
+        self.prune()
+    
+    def prune(self):
+        """超出大小上限时删除最久未使用的缩略图"""
+        with self.lock:
+            try:
+                files = []
+                for entry in os.scandir(self.cache_dir):
+                    if entry.name.endswith('.png'):
+                        st = entry.stat()
+                        files.append((st.st_mtime, st.st_size, entry.path))
+            except OSError:
+                return
+            
+            total = sum(size for _, size, _ in files)
+            if total <= self.max_bytes:
+                return
+            
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes * 0.8:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+# 图标加载任务 (在线程池中下载、解码和缩放)
+class IconLoadTask:
+    def __init__(self, loader, url):
+        self.loader = loader
+        self.url = url
+    
+    def run(self):
+        image = self.loader.disk_cache.load(self.url)
+        if image is None:
+            try:
+                response = http_request('GET', self.url, ICON_RETRY)
+                image = QImage()
+                image.loadFromData(response.content)
+            except Exception:
+                image = QImage()
+            
+            if not image.isNull():
+                size = self.loader.icon_size
+                image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                self.loader.disk_cache.store(self.url, image)
+        
+        self.loader.image_ready.emit(self.url, image)
+
+# 图标加载器
+class IconLoader(QObject):
+    image_ready = pyqtSignal(str, QImage)
+    icon_loaded = pyqtSignal(str)
+    
+    def __init__(self, cache_dir, icon_size=32, max_memory_items=300):
+        super().__init__()
+        self.icon_size = icon_size
+        self.max_memory_items = max_memory_items
+        self.disk_cache = ThumbnailCache(cache_dir)
+        self.icons = OrderedDict()
+        self.pending = set()
+        self.failed = set()
+        self.image_ready.connect(self.on_image_ready)
+    
+    def icon(self, url):
+        """返回已加载的图标; 未加载时开始异步加载并返回None"""
+        if not url:
+            return None
+        
+        icon = self.icons.get(url)
+        if icon is not None:
+            self.icons.move_to_end(url)
+            return icon
+        
+        if url not in self.pending and url not in self.failed:
+            self.pending.add(url)
+            task_runtime.execute("icons", IconLoadTask(self, url).run)
+        return None
+    
+    def cached_icon(self, url):
+        """只读取内存中的图标, 不触发加载"""
+        return self.icons.get(url)
+    
+    def on_image_ready(self, url, image):
+        """图片解码完成 (GUI线程)"""
+        self.pending.discard(url)
+        if image.isNull():
+            # 加载失败的地址本次运行不再重试
+            self.failed.add(url)
+        else:
+            self.icons[url] = QIcon(QPixmap.fromImage(image))
+            while len(self.icons) > self.max_memory_items:
+                self.icons.popitem(last=False)
+        
+        self.icon_loaded.emit(url)
+
+# 搜索结果列表模型 (按列存储, 角色数据按需生成, 排序和筛选在模型内完成)
+class SearchResultModel(QAbstractTableModel):
+    COLUMN_NAME, COLUMN_VERSIONS, COLUMN_DOWNLOADS = range(3)
+    
+    def __init__(self, headers, icon_loader=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.icon_loader = icon_loader
+        if icon_loader is not None:
+            icon_loader.icon_loaded.connect(self.on_icon_loaded)
+        self.reset_storage()
+    
+    def reset_storage(self):
+        """清空列存储"""
+        self.ids = []
+        self.names = []
+        self.descriptions = []
+        self.downloads = array('q')
+        self.versions = []
+        self.urls = []
+        self.icon_urls = []
+        self.sources = []
+        # 找到该项目的所有搜索源, 以及合并排名得分
+        self.providers = []
+        self.scores = array('d')
+        # 项目去重键 -> 存储行
+        self.keys = {}
+        # 相同的版本列表和来源只保存一份
+        self.shared_values = {}
+        # 图标地址 -> 使用该图标的行
+        self.icon_rows = {}
+        # 可见行 -> 存储行, 以及存储行 -> 可见行 (-1 表示被筛选掉)
+        self.order = array('l')
+        self.positions = array('l')
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.filter_text = ""
+    
+    def shared(self, value):
+        return self.shared_values.setdefault(value, value)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self.headers):
+            return self.headers[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.order):
+            return None
+        row = self.order[index.row()]
+        column = index.column()
+        
+        if role == Qt.DisplayRole:
+            if column == self.COLUMN_NAME:
+                return self.names[row]
+            if column == self.COLUMN_VERSIONS:
+                versions = self.versions[row]
+                return ", ".join(versions[:3]) if versions else "未知"
+            if column == self.COLUMN_DOWNLOADS:
+                return str(self.downloads[row])
+        elif role == Qt.DecorationRole and column == self.COLUMN_NAME:
+            # 只为可见行请求图标
+            if self.icon_loader is not None:
+                return self.icon_loader.icon(self.icon_urls[row])
+        elif role == Qt.ToolTipRole and column == self.COLUMN_NAME:
+            return f"{self.descriptions[row]}\n来源: {', '.join(self.providers[row])}"
+        elif role == Qt.UserRole:
+            return self.row_data(row)
+        return None
+    
+    def row_data(self, row):
+        """存储行的完整数据"""
+        return {
+            "id": self.ids[row],
+            "name": self.names[row],
+            "description": self.descriptions[row],
+            "downloads": self.downloads[row],
+            "versions": list(self.versions[row]),
+            "url": self.urls[row],
+            "icon_url": self.icon_urls[row],
+            "source": self.sources[row]
+        }
+    
+    def clear(self):
+        """清空所有结果, 保留当前排序方式"""
+        sort_column, sort_order = self.sort_column, self.sort_order
+        self.beginResetModel()
+        self.reset_storage()
+        self.sort_column, self.sort_order = sort_column, sort_order
+        self.endResetModel()
+    
+    @staticmethod
+    def dedupe_keys(data, source):
+        """项目的去重键: (搜索源, ID), 以及项目的 slug (用于归并不同搜索源中的同一项目)"""
+        keys = [("id", source, data["id"])]
+        slug = (data.get("slug") or "").lower()
+        if slug:
+            keys.append(("slug", slug))
+        return keys
+    
+    def find_row(self, keys, source):
+        """已有的同一项目所在的行; 按 slug 只归并其他搜索源的行, 同一搜索源的不同项目不归并"""
+        row = self.keys.get(keys[0])
+        if row is not None:
+            return row
+        for key in keys[1:]:
+            row = self.keys.get(key)
+            if row is not None and source not in self.providers[row]:
+                return row
+        return None
+    
+    def append(self, results):
+        """追加结果; 已有的项目合并得分, 优先保留可直接下载的Modrinth条目"""
+        first = len(self.ids)
+        merged = False
+        for data in results:
+            source = data.get("source", "Modrinth")
+            keys = self.dedupe_keys(data, source)
+            row = self.find_row(keys, source)
+            if row is not None:
+                for key in keys:
+                    self.keys.setdefault(key, row)
+                if source not in self.providers[row]:
+                    self.providers[row] = self.shared(self.providers[row] + (source,))
+                self.scores[row] += data.get("score", 0.0)
+                self.downloads[row] = max(self.downloads[row], int(data["downloads"] or 0))
+                if source == "Modrinth" and self.sources[row] != "Modrinth":
+                    self.ids[row] = data["id"]
+                    self.urls[row] = data["url"]
+                    self.sources[row] = self.shared(source)
+                if self.positions[row] >= 0:
+                    top_left = self.index(self.positions[row], 0)
+                    bottom_right = self.index(self.positions[row], len(self.headers) - 1)
+                    self.dataChanged.emit(top_left, bottom_right)
+                merged = True
+                continue
+            
+            row = len(self.ids)
+            for key in keys:
+                self.keys.setdefault(key, row)
+            self.ids.append(data["id"])
+            self.names.append(data["name"])
+            self.descriptions.append(data["description"])
+            self.downloads.append(int(data["downloads"] or 0))
+            self.versions.append(self.shared(tuple(data["versions"] or ())))
+            self.urls.append(data["url"])
+            self.icon_urls.append(data["icon_url"])
+            self.sources.append(self.shared(source))
+            self.providers.append(self.shared((source,)))
+            self.scores.append(data.get("score", 0.0))
+            self.positions.append(-1)
+            if data["icon_url"]:
+                self.icon_rows.setdefault(data["icon_url"], []).append(row)
+        
+        # 新行先追加到末尾, 再按排序方式调整位置
+        visible = [row for row in range(first, len(self.ids)) if self.matches(row)]
+        if visible:
+            start = len(self.order)
+            self.beginInsertRows(QModelIndex(), start, start + len(visible) - 1)
+            for position, row in enumerate(visible, start):
+                self.order.append(row)
+                self.positions[row] = position
+            self.endInsertRows()
+        
+        if visible or merged:
+            self.sort(self.sort_column, self.sort_order)
+    
+    def matches(self, row):
+        """存储行是否符合筛选条件"""
+        if not self.filter_text:
+            return True
+        return (self.filter_text in self.names[row].lower()
+                or self.filter_text in self.descriptions[row].lower())
+    
+    def set_filter(self, text):
+        """按名称或描述筛选"""
+        text = text.strip().lower()
+        if text == self.filter_text:
+            return
+        self.beginResetModel()
+        self.filter_text = text
+        self.order = array('l', (row for row in range(len(self.ids)) if self.matches(row)))
+        self.apply_sort()
+        self.endResetModel()
+    
+    def sort_key(self, column):
+        """排序列对应的键函数"""
+        if column == self.COLUMN_NAME:
+            return lambda row: self.names[row].lower()
+        if column == self.COLUMN_VERSIONS:
+            return lambda row: self.versions[row][:1]
+        if column == self.COLUMN_DOWNLOADS:
+            return lambda row: self.downloads[row]
+        # 无排序列时按合并排名得分, 得分相同时保持结果原始顺序
+        return None
+    
+    def apply_sort(self):
+        """按当前排序方式重排可见行, 并更新反向映射"""
+        key = self.sort_key(self.sort_column)
+        if key is None:
+            self.order = array('l', sorted(self.order, key=lambda row: (-self.scores[row], row)))
+        else:
+            self.order = array('l', sorted(self.order, key=key, reverse=self.sort_order == Qt.DescendingOrder))
+        for row in range(len(self.positions)):
+            self.positions[row] = -1
+        for position, row in enumerate(self.order):
+            self.positions[row] = position
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        old_rows = [self.order[index.row()] for index in old_persistent]
+        
+        self.sort_column = column
+        self.sort_order = order
+        self.apply_sort()
+        
+        # 保持选中项等持久索引指向同一行数据
+        new_persistent = [self.index(self.positions[row], index.column())
+                          for row, index in zip(old_rows, old_persistent)]
+        self.changePersistentIndexList(old_persistent, new_persistent)
+        self.layoutChanged.emit()
+    
+    def on_icon_loaded(self, url):
+        """图标加载完成, 刷新使用该图标的可见行"""
+        for row in self.icon_rows.get(url, ()):
+            position = self.positions[row]
+            if position >= 0:
+                index = self.index(position, self.COLUMN_NAME)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+# Modrinth API 客户端
+class ModrinthClient:
+    def __init__(self, base_url=None):
+        self.base_url = base_url or MODRINTH_API
+    
+    def get(self, path, **params):
+        """发送GET请求, 列表参数按JSON编码"""
+        query = {k: json.dumps(v) if isinstance(v, (list, tuple)) else v
+                 for k, v in params.items() if v is not None}
+        return http_request('GET', f"{self.base_url}{path}", params=query).json()
+    
+    def project_versions(self, project_id, game_version=None, loaders=None):
+        """获取项目适用于指定游戏版本和加载器的版本 (新版本在前)"""
+        return self.get(
+            f"/project/{project_id}/version",
+            game_versions=[game_version] if game_version else None,
+            loaders=loaders or None
+        )
+    
+    def versions(self, ids):
+        """批量获取版本信息"""
+        return self.get_batch("/versions", ids)
+    
+    def projects(self, ids):
+        """批量获取项目信息"""
+        return self.get_batch("/projects", ids)
+    
+    def post(self, path, body):
+        """发送POST请求"""
+        return http_request('POST', f"{self.base_url}{path}", json=body, timeout=30).json()
+    
+    def version_files(self, hashes, algorithm='sha1'):
+        """按文件哈希批量查询对应的版本"""
+        return self.post("/version_files", {"hashes": list(hashes), "algorithm": algorithm})
+    
+    def latest_versions(self, hashes, loaders=None, game_versions=None, algorithm='sha1'):
+        """按文件哈希批量查询适用于指定加载器和游戏版本的最新版本"""
+        body = {"hashes": list(hashes), "algorithm": algorithm}
+        if loaders:
+            body["loaders"] = loaders
+        if game_versions:
+            body["game_versions"] = game_versions
+        return self.post("/version_files/update", body)
+    
+    def get_batch(self, path, ids, batch_size=100):
+        """按批次请求, 避免URL过长"""
+        ids = list(ids)
+        results = []
+        for i in range(0, len(ids), batch_size):
+            results.extend(self.get(path, ids=ids[i:i + batch_size]))
+        return results
+    
+    @staticmethod
+    def pick_version(versions):
+        """优先选择正式版, 否则选择最新版本"""
+        for version in versions:
+            if version.get('version_type') == 'release':
+                return version
+        return versions[0] if versions else None
+    
+    @staticmethod
+    def primary_file(version):
+        """版本的主文件"""
+        files = version.get('files', [])
+        for f in files:
+            if f.get('primary'):
+                return f
+        return files[0] if files else None
+
+def safe_join(root, relative_path):
+    """拼接相对路径, 拒绝跳出根目录的路径"""
+    root = Path(root).resolve()
+    target = (root / relative_path).resolve()
+    if target != root and root not in target.parents:
+        raise Exception(f"非法路径: {relative_path}")
+    return target
+
+# 模组安装线程 (解析依赖并并行下载)
+class ModInstallThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "download"
+    
+    def __init__(self, project_id, game_version, loaders, target_dir, resolve_dependencies=True):
+        super().__init__()
+        self.project_id = project_id
+        self.game_version = game_version
+        self.loaders = loaders
+        self.target_dir = Path(target_dir)
+        self.resolve_dependencies = resolve_dependencies
+        self.client = ModrinthClient()
+    
+    def run(self):
+        try:
+            self.progress_signal.emit(0, "解析版本")
+            versions = self.client.project_versions(self.project_id, self.game_version, self.loaders)
+            root = self.client.pick_version(versions)
+            if root is None:
+                loader_text = "/".join(self.loaders) if self.loaders else "任意加载器"
+                raise Exception(f"没有适用于 {self.game_version} ({loader_text}) 的版本")
+            
+            selected = {root['project_id']: root}
+            if self.resolve_dependencies:
+                self.resolve(selected)
+            
+            # 构建下载任务, 跳过已存在且校验通过的文件
+            tasks = []
+            for version in selected.values():
+                f = ModrinthClient.primary_file(version)
+                if f is None:
+                    self.log_signal.emit(f"版本 {version.get('name', version['id'])} 没有可下载的文件")
+                    continue
+                hashes = f.get('hashes', {})
+                # 文件名来自API, 不能写到目标目录之外
+                task = DownloadTask(f['url'], safe_join(self.target_dir, f['filename']),
+                                    sha1=hashes.get('sha1'), sha512=hashes.get('sha512'), size=f.get('size'))
+                if task.is_valid():
+                    self.log_signal.emit(f"已存在, 跳过: {f['filename']}")
+                    continue
+                tasks.append(task)
+            
+            self.log_signal.emit(f"共 {len(selected)} 个项目, 需要下载 {len(tasks)} 个文件")
+            downloader = ParallelDownloader(
+                progress_callback=self.on_file_done, is_cancelled=lambda: self.stop_requested
+            )
+            failures = downloader.run(tasks)
+            for task, error in failures:
+                self.log_signal.emit(f"下载失败: {task.path.name}: {error}")
+            
+            if self.stop_requested:
+                self.finished_signal.emit(False, "下载被取消")
+            elif failures:
+                self.finished_signal.emit(False, f"{len(failures)} 个文件下载失败")
+            else:
+                self.progress_signal.emit(100, "安装完成")
+                self.finished_signal.emit(True, f"已安装 {len(selected)} 个项目")
+        except Exception as e:
+            self.log_signal.emit(f"模组安装错误: {str(e)}")
+            self.finished_signal.emit(False, str(e))
+    
+    def resolve(self, selected):
+        """按层广度优先解析必需依赖, 每层批量请求"""
+        level = list(selected.values())
+        depth = 0
+        while level and not self.stop_requested:
+            depth += 1
+            version_ids = set()
+            project_ids = set()
+            for version in level:
+                for dep in version.get('dependencies', []):
+                    if dep.get('dependency_type') != 'required':
+                        continue
+                    if dep.get('project_id') in selected:
+                        continue
+                    if dep.get('version_id'):
+                        version_ids.add(dep['version_id'])
+                    elif dep.get('project_id'):
+                        project_ids.add(dep['project_id'])
+            
+            if not version_ids and not project_ids:
+                break
+            
+            self.progress_signal.emit(min(5 * depth, 40), f"解析依赖 (第{depth}层)")
+            
+            # 指定了版本的依赖一次批量获取, 只指定项目的依赖并行查询适用版本
+            found = []
+            if version_ids:
+                found.extend(self.client.versions(version_ids))
+            if project_ids:
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    futures = {executor.submit(self.client.project_versions, pid, self.game_version, self.loaders): pid
+                               for pid in project_ids}
+                    for future in as_completed(futures):
+                        version = ModrinthClient.pick_version(future.result())
+                        if version is None:
+                            self.log_signal.emit(f"依赖 {futures[future]} 没有适用的版本, 已跳过")
+                        else:
+                            found.append(version)
+            
+            # 批量获取项目信息, 跳过仅服务端的依赖
+            new_versions = [v for v in found if v['project_id'] not in selected]
+            projects = {p['id']: p for p in self.client.projects({v['project_id'] for v in new_versions})}
+            
+            level = []
+            for version in new_versions:
+                project = projects.get(version['project_id'], {})
+                if project.get('client_side') == 'unsupported' or version['project_id'] in selected:
+                    continue
+                selected[version['project_id']] = version
+                level.append(version)
+                self.log_signal.emit(f"依赖: {project.get('title', version['project_id'])} {version.get('version_number', '')}")
+    
+    def on_file_done(self, done, total, task):
+        """单个文件下载完成"""
+        self.progress_signal.emit(50 + int(50 * done / total), f"下载文件 ({done}/{total})")
+
+# 模组更新检查线程
+class ModUpdateCheckThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    result_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    pool = "search"
     
-    def __init__(self, version_id, minecraft_dir, java_path, username, memory):
+    def __init__(self, mods_dir, game_version, loaders):
         super().__init__()
-        self.version_id = version_id
-        self.minecraft_dir = minecraft_dir
-        self.java_path = java_path
-        self.username = username
-        self.memory = memory
+        self.mods_dir = Path(mods_dir)
+        self.game_version = game_version
+        self.loaders = loaders
+        self.client = ModrinthClient()
     
     def run(self):
         try:
-            # 读取版本JSON
-            version_dir = self.minecraft_dir / 'versions' / self.version_id
-            json_path = version_dir / f"{self.version_id}.json"
-            
-            with open(json_path, 'r') as f:
-                version_data = json.load(f)
-            
-            # 构建Java命令
-            cmd = [self.java_path]
+            jars = sorted(str(p) for p in self.mods_dir.glob('*.jar'))
+            if not jars:
+                self.result_signal.emit([])
+                return
             
-            # 添加JVM参数
-            if self.memory:
-                cmd.extend([f"-Xmx{self.memory}M", f"-Xms{self.memory}M"])
+            # 计算所有模组的哈希 (未变化的文件读取缓存)
+            hashes = file_hash_cache.hash_files(
+                jars, 'sha1',
+                lambda done, total: self.progress_signal.emit(int(60 * done / max(total, 1)), f"计算哈希 ({done}/{total})")
+            )
+            path_by_hash = {digest: path for path, digest in hashes.items()}
             
-            # 添加库路径
-            libraries = []
-            libraries_dir = self.minecraft_dir / 'libraries'
+            # 当前版本和最新版本两个批量请求同时发送
+            self.progress_signal.emit(70, "查询更新")
+            game_versions = [self.game_version] if self.game_version else None
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                current_future = executor.submit(self.client.version_files, path_by_hash)
+                latest_future = executor.submit(self.client.latest_versions, path_by_hash, self.loaders, game_versions)
+                current = current_future.result()
+                latest = latest_future.result()
             
-            for lib in version_data['libraries']:
-                # 检查库规则
-                if 'rules' in lib:
-                    allow = False
-                    for rule in lib['rules']:
-                        if rule['action'] == 'allow':
-                            if 'os' in rule:
-                                if rule['os']['name'] == platform.system().lower():
-                                    allow = True
-                                else:
-                                    allow = False
-                            else:
-                                allow = True
-                        elif rule['action'] == 'disallow':
-                            if 'os' in rule and rule['os']['name'] == platform.system().lower():
-                                allow = False
-                    
-                    if not allow:
-                        continue
-                
-                # 添加库路径
-                if 'downloads' in lib and 'artifact' in lib['downloads']:
-                    lib_path = libraries_dir / lib['downloads']['artifact']['path']
-                elif 'name' in lib:
-                    # 旧版本格式
-                    group_id, artifact_id, version = lib['name'].split(':')
-                    lib_path = libraries_dir / group_id.replace('.', '/') / artifact_id / version / f"{artifact_id}-{version}.jar"
+            updates = []
+            for digest, new_version in latest.items():
+                new_file = ModrinthClient.primary_file(new_version)
+                if new_file is None or new_file.get('hashes', {}).get('sha1') == digest:
+                    continue
+                # 已是更新的文件 (例如同一版本的其他文件) 也跳过
+                old_version = current.get(digest, {})
+                if old_version.get('id') == new_version.get('id'):
+                    continue
                 
-                if lib_path.exists():
-                    libraries.append(str(lib_path))
+                path = path_by_hash[digest]
+                updates.append({
+                    "path": path,
+                    "filename": os.path.basename(path),
+                    "project_id": new_version.get('project_id', ''),
+                    "current_version": old_version.get('version_number', '未知'),
+                    "new_version": new_version.get('version_number', ''),
+                    "file": new_file
+                })
             
-            # 添加客户端JAR
-            client_jar = version_dir / f"{self.version_id}.jar"
-            if not client_jar.exists():
-                raise Exception(f"客户端JAR不存在: {client_jar}")
+            updates.sort(key=lambda u: u["filename"].lower())
+            self.progress_signal.emit(100, "检查完成")
+            self.result_signal.emit(updates)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+# 模组更新线程 (并行下载新版本并替换旧文件)
+class ModUpdateApplyThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "download"
+    
+    def __init__(self, updates, mods_dir):
+        super().__init__()
+        self.updates = updates
+        self.mods_dir = Path(mods_dir)
+    
+    def run(self):
+        try:
+            tasks = {}
+            for update in self.updates:
+                f = update["file"]
+                hashes = f.get('hashes', {})
+                task = DownloadTask(f['url'], safe_join(self.mods_dir, f['filename']),
+                                    sha1=hashes.get('sha1'), sha512=hashes.get('sha512'), size=f.get('size'))
+                tasks[id(task)] = (task, update)
             
-            # 构建类路径
-            classpath = os.pathsep.join(libraries + [str(client_jar)])
-            cmd.extend(["-cp", classpath])
+            downloader = ParallelDownloader(
+                progress_callback=lambda done, total, task: self.progress_signal.emit(
+                    int(100 * done / total), f"更新模组 ({done}/{total})"),
+                is_cancelled=lambda: self.stop_requested
+            )
+            failures = downloader.run([task for task, _ in tasks.values()])
+            failed = {id(task) for task, _ in failures}
+            for task, error in failures:
+                self.log_signal.emit(f"更新失败: {task.path.name}: {error}")
             
-            # 添加主类
-            main_class = version_data['mainClass']
-            cmd.append(main_class)
+            # 新文件下载成功后删除旧文件
+            for key, (task, update) in tasks.items():
+                if key in failed:
+                    continue
+                old_path = Path(update["path"])
+                if old_path != task.path and old_path.exists():
+                    os.remove(old_path)
+                self.log_signal.emit(f"已更新: {update['filename']} -> {task.path.name}")
             
-            # 添加游戏参数
-            if 'arguments' in version_data and 'game' in version_data['arguments']:
-                for arg in version_data['arguments']['game']:
-                    if isinstance(arg, str):
-                        # 替换占位符
-                        arg = arg.replace("${auth_player_name}", self.username)
-                        arg = arg.replace("${version_name}", self.version_id)
-                        arg = arg.replace("${game_directory}", str(self.minecraft_dir))
-                        arg = arg.replace("${assets_root}", str(self.minecraft_dir / 'assets'))
-                        arg = arg.replace("${assets_index_name}", version_data['assetIndex']['id'])
-                        arg = arg.replace("${auth_uuid}", str(uuid4()))
-                        arg = arg.replace("${auth_access_token}", "token")
-                        arg = arg.replace("${user_properties}", "{}")
-                        arg = arg.replace("${user_type}", "mojang")
-                        
-                        cmd.append(arg)
+            if failures:
+                self.finished_signal.emit(False, f"{len(failures)} 个模组更新失败")
             else:
-                # 旧版本参数
-                cmd.extend([
-                    "--username", self.username,
-                    "--version", self.version_id,
-                    "--gameDir", str(self.minecraft_dir),
-                    "--assetsDir", str(self.minecraft_dir / 'assets'),
-                    "--assetIndex", version_data['assetIndex']['id'],
-                    "--uuid", str(uuid4()),
-                    "--accessToken", "token",
-                    "--userProperties", "{}",
-                    "--userType", "mojang"
-                ])
-            
-            self.log_signal.emit(f"启动命令: {' '.join(cmd)}")
-            
-            # 启动游戏 - 隐藏命令提示符窗口
-            if platform.system() == "Windows":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = 0  # SW_HIDE
-                process = subprocess.Popen(
-                    cmd,
-                    cwd=str(self.minecraft_dir),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                    startupinfo=startupinfo,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
+                self.finished_signal.emit(True, f"已更新 {len(tasks)} 个模组")
+        except Exception as e:
+            self.log_signal.emit(f"模组更新错误: {str(e)}")
+            self.finished_signal.emit(False, str(e))
+
+# 模组更新对话框
+class ModUpdateDialog(QDialog):
+    def __init__(self, updates, parent=None):
+        super().__init__(parent)
+        self.updates = updates
+        self.setWindowTitle("模组更新")
+        self.resize(700, 450)
+        
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"发现 {len(updates)} 个可用更新:"))
+        
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["文件", "当前版本", "最新版本"])
+        for update in updates:
+            item = QTreeWidgetItem(self.tree)
+            item.setText(0, update["filename"])
+            item.setText(1, update["current_version"])
+            item.setText(2, update["new_version"])
+            item.setCheckState(0, Qt.Checked)
+        self.tree.resizeColumnToContents(0)
+        layout.addWidget(self.tree)
+        
+        btn_layout = QHBoxLayout()
+        update_btn = RoundedButton("更新所选", bg_color="#388E3C")
+        update_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(update_btn)
+        
+        cancel_btn = RoundedButton("关闭", bg_color="#5A7FB5")
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+    
+    def selected_updates(self):
+        """勾选的更新"""
+        return [update for i, update in enumerate(self.updates)
+                if self.tree.topLevelItem(i).checkState(0) == Qt.Checked]
+
+def parse_mods_toml(text):
+    """解析 mods.toml, 没有 tomllib 时使用简单的逐行解析"""
+    if tomllib is not None:
+        try:
+            return tomllib.loads(text)
+        except tomllib.TOMLDecodeError:
+            pass
+    
+    data = {}
+    current = data
+    in_multiline = None
+    for line in text.splitlines():
+        line = line.strip()
+        # 跳过多行字符串 (通常是描述)
+        if in_multiline:
+            if in_multiline in line:
+                in_multiline = None
+            continue
+        if not line or line.startswith('#'):
+            continue
+        
+        table = re.match(r'^\[\[\s*([^\]]+?)\s*\]\]', line)
+        if table:
+            parent = data
+            keys = [k.strip('"') for k in table.group(1).split('.')]
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, {})
+            current = {}
+            parent.setdefault(keys[-1], []).append(current)
+            continue
+        table = re.match(r'^\[\s*([^\]]+?)\s*\]', line)
+        if table:
+            current = data
+            for key in table.group(1).split('.'):
+                current = current.setdefault(key.strip('"'), {})
+            continue
+        
+        pair = re.match(r'^([\w.-]+)\s*=\s*(.*)$', line)
+        if not pair:
+            continue
+        value = pair.group(2)
+        for quote_mark in ('"""', "'''"):
+            if value.startswith(quote_mark):
+                if value.count(quote_mark) < 2:
+                    in_multiline = quote_mark
+                value = value[3:value.find(quote_mark, 3)] if value.count(quote_mark) >= 2 else ''
+                break
+        else:
+            if value[:1] in ('"', "'"):
+                end = value.find(value[0], 1)
+                value = value[1:end] if end > 0 else value[1:]
             else:
-                # 对于非Windows系统，使用常规方式启动
-                process = subprocess.Popen(
-                    cmd,
-                    cwd=str(self.minecraft_dir),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True
-                )
+                value = value.split('#', 1)[0].strip()
+                if value in ('true', 'false'):
+                    value = value == 'true'
+        current[pair.group(1)] = value
+    return data
+
+def read_jar_manifest(zf):
+    """读取 MANIFEST.MF 中的属性"""
+    try:
+        text = zf.read('META-INF/MANIFEST.MF').decode('utf-8', 'replace')
+    except KeyError:
+        return {}
+    attributes = {}
+    for line in text.splitlines():
+        if ':' in line:
+            key, value = line.split(':', 1)
+            attributes[key.strip()] = value.strip()
+    return attributes
+
+def read_mod_metadata(zf, depth=0):
+    """从jar的中央目录直接读取模组元数据, 不解压整个文件"""
+    names = set(zf.namelist())
+    mods = []
+    
+    if 'fabric.mod.json' in names:
+        info = json.loads(zf.read('fabric.mod.json').decode('utf-8', 'replace'), strict=False)
+        depends = info.get('depends', {})
+        mod = {
+            "mod_id": info.get('id', ''),
+            "name": info.get('name') or info.get('id', ''),
+            "version": str(info.get('version', '')),
+            "loader": "fabric",
+            "dependencies": [{"id": dep, "version": str(ver), "required": True} for dep, ver in depends.items()],
+            "provides": list(info.get('provides', []))
+        }
+        # 内嵌的jar (jar-in-jar) 也算作已提供的模组
+        if depth == 0:
+            for nested in info.get('jars', []):
+                mod["provides"].extend(read_nested_mod_ids(zf, nested.get('file', ''), depth))
+        mods.append(mod)
+    
+    if 'quilt.mod.json' in names:
+        info = json.loads(zf.read('quilt.mod.json').decode('utf-8', 'replace'), strict=False).get('quilt_loader', {})
+        dependencies = []
+        for dep in info.get('depends', []):
+            if isinstance(dep, str):
+                dependencies.append({"id": dep, "version": "*", "required": True})
+            else:
+                dependencies.append({"id": dep.get('id', ''), "version": str(dep.get('versions', '*')),
+                                     "required": not dep.get('optional', False)})
+        provides = [p if isinstance(p, str) else p.get('id', '') for p in info.get('provides', [])]
+        if depth == 0:
+            for nested in info.get('jars', []):
+                provides.extend(read_nested_mod_ids(zf, nested, depth))
+        mods.append({
+            "mod_id": info.get('id', ''),
+            "name": info.get('metadata', {}).get('name') or info.get('id', ''),
+            "version": str(info.get('version', '')),
+            "loader": "quilt",
+            "dependencies": dependencies,
+            "provides": provides
+        })
+    
+    for toml_name, loader in (('META-INF/neoforge.mods.toml', 'neoforge'), ('META-INF/mods.toml', 'forge')):
+        if toml_name not in names:
+            continue
+        info = parse_mods_toml(zf.read(toml_name).decode('utf-8', 'replace'))
+        manifest = None
+        for entry in info.get('mods', []):
+            mod_id = entry.get('modId', '')
+            version = str(entry.get('version', ''))
+            if version.startswith('${'):
+                if manifest is None:
+                    manifest = read_jar_manifest(zf)
+                version = manifest.get('Implementation-Version', version)
+            dependencies = []
+            for dep in info.get('dependencies', {}).get(mod_id, []):
+                required = dep.get('mandatory', str(dep.get('type', 'required')).lower() == 'required')
+                dependencies.append({"id": dep.get('modId', ''), "version": str(dep.get('versionRange', '*')),
+                                     "required": bool(required)})
+            mods.append({
+                "mod_id": mod_id,
+                "name": entry.get('displayName') or mod_id,
+                "version": version,
+                "loader": loader,
+                "dependencies": dependencies,
+                "provides": []
+            })
+        break
+    
+    if 'mcmod.info' in names and not mods:
+        info = json.loads(zf.read('mcmod.info').decode('utf-8', 'replace'), strict=False)
+        if isinstance(info, dict):
+            info = info.get('modList', [])
+        for entry in info:
+            dependencies = [{"id": dep.split('@', 1)[0], "version": dep.split('@', 1)[1] if '@' in dep else '*',
+                             "required": True} for dep in entry.get('requiredMods', [])]
+            mods.append({
+                "mod_id": entry.get('modid', ''),
+                "name": entry.get('name') or entry.get('modid', ''),
+                "version": str(entry.get('version', '')),
+                "loader": "forge",
+                "dependencies": dependencies,
+                "provides": []
+            })
+    
+    return mods
+
+def read_nested_mod_ids(zf, nested_name, depth):
+    """读取内嵌jar中的模组ID"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(zf.read(nested_name))) as nested:
+            ids = []
+            for mod in read_mod_metadata(nested, depth + 1):
+                ids.append(mod["mod_id"])
+                ids.extend(mod["provides"])
+            return ids
+    except (KeyError, zipfile.BadZipFile, ValueError):
+        return []
+
+# 已安装模组索引 (SQLite缓存, 按文件大小和修改时间增量更新)
+class InstalledModIndex:
+    # 由游戏或加载器本身提供的依赖
+    BUILTIN_IDS = {"minecraft", "java", "fabricloader", "fabric-loader", "quilt_loader",
+                   "forge", "neoforge", "fml", "javafml", "mcp", "lowcodefml"}
+    
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+    
+    def connect(self):
+        """打开数据库 (每个线程使用自己的连接)"""
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("""CREATE TABLE IF NOT EXISTS jars (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime INTEGER,
+            mods TEXT
+        )""")
+        return conn
+    
+    def refresh(self, mods_dir):
+        """扫描模组目录, 只重新解析变化的jar, 返回所有已安装模组"""
+        conn = self.connect()
+        try:
+            cached = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime, mods FROM jars")}
             
-            # 输出游戏日志
-            for line in process.stdout:
-                self.log_signal.emit(line.strip())
+            seen = set()
+            changed = []
+            try:
+                entries = list(os.scandir(mods_dir))
+            except OSError:
+                entries = []
+            for entry in entries:
+                if not entry.name.endswith('.jar') or not entry.is_file():
+                    continue
+                st = entry.stat()
+                seen.add(entry.path)
+                row = cached.get(entry.path)
+                if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+                    changed.append((entry.path, st))
             
-            process.wait()
+            # 解析变化的jar
+            for path, st in changed:
+                try:
+                    with zipfile.ZipFile(path) as zf:
+                        mods = read_mod_metadata(zf)
+                except (OSError, zipfile.BadZipFile, ValueError, KeyError):
+                    mods = []
+                mods_json = json.dumps(mods, ensure_ascii=False)
+                conn.execute("INSERT OR REPLACE INTO jars (path, size, mtime, mods) VALUES (?, ?, ?, ?)",
+                             (path, st.st_size, st.st_mtime_ns, mods_json))
+                cached[path] = (st.st_size, st.st_mtime_ns, mods_json)
             
-            if process.returncode == 0:
-                self.finished_signal.emit(True, "游戏正常退出")
-            else:
-                self.finished_signal.emit(False, f"游戏异常退出，代码: {process.returncode}")
-                
-        except Exception as e:
-            self.log_signal.emit(f"启动错误: {str(e)}")
-            self.finished_signal.emit(False, str(e))
+            # 删除已不存在的文件
+            removed = [(path,) for path in cached if path not in seen]
+            conn.executemany("DELETE FROM jars WHERE path = ?", removed)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        installed = []
+        for path in sorted(seen, key=lambda p: os.path.basename(p).lower()):
+            mods = json.loads(cached[path][2])
+            if not mods:
+                installed.append({"path": path, "filename": os.path.basename(path), "mod_id": "",
+                                  "name": os.path.basename(path), "version": "", "loader": "",
+                                  "dependencies": [], "provides": []})
+            for mod in mods:
+                installed.append(dict(mod, path=path, filename=os.path.basename(path)))
+        return installed
+    
+    @classmethod
+    def find_issues(cls, installed):
+        """检查重复的模组和缺少的必需依赖, 返回 路径 -> 问题列表"""
+        issues = {}
+        jars_by_id = {}
+        available = set(cls.BUILTIN_IDS)
+        for mod in installed:
+            if mod["mod_id"]:
+                jars_by_id.setdefault(mod["mod_id"], set()).add(mod["path"])
+                available.add(mod["mod_id"].lower())
+            available.update(p.lower() for p in mod["provides"])
+        
+        for mod_id, paths in jars_by_id.items():
+            if len(paths) > 1:
+                for path in paths:
+                    others = ", ".join(sorted(os.path.basename(p) for p in paths if p != path))
+                    issues.setdefault(path, []).append(f"重复: {mod_id} (另见 {others})")
+        
+        for mod in installed:
+            missing = [dep["id"] for dep in mod["dependencies"]
+                       if dep["required"] and dep["id"] and dep["id"].lower() not in available]
+            if missing:
+                issues.setdefault(mod["path"], []).append(f"缺少依赖: {', '.join(missing)}")
+        return issues
 
-# 模组搜索线程
-class ModSearchThread(QThread):
-    finished_signal = pyqtSignal(list, str)
+# 已安装模组扫描线程
+class ModIndexThread(BackgroundTask):
+    result_signal = pyqtSignal(list, dict)
     error_signal = pyqtSignal(str)
+    pool = "scan"
     
-    def __init__(self, api, query, version_filter=None, mod_type="mod"):
+    def __init__(self, index, mods_dir):
         super().__init__()
-        self.api = api
-        self.query = query
-        self.version_filter = version_filter
-        self.mod_type = mod_type
+        self.index = index
+        self.mods_dir = mods_dir
     
     def run(self):
         try:
-            if self.api == "CurseForge":
-                results = self.search_curseforge()
-            else:  # Modrinth
-                results = self.search_modrinth()
-            
-            self.finished_signal.emit(results, self.api)
+            installed = self.index.refresh(self.mods_dir)
+            self.result_signal.emit(installed, InstalledModIndex.find_issues(installed))
         except Exception as e:
             self.error_signal.emit(str(e))
+
+# Modrinth 整合包 (.mrpack) 导入线程
+class ModpackImportThread(BackgroundTask):
+    progress_signal = pyqtSignal(int, str)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+    pool = "download"
     
-    def search_curseforge(self):
-        # CurseForge API需要密钥，这里使用模拟数据
-        return [
-            {
-                "id": f"cf-{i}",
-                "name": f"示例CurseForge模组 {i}",
-                "description": "这是一个示例模组描述",
-                "downloads": 1000 + i * 100,
-                "versions": ["1.12.2", "1.16.5", "1.18.2"],
-                "url": "https://www.curseforge.com",
-                "icon_url": ""
-            } for i in range(1, 6)
-        ]
+    # 整合包依赖中的加载器
+    LOADER_KEYS = ("fabric-loader", "quilt-loader", "forge", "neoforge")
+    
+    def __init__(self, pack_path, minecraft_dir, mirrors, current_mirror, java_path="java"):
+        super().__init__()
+        self.pack_path = Path(pack_path)
+        self.minecraft_dir = Path(minecraft_dir)
+        self.mirrors = mirrors
+        self.current_mirror = current_mirror
+        self.java_path = java_path
     
-    def search_modrinth(self):
+    def run(self):
         try:
-            # 构建查询参数
-            facets = [["project_type:" + self.mod_type]]
-            if self.version_filter:
-                facets.append([f"versions:{self.version_filter}"])
+            with zipfile.ZipFile(self.pack_path) as zf:
+                # 直接从压缩包中读取索引
+                index = json.loads(zf.read('modrinth.index.json').decode('utf-8'))
+                if index.get('game') != 'minecraft':
+                    raise Exception(f"不支持的整合包类型: {index.get('game')}")
+                
+                name = index.get('name', self.pack_path.stem)
+                dependencies = index.get('dependencies', {})
+                game_version = dependencies.get('minecraft')
+                self.log_signal.emit(f"导入整合包: {name} {index.get('versionId', '')} (Minecraft {game_version})")
+                
+                # 准备游戏版本
+                self.progress_signal.emit(5, "准备游戏版本")
+                self.prepare_version(game_version, dependencies)
+                
+                # 构建下载任务, 跳过本地已有且校验通过的文件; 覆盖文件优先于下载的文件, 同路径的文件不下载
+                overrides = self.override_entries(zf)
+                tasks = self.collect_tasks(index.get('files', []), {target for _, target in overrides})
+                self.log_signal.emit(f"整合包共 {len(index.get('files', []))} 个文件, 需要下载 {len(tasks)} 个")
+                
+                # 下载文件的同时流式解压覆盖文件 (两者不会写入同一路径)
+                downloader = ParallelDownloader(
+                    max_workers=16,
+                    progress_callback=lambda done, total, task: self.progress_signal.emit(
+                        20 + int(75 * done / total), f"下载整合包文件 ({done}/{total})"),
+                    is_cancelled=lambda: self.stop_requested
+                )
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    download_future = executor.submit(downloader.run, tasks)
+                    self.extract_overrides(zf, overrides)
+                    failures = download_future.result()
             
-            facets_json = json.dumps(facets)
-            query = quote(self.query)
+            for task, error in failures:
+                self.log_signal.emit(f"下载失败: {task.path.name}: {error}")
             
-            url = f"https://api.modrinth.com/v2/search?query={query}&facets={facets_json}&limit=20"
+            if self.stop_requested:
+                self.finished_signal.emit(False, "导入被取消")
+            elif failures:
+                self.finished_signal.emit(False, f"{len(failures)} 个文件下载失败")
+            else:
+                self.progress_signal.emit(100, "导入完成")
+                self.finished_signal.emit(True, f"整合包 {name} 导入完成")
+        except Exception as e:
+            self.log_signal.emit(f"整合包导入错误: {str(e)}")
+            self.finished_signal.emit(False, str(e))
+    
+    def prepare_version(self, game_version, dependencies):
+        """安装整合包需要的游戏版本"""
+        if not game_version:
+            raise Exception("整合包没有指定游戏版本")
+        
+        jar_path = self.minecraft_dir / 'versions' / game_version / f"{game_version}.jar"
+        if jar_path.exists():
+            self.log_signal.emit(f"游戏版本 {game_version} 已安装")
+        else:
+            manifest, _ = fetch_version_manifest(self.mirrors, self.current_mirror)
+            version_data = next((v for v in manifest['versions'] if v['id'] == game_version), None)
+            if version_data is None:
+                raise Exception(f"找不到版本数据: {game_version}")
             
-            response = requests.get(url)
-            data = response.json()
+            installer = GameInstaller(version_data)
+            installer.log_callback = self.log_signal.emit
+            installer.install(self.minecraft_dir, is_cancelled=lambda: self.stop_requested)
+        
+        for key in self.LOADER_KEYS:
+            if key not in dependencies:
+                continue
+            loader = key.replace('-loader', '')
+            if loader in ForgeInstaller.LOADERS:
+                installer = ForgeInstaller(loader, self.java_path)
+                installer.log_callback = self.log_signal.emit
+            else:
+                installer = MetaLoaderInstaller(loader)
+            self.progress_signal.emit(10, f"安装 {loader} 加载器")
+            version_id = installer.install(
+                self.minecraft_dir, game_version, dependencies[key], is_cancelled=lambda: self.stop_requested
+            )
+            self.log_signal.emit(f"已安装加载器版本: {version_id}")
+    
+    def collect_tasks(self, files, skip_paths=()):
+        """整合包文件列表转换为下载任务"""
+        tasks = []
+        for entry in files:
+            if entry.get('env', {}).get('client') == 'unsupported':
+                continue
+            urls = entry.get('downloads', [])
+            if not urls:
+                continue
+            path = safe_join(self.minecraft_dir, entry['path'])
+            if path in skip_paths:
+                continue
+            hashes = entry.get('hashes', {})
+            task = DownloadTask(urls[0], path,
+                                sha1=hashes.get('sha1'), sha512=hashes.get('sha512'), size=entry.get('fileSize'))
+            if not task.is_valid():
+                tasks.append(task)
+        file_hash_cache.save()
+        return tasks
+    
+    def override_entries(self, zf):
+        """overrides/ 和 client-overrides/ 目录中的文件及其目标路径 (后者覆盖前者)"""
+        entries = []
+        for prefix in ('overrides/', 'client-overrides/'):
+            for info in zf.infolist():
+                if info.filename.startswith(prefix) and not info.is_dir():
+                    entries.append((info, safe_join(self.minecraft_dir, info.filename[len(prefix):])))
+        return entries
+    
+    def extract_overrides(self, zf, entries):
+        """流式解压覆盖文件"""
+        count = 0
+        for info, target in entries:
+            if self.stop_requested:
+                return
+            os.makedirs(target.parent, exist_ok=True)
+            with zf.open(info) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            count += 1
+        self.log_signal.emit(f"已解压 {count} 个覆盖文件")
+
+# 背景图片渲染缓存 (图片只解码一次, 缩放结果和透明度合成结果分别缓存)
+class BackgroundRenderer:
+    def __init__(self):
+        self.image_key = None
+        self.image = None
+        self.scaled_key = None
+        self.scaled_pixmap = None
+        self.composite_key = None
+        self.composite_pixmap = None
+    
+    def load(self, path, max_size=None):
+        """解码图片, 超过 max_size 的图片在解码时缩小; 图片未变化时直接使用缓存"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.image_key = None
+            self.image = None
+            return False
+        
+        key = (str(path), stat.st_size, stat.st_mtime_ns, max_size and (max_size.width(), max_size.height()))
+        if key == self.image_key:
+            return self.image is not None
+        
+        reader = QImageReader(str(path))
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if max_size and size.isValid() and (size.width() > max_size.width() or size.height() > max_size.height()):
+            # 保持宽高比缩小, 缩小后仍能覆盖整个屏幕
+            reader.setScaledSize(size.scaled(max_size, Qt.KeepAspectRatioByExpanding))
+        image = reader.read()
+        
+        self.image_key = key
+        self.image = None if image.isNull() else image
+        self.scaled_key = None
+        self.composite_key = None
+        return self.image is not None
+    
+    def render(self, size, opacity, base_color, smooth=True):
+        """按窗口大小缩放图片, 再以指定透明度合成到底色上"""
+        if self.image is None or size.isEmpty():
+            return None
+        
+        scaled_key = (size.width(), size.height(), smooth)
+        if scaled_key != self.scaled_key:
+            mode = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+            self.scaled_pixmap = QPixmap.fromImage(self.image.scaled(size, Qt.IgnoreAspectRatio, mode))
+            self.scaled_key = scaled_key
+            self.composite_key = None
+        
+        # 调整透明度只需重新合成, 不再缩放
+        composite_key = (scaled_key, round(opacity, 2), base_color.rgba())
+        if composite_key != self.composite_key:
+            pixmap = QPixmap(size)
+            pixmap.fill(base_color)
+            painter = QPainter(pixmap)
+            painter.setOpacity(opacity)
+            painter.drawPixmap(0, 0, self.scaled_pixmap)
+            painter.end()
+            self.composite_pixmap = pixmap
+            self.composite_key = composite_key
+        return self.composite_pixmap
+
+# 事件循环卡顿监测 (主线程定时心跳, 后台线程在心跳停顿时采样主线程调用栈)
+class EventLoopWatchdog(QObject):
+    # 单次卡顿最多保留的采样数, 以及日志文件的最大大小
+    MAX_SAMPLES = 50
+    MAX_LOG_SIZE = 1024 * 1024
+    
+    def __init__(self, log_path=None, threshold=None, interval=0.05):
+        super().__init__()
+        self.log_path = Path(log_path or DIAGNOSTICS_LOG)
+        self.threshold = threshold or STALL_THRESHOLD
+        self.interval = interval
+        self.main_thread_id = main_thread().ident
+        self.lock = Lock()
+        self.last_beat = time.monotonic()
+        self.samples = []
+        # 卡顿报告由监测线程写入日志, 不在主线程中读写文件
+        self.reports = Queue()
+        self.stop_event = Event()
+        self.monitor_thread = None
+        
+        # 统计
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.beats = 0
+        self.stall_count = 0
+        
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(interval * 1000))
+        self.timer.timeout.connect(self.beat)
+    
+    def start(self):
+        """开始监测 (需要在主线程中调用)"""
+        self.last_beat = time.monotonic()
+        self.stop_event.clear()
+        self.timer.start()
+        self.monitor_thread = Thread(target=self.monitor, name="event-loop-watchdog", daemon=True)
+        self.monitor_thread.start()
+    
+    def stop(self):
+        """停止监测并写入本次运行的统计"""
+        self.timer.stop()
+        self.stop_event.set()
+        if self.monitor_thread is not None:
+            self.monitor_thread.join(timeout=1)
+        if self.beats:
+            self.write(f"本次运行: 平均延迟 {1000 * self.total_lag / self.beats:.1f} ms, "
+                       f"最大延迟 {1000 * self.max_lag:.0f} ms, 卡顿 {self.stall_count} 次\n")
+    
+    def beat(self):
+        """主线程心跳: 计算事件循环延迟, 卡顿结束时交给监测线程写入诊断日志"""
+        now = time.monotonic()
+        with self.lock:
+            lag = max(0.0, now - self.last_beat - self.interval)
+            self.last_beat = now
+            samples, self.samples = self.samples, []
+        
+        self.beats += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            self.stall_count += 1
+            self.reports.put((lag, samples))
+    
+    def monitor(self):
+        """后台线程: 心跳超时时采样主线程的调用栈, 并写入卡顿报告"""
+        while True:
+            stopped = self.stop_event.wait(self.threshold / 2)
+            while True:
+                try:
+                    lag, samples = self.reports.get_nowait()
+                except Empty:
+                    break
+                self.write_stall(lag, samples)
+            if stopped:
+                return
             
-            results = []
-            for hit in data.get("hits", []):
-                project = hit
-                results.append({
-                    "id": project.get("project_id", ""),
-                    "name": project.get("title", "未知"),
-                    "description": project.get("description", "无描述"),
-                    "downloads": project.get("downloads", 0),
-                    "versions": project.get("versions", []),
-                    "url": f"https://modrinth.com/{project.get('project_type', 'mod')}/{project.get('slug', '')}",
-                    "icon_url": project.get("icon_url", "")
-                })
+            with self.lock:
+                stalled = time.monotonic() - self.last_beat - self.interval
+                if stalled < self.threshold or len(self.samples) >= self.MAX_SAMPLES:
+                    continue
             
-            return results
-        except Exception as e:
-            self.error_signal.emit(f"Modrinth搜索错误: {str(e)}")
-            return []
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame))
+            del frame
+            with self.lock:
+                self.samples.append(stack)
+    
+    def write_stall(self, lag, samples):
+        """记录一次卡顿, 相同的调用栈合并计数"""
+        lines = [f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 主线程卡顿 {lag:.3f} 秒, 采样 {len(samples)} 次"]
+        counts = OrderedDict()
+        for stack in samples:
+            counts[stack] = counts.get(stack, 0) + 1
+        for stack, count in counts.items():
+            lines.append(f"  出现 {count} 次:")
+            lines.extend("    " + line for line in stack.rstrip().splitlines())
+        self.write("\n".join(lines) + "\n\n")
+    
+    def write(self, text):
+        """追加到诊断日志, 超过大小上限时保留一份旧日志"""
+        try:
+            os.makedirs(self.log_path.parent, exist_ok=True)
+            if self.log_path.exists() and self.log_path.stat().st_size > self.MAX_LOG_SIZE:
+                os.replace(self.log_path, self.log_path.with_suffix('.log.1'))
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except OSError:
+            pass
 
 # 主窗口类
 class MinecraftLauncher(QMainWindow):
@@ -674,6 +5503,15 @@ class MinecraftLauncher(QMainWindow):
         # 背景图片相关
         self.background_image = None
         self.background_opacity = 0.7
+        self.background_renderer = BackgroundRenderer()
+        self.background_base_color = self.palette().color(QPalette.Window)
+        self.background_pixmap_key = None
+        
+        # 调整窗口大小停止后再进行高质量缩放
+        self.background_resize_timer = QTimer(self)
+        self.background_resize_timer.setSingleShot(True)
+        self.background_resize_timer.setInterval(150)
+        self.background_resize_timer.timeout.connect(self.apply_background)
         
         # 配置文件
         self.config = configparser.ConfigParser()
@@ -706,21 +5544,58 @@ class MinecraftLauncher(QMainWindow):
         }
         self.current_mod_api = "Modrinth"
         
-        # 任务队列
-        self.task_queue = Queue()
+        # CurseForge API密钥和本地搜索目录
+        self.curseforge_api_key = ""
+        self.local_mod_directory = ""
+        
+        # 离线模组目录
+        self.use_offline_catalog = False
+        self.catalog_thread = None
+        
+        # 本地监控接口 (默认关闭)
+        self.metrics_enabled = False
+        self.metrics_host = METRICS_HOST
+        self.metrics_port = METRICS_PORT
+        self.metrics_server = None
         
         # 当前下载线程
         self.download_thread = None
         self.launch_thread = None
+        self.mod_install_thread = None
+        self.mod_update_thread = None
+        self.modpack_thread = None
+        self.repair_thread = None
+        self.disk_thread = None
+        
+        # 已安装版本索引
+        self.version_index = InstalledVersionIndex(CACHE_DIR / 'versions_index.json')
+        self.version_index.changed.connect(self.populate_installed_versions)
+        
+        # 已安装模组索引
+        self.mod_index = InstalledModIndex(CACHE_DIR / 'mod_index.sqlite')
+        self.mod_index_thread = None
+        
+        # 当前搜索线程
+        self.mod_search_thread = None
+        self.shader_search_thread = None
+        
+        # 分页搜索状态
+        self.mod_search = None
+        self.shader_search = None
+        
+        # 搜索结果图标加载器
+        self.icon_loader = IconLoader(CACHE_DIR / 'icons')
         
         # 加载配置
         self.load_config()
         
         # 初始化UI
         self.init_ui()
+        self.update_metrics_server()
         
-        # 加载版本列表
-        Thread(target=self.load_version_list, daemon=True).start()
+        # 在后台加载版本列表和查找Java
+        self.load_version_list()
+        self.find_java_and_update()
     
     def load_config(self):
         """加载配置文件"""
@@ -742,6 +5617,30 @@ class MinecraftLauncher(QMainWindow):
             if self.config.has_option('Settings', 'background_opacity'):
                 self.background_opacity = self.config.getfloat('Settings', 'background_opacity')
             
+            if self.config.has_option('Settings', 'mod_api'):
+                mod_api = self.config.get('Settings', 'mod_api')
+                if mod_api in MOD_SEARCH_APIS:
+                    self.current_mod_api = mod_api
+            
+            if self.config.has_option('Settings', 'curseforge_api_key'):
+                self.curseforge_api_key = self.config.get('Settings', 'curseforge_api_key')
+            
+            if self.config.has_option('Settings', 'local_mod_directory'):
+                self.local_mod_directory = self.config.get('Settings', 'local_mod_directory')
+            
+            if self.config.has_option('Settings', 'offline_catalog'):
+                self.use_offline_catalog = self.config.getboolean('Settings', 'offline_catalog')
+            
+            if self.config.has_option('Settings', 'metrics_enabled'):
+                self.metrics_enabled = self.config.getboolean('Settings', 'metrics_enabled')
+            
+            if self.config.has_option('Settings', 'metrics_port'):
+                self.metrics_port = self.config.getint('Settings', 'metrics_port')
+            
+            # 需要从其他机器采集时可在配置文件中修改监听地址
+            if self.config.has_option('Settings', 'metrics_host'):
+                self.metrics_host = self.config.get('Settings', 'metrics_host')
+            
             # 更新目录路径
             self.versions_dir = self.minecraft_dir / 'versions'
             self.libraries_dir = self.minecraft_dir / 'libraries'
@@ -761,6 +5660,13 @@ class MinecraftLauncher(QMainWindow):
             self.config.set('Settings', 'background_image', self.background_image)
         
         self.config.set('Settings', 'background_opacity', str(self.background_opacity))
+        self.config.set('Settings', 'offline_catalog', str(self.use_offline_catalog))
+        self.config.set('Settings', 'mod_api', self.current_mod_api)
+        self.config.set('Settings', 'curseforge_api_key', self.curseforge_api_key)
+        self.config.set('Settings', 'local_mod_directory', self.local_mod_directory)
+        self.config.set('Settings', 'metrics_enabled', str(self.metrics_enabled))
+        self.config.set('Settings', 'metrics_port', str(self.metrics_port))
+        self.config.set('Settings', 'metrics_host', self.metrics_host)
         
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
@@ -871,6 +5777,7 @@ class MinecraftLauncher(QMainWindow):
         self.toolbox_tab = self.create_toolbox_tab()
         self.tab_widget.addTab(self.toolbox_tab, "工具箱")
         
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         main_layout.addWidget(self.tab_widget)
         
         # 创建状态栏
@@ -897,20 +5804,44 @@ class MinecraftLauncher(QMainWindow):
         # 应用背景图片
         self.apply_background()
     
-    def apply_background(self):
-        """应用背景图片"""
-        if self.background_image and Path(self.background_image).exists():
-            palette = self.palette()
-            pixmap = QPixmap(self.background_image)
-            scaled_pixmap = pixmap.scaled(self.size(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
-            palette.setBrush(QPalette.Window, QBrush(scaled_pixmap))
-            self.setPalette(palette)
-            self.setAutoFillBackground(True)
+    def apply_background(self, smooth=True):
+        """应用背景图片 (使用缓存的解码和缩放结果)"""
+        if not self.background_image or \
+                not self.background_renderer.load(self.background_image, self.background_max_size()):
+            return
+        
+        pixmap = self.background_renderer.render(self.size(), self.background_opacity,
+                                                 self.background_base_color, smooth)
+        if pixmap is None or pixmap.cacheKey() == self.background_pixmap_key:
+            return
+        self.background_pixmap_key = pixmap.cacheKey()
+        palette = self.palette()
+        palette.setBrush(QPalette.Window, QBrush(pixmap))
+        self.setPalette(palette)
+        self.setAutoFillBackground(True)
+    
+    def background_max_size(self):
+        """背景图片解码的最大尺寸 (最大屏幕的物理像素)"""
+        max_size = None
+        for screen in QApplication.screens():
+            size = screen.size() * screen.devicePixelRatio()
+            if max_size is None or size.width() * size.height() > max_size.width() * max_size.height():
+                max_size = size
+        return max_size
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消后台任务"""
+        task_runtime.shutdown()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        super().closeEvent(event)
     
     def resizeEvent(self, event):
         """窗口大小改变事件"""
         super().resizeEvent(event)
-        self.apply_background()
+        # 拖动过程中使用快速缩放, 停止调整后再进行一次高质量缩放
+        self.apply_background(smooth=False)
+        self.background_resize_timer.start()
     
     def create_game_tab(self):
         """创建游戏选项卡"""
@@ -977,7 +5908,7 @@ class MinecraftLauncher(QMainWindow):
         
         # Java 路径
         left_panel_layout.addWidget(QLabel("Java 路径:"), 2, 0)
-        self.java_path_entry = QLineEdit(self.find_java())
+        self.java_path_entry = QLineEdit("java")
         self.java_path_entry.setStyleSheet("""
             QLineEdit {
                 background-color: rgba(240, 240, 240, 150);
@@ -1069,7 +6000,8 @@ class MinecraftLauncher(QMainWindow):
         download_layout = QVBoxLayout(download_frame)
         
         # 创建游戏下载模块
-        self.game_download_widget = GameDownloadWidget(self.minecraft_dir, self.mirrors, self.current_mirror)
+        self.game_download_widget = GameDownloadWidget(self.minecraft_dir, self.mirrors, self.current_mirror,
+                                                       lambda: self.java_path_entry.text())
         self.game_download_widget.log_signal.connect(self.log_to_console)
         self.game_download_widget.finished_signal.connect(self.on_download_finished)
         download_layout.addWidget(self.game_download_widget)
@@ -1158,7 +6090,7 @@ class MinecraftLauncher(QMainWindow):
         
         api_layout.addWidget(QLabel("模组平台:"))
         self.mod_api_combo = TransparentComboBox()
-        self.mod_api_combo.addItems(["CurseForge", "Modrinth"])
+        self.mod_api_combo.addItems(MOD_SEARCH_APIS)
         self.mod_api_combo.setCurrentText(self.current_mod_api)
         self.mod_api_combo.currentTextChanged.connect(self.change_mod_api)
         api_layout.addWidget(self.mod_api_combo)
@@ -1192,9 +6124,24 @@ class MinecraftLauncher(QMainWindow):
         """)
         mods_list_layout = QVBoxLayout(mods_list_frame)
         
-        self.mods_tree = QTreeWidget()
-        self.mods_tree.setHeaderLabels(["模组名称", "版本", "下载量"])
-        self.mods_tree.setStyleSheet("""
+        self.mods_model = SearchResultModel(["模组名称", "版本", "下载量"], self.icon_loader, self)
+        self.mods_tree = self.create_result_view(self.mods_model)
+        self.mods_tree.selectionModel().selectionChanged.connect(self.on_mod_select)
+        
+        # 搜索结果页: 筛选框 + 结果列表
+        mods_results_page = QWidget()
+        mods_results_layout = QVBoxLayout(mods_results_page)
+        mods_results_layout.setContentsMargins(0, 0, 0, 0)
+        self.mods_filter_entry = QLineEdit()
+        self.mods_filter_entry.setPlaceholderText("筛选已加载的结果")
+        self.mods_filter_entry.textChanged.connect(self.mods_model.set_filter)
+        mods_results_layout.addWidget(self.mods_filter_entry)
+        mods_results_layout.addWidget(self.mods_tree)
+        
+        # 已安装模组列表
+        self.installed_mods_tree = QTreeWidget()
+        self.installed_mods_tree.setHeaderLabels(["模组名称", "ID", "版本", "加载器", "问题"])
+        self.installed_mods_tree.setStyleSheet("""
             QTreeWidget {
                 background-color: rgba(240, 240, 240, 150);
                 border: 1px solid rgba(200, 200, 200, 100);
@@ -1202,8 +6149,12 @@ class MinecraftLauncher(QMainWindow):
                 padding: 5px;
             }
         """)
-        self.mods_tree.itemSelectionChanged.connect(self.on_mod_select)
-        mods_list_layout.addWidget(self.mods_tree)
+        
+        self.mods_list_tabs = QTabWidget()
+        self.mods_list_tabs.addTab(mods_results_page, "搜索结果")
+        self.mods_list_tabs.addTab(self.installed_mods_tree, "已安装")
+        self.mods_list_tabs.currentChanged.connect(self.on_mods_list_tab_changed)
+        mods_list_layout.addWidget(self.mods_list_tabs)
         
         mods_content_frame.addWidget(mods_list_frame)
         
@@ -1260,6 +6211,14 @@ class MinecraftLauncher(QMainWindow):
         self.download_mod_btn.setEnabled(False)
         btn_layout.addWidget(self.download_mod_btn)
         
+        self.check_updates_btn = RoundedButton("检查更新", bg_color="#5A7FB5")
+        self.check_updates_btn.clicked.connect(self.check_mod_updates)
+        btn_layout.addWidget(self.check_updates_btn)
+        
+        self.import_modpack_btn = RoundedButton("导入整合包", bg_color="#5A7FB5")
+        self.import_modpack_btn.clicked.connect(self.import_modpack)
+        btn_layout.addWidget(self.import_modpack_btn)
+        
         open_folder_btn = RoundedButton("打开模组文件夹", bg_color="#5A7FB5")
         open_folder_btn.clicked.connect(self.open_mods_folder)
         btn_layout.addWidget(open_folder_btn)
@@ -1330,17 +6289,14 @@ class MinecraftLauncher(QMainWindow):
         """)
         shaders_list_layout = QVBoxLayout(shaders_list_frame)
         
-        self.shaders_tree = QTreeWidget()
-        self.shaders_tree.setHeaderLabels(["光影名称", "版本", "下载量"])
-        self.shaders_tree.setStyleSheet("""
-            QTreeWidget {
-                background-color: rgba(240, 240, 240, 150);
-                border: 1px solid rgba(200, 200, 200, 100);
-                border-radius: 5px;
-                padding: 5px;
-            }
-        """)
-        self.shaders_tree.itemDoubleClicked.connect(self.on_shader_double_click)
+        self.shaders_model = SearchResultModel(["光影名称", "版本", "下载量"], self.icon_loader, self)
+        self.shaders_tree = self.create_result_view(self.shaders_model)
+        self.shaders_tree.doubleClicked.connect(self.on_shader_double_click)
+        
+        self.shaders_filter_entry = QLineEdit()
+        self.shaders_filter_entry.setPlaceholderText("筛选已加载的结果")
+        self.shaders_filter_entry.textChanged.connect(self.shaders_model.set_filter)
+        shaders_list_layout.addWidget(self.shaders_filter_entry)
         shaders_list_layout.addWidget(self.shaders_tree)
         
         layout.addWidget(shaders_list_frame)
@@ -1490,12 +6446,85 @@ class MinecraftLauncher(QMainWindow):
         
         mod_api_layout.addWidget(QLabel("模组API:"))
         self.settings_mod_api_combo = TransparentComboBox()
-        self.settings_mod_api_combo.addItems(["CurseForge", "Modrinth"])
+        self.settings_mod_api_combo.addItems(MOD_SEARCH_APIS)
         self.settings_mod_api_combo.setCurrentText(self.current_mod_api)
         mod_api_layout.addWidget(self.settings_mod_api_combo)
         
         layout.addWidget(mod_api_frame)
         
+        # CurseForge API密钥
+        curseforge_frame = TransparentWidget()
+        curseforge_layout = QHBoxLayout(curseforge_frame)
+        curseforge_layout.setContentsMargins(15, 10, 15, 10)
+        
+        curseforge_layout.addWidget(QLabel("CurseForge API密钥:"))
+        self.curseforge_key_entry = QLineEdit(self.curseforge_api_key)
+        self.curseforge_key_entry.setEchoMode(QLineEdit.Password)
+        curseforge_layout.addWidget(self.curseforge_key_entry)
+        
+        layout.addWidget(curseforge_frame)
+        
+        # 本地搜索目录
+        local_dir_frame = TransparentWidget()
+        local_dir_layout = QHBoxLayout(local_dir_frame)
+        local_dir_layout.setContentsMargins(15, 10, 15, 10)
+        
+        local_dir_layout.addWidget(QLabel("本地搜索目录:"))
+        self.local_mod_dir_entry = QLineEdit(self.local_mod_directory)
+        local_dir_layout.addWidget(self.local_mod_dir_entry)
+        
+        local_dir_browse_btn = RoundedButton("浏览", radius=5, bg_color="#5A7FB5")
+        local_dir_browse_btn.clicked.connect(self.select_local_mod_directory)
+        local_dir_layout.addWidget(local_dir_browse_btn)
+        
+        layout.addWidget(local_dir_frame)
+        
+        # 离线模组目录
+        catalog_frame = TransparentWidget()
+        catalog_layout = QHBoxLayout(catalog_frame)
+        catalog_layout.setContentsMargins(15, 10, 15, 10)
+        
+        self.offline_catalog_check = QCheckBox("离线模组目录")
+        self.offline_catalog_check.setChecked(self.use_offline_catalog)
+        catalog_layout.addWidget(self.offline_catalog_check)
+        
+        self.catalog_status_label = QLabel()
+        catalog_layout.addWidget(self.catalog_status_label, 1)
+        
+        sync_catalog_btn = RoundedButton("同步目录", radius=5, bg_color="#5A7FB5")
+        sync_catalog_btn.clicked.connect(self.sync_catalog)
+        catalog_layout.addWidget(sync_catalog_btn)
+        
+        import_catalog_btn = RoundedButton("导入快照", radius=5, bg_color="#5A7FB5")
+        import_catalog_btn.clicked.connect(self.import_catalog_snapshot)
+        catalog_layout.addWidget(import_catalog_btn)
+        
+        export_catalog_btn = RoundedButton("导出快照", radius=5, bg_color="#5A7FB5")
+        export_catalog_btn.clicked.connect(self.export_catalog_snapshot)
+        catalog_layout.addWidget(export_catalog_btn)
+        
+        layout.addWidget(catalog_frame)
+        self.update_catalog_status()
+        
+        # 本地监控接口
+        metrics_frame = TransparentWidget()
+        metrics_layout = QHBoxLayout(metrics_frame)
+        metrics_layout.setContentsMargins(15, 10, 15, 10)
+        
+        self.metrics_check = QCheckBox("本地监控接口 (Prometheus)")
+        self.metrics_check.setChecked(self.metrics_enabled)
+        metrics_layout.addWidget(self.metrics_check)
+        
+        metrics_layout.addWidget(QLabel("端口:"))
+        self.metrics_port_entry = QLineEdit(str(self.metrics_port))
+        self.metrics_port_entry.setFixedWidth(80)
+        metrics_layout.addWidget(self.metrics_port_entry)
+        
+        self.metrics_status_label = QLabel()
+        metrics_layout.addWidget(self.metrics_status_label, 1)
+        
+        layout.addWidget(metrics_frame)
+        
         # 应用按钮
         apply_btn = RoundedButton("应用设置", bg_color="#388E3C")
         apply_btn.clicked.connect(self.apply_settings)
@@ -1530,24 +6559,112 @@ class MinecraftLauncher(QMainWindow):
                 padding: 0 5px 0 5px;
             }
         """)
-        memory_layout = QVBoxLayout(memory_group)
-        
-        # 内存清理按钮
-        memory_clean_btn = RoundedButton("清理内存", bg_color="#5A7FB5")
-        memory_clean_btn.clicked.connect(self.clean_memory)
-        memory_layout.addWidget(memory_clean_btn)
+        memory_layout = QVBoxLayout(memory_group)
+        
+        # 内存清理按钮
+        memory_clean_btn = RoundedButton("清理内存", bg_color="#5A7FB5")
+        memory_clean_btn.clicked.connect(self.clean_memory)
+        memory_layout.addWidget(memory_clean_btn)
+        
+        # 内存优化说明
+        memory_info = QLabel("清理未使用的内存资源，提高启动器性能")
+        memory_info.setStyleSheet("color: #666666; font-size: 12px;")
+        memory_info.setWordWrap(True)
+        memory_layout.addWidget(memory_info)
+        
+        layout.addWidget(memory_group)
+        
+        # 游戏修复组
+        repair_group = QGroupBox("游戏修复")
+        repair_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 1px solid rgba(200, 200, 200, 100);
+                border-radius: 8px;
+                margin-top: 10px;
+                padding-top: 10px;
+                background-color: rgba(255, 255, 255, 150);
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px 0 5px;
+            }
+        """)
+        repair_layout = QVBoxLayout(repair_group)
+        
+        # 修复游戏文件按钮
+        self.repair_files_btn = RoundedButton("修复游戏文件", bg_color="#5A7FB5")
+        self.repair_files_btn.clicked.connect(self.repair_game_files)
+        repair_layout.addWidget(self.repair_files_btn)
+        
+        # 检查和修复进度
+        self.repair_progress = TransparentProgressBar()
+        self.repair_progress.setVisible(False)
+        repair_layout.addWidget(self.repair_progress)
+        
+        # 修复说明
+        repair_info = QLabel("检查并修复损坏的游戏文件")
+        repair_info.setStyleSheet("color: #666666; font-size: 12px;")
+        repair_info.setWordWrap(True)
+        repair_layout.addWidget(repair_info)
+        
+        layout.addWidget(repair_group)
+        
+        # 磁盘清理组
+        disk_group = QGroupBox("磁盘清理")
+        disk_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 1px solid rgba(200, 200, 200, 100);
+                border-radius: 8px;
+                margin-top: 10px;
+                padding-top: 10px;
+                background-color: rgba(255, 255, 255, 150);
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px 0 5px;
+            }
+        """)
+        disk_layout = QVBoxLayout(disk_group)
+        
+        disk_buttons_layout = QHBoxLayout()
+        self.analyze_disk_btn = RoundedButton("分析磁盘占用", bg_color="#5A7FB5")
+        self.analyze_disk_btn.clicked.connect(self.analyze_disk_usage)
+        disk_buttons_layout.addWidget(self.analyze_disk_btn)
+        
+        self.sweep_disk_btn = RoundedButton("清理未引用文件", bg_color="#D32F2F")
+        self.sweep_disk_btn.clicked.connect(self.sweep_orphaned_files)
+        self.sweep_disk_btn.setEnabled(False)
+        disk_buttons_layout.addWidget(self.sweep_disk_btn)
+        disk_layout.addLayout(disk_buttons_layout)
+        
+        # 各版本占用
+        self.disk_usage_tree = QTreeWidget()
+        self.disk_usage_tree.setHeaderLabels(["版本", "引用文件大小", "独占大小"])
+        self.disk_usage_tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: rgba(240, 240, 240, 150);
+                border: 1px solid rgba(200, 200, 200, 100);
+                border-radius: 5px;
+                padding: 5px;
+            }
+        """)
+        self.disk_usage_tree.setVisible(False)
+        disk_layout.addWidget(self.disk_usage_tree)
         
-        # 内存优化说明
-        memory_info = QLabel("清理未使用的内存资源，提高启动器性能")
-        memory_info.setStyleSheet("color: #666666; font-size: 12px;")
-        memory_info.setWordWrap(True)
-        memory_layout.addWidget(memory_info)
+        self.disk_info = QLabel("统计各版本的库文件和资源占用，删除已无版本使用的文件")
+        self.disk_info.setStyleSheet("color: #666666; font-size: 12px;")
+        self.disk_info.setWordWrap(True)
+        disk_layout.addWidget(self.disk_info)
         
-        layout.addWidget(memory_group)
+        layout.addWidget(disk_group)
         
-        # 游戏修复组
-        repair_group = QGroupBox("游戏修复")
-        repair_group.setStyleSheet("""
+        # 启动耗时组
+        timing_group = QGroupBox("启动耗时")
+        timing_group.setStyleSheet("""
             QGroupBox {
                 font-weight: bold;
                 border: 1px solid rgba(200, 200, 200, 100);
@@ -1562,20 +6679,32 @@ class MinecraftLauncher(QMainWindow):
                 padding: 0 5px 0 5px;
             }
         """)
-        repair_layout = QVBoxLayout(repair_group)
+        timing_layout = QVBoxLayout(timing_group)
         
-        # 修复游戏文件按钮
-        repair_files_btn = RoundedButton("修复游戏文件", bg_color="#5A7FB5")
-        repair_files_btn.clicked.connect(self.repair_game_files)
-        repair_layout.addWidget(repair_files_btn)
+        # 各版本和Java运行时的启动耗时中位数
+        self.launch_timing_tree = QTreeWidget()
+        self.launch_timing_tree.setHeaderLabels(["版本", "Java", "次数", "准备", "启动JVM", "首次输出", "窗口就绪"])
+        self.launch_timing_tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: rgba(240, 240, 240, 150);
+                border: 1px solid rgba(200, 200, 200, 100);
+                border-radius: 5px;
+                padding: 5px;
+            }
+        """)
+        timing_layout.addWidget(self.launch_timing_tree)
         
-        # 修复说明
-        repair_info = QLabel("检查并修复损坏的游戏文件")
-        repair_info.setStyleSheet("color: #666666; font-size: 12px;")
-        repair_info.setWordWrap(True)
-        repair_layout.addWidget(repair_info)
+        export_timing_btn = RoundedButton("导出CSV", bg_color="#5A7FB5")
+        export_timing_btn.clicked.connect(self.export_launch_timings)
+        timing_layout.addWidget(export_timing_btn)
         
-        layout.addWidget(repair_group)
+        timing_info = QLabel("准备包括读取版本JSON、规则判断、构建类路径和解压natives; 其余为从点击启动开始的时间 (中位数)")
+        timing_info.setStyleSheet("color: #666666; font-size: 12px;")
+        timing_info.setWordWrap(True)
+        timing_layout.addWidget(timing_info)
+        
+        layout.addWidget(timing_group)
+        self.refresh_launch_timings()
         
         # 其他工具组
         tools_group = QGroupBox("其他工具")
@@ -1635,27 +6764,138 @@ class MinecraftLauncher(QMainWindow):
             self.log_to_console(f"内存清理错误: {str(e)}")
     
     def repair_game_files(self):
-        """修复游戏文件"""
+        """在后台检查所有已安装版本的文件, 并重新下载缺失或损坏的文件; 检查中再次点击则取消"""
+        if self.repair_thread is not None and self.repair_thread.isRunning():
+            self.repair_thread.cancel()
+            self.repair_files_btn.setEnabled(False)
+            return
+        
+        self.log_to_console("开始检查游戏文件完整性...")
+        self.repair_files_btn.setText("取消检查")
+        self.repair_progress.setValue(0)
+        self.repair_progress.setVisible(True)
+        
+        self.repair_thread = GameRepairThread(self.minecraft_dir)
+        self.repair_thread.progress_signal.connect(self.on_repair_progress)
+        self.repair_thread.log_signal.connect(self.log_to_console)
+        self.repair_thread.finished_signal.connect(self.on_repair_finished)
+        self.repair_thread.start()
+    
+    def on_repair_progress(self, value, message):
+        """更新检查和修复进度"""
+        self.repair_progress.setValue(value)
+        self.repair_progress.setFormat(f"{message} - %p%")
+        self.update_status(message)
+    
+    def on_repair_finished(self, success, message):
+        """游戏文件检查和修复完成"""
+        self.repair_files_btn.setText("修复游戏文件")
+        self.repair_files_btn.setEnabled(True)
+        self.repair_progress.setVisible(False)
+        self.log_to_console(message)
+        self.update_status("游戏文件检查完成" if success else "游戏文件修复失败")
+        if success:
+            QMessageBox.information(self, "完成", message)
+        else:
+            QMessageBox.critical(self, "错误", f"修复游戏文件失败: {message}")
+    
+    def disk_analyzer(self):
+        """当前 .minecraft 目录的磁盘分析器"""
+        return DiskUsageAnalyzer(self.minecraft_dir, CACHE_DIR / 'disk_usage.sqlite')
+    
+    def analyze_disk_usage(self):
+        """在后台分析磁盘占用"""
+        if self.disk_thread is not None and self.disk_thread.isRunning():
+            return
+        
+        self.analyze_disk_btn.setEnabled(False)
+        self.sweep_disk_btn.setEnabled(False)
+        self.disk_thread = DiskCleanupThread(self.disk_analyzer())
+        self.disk_thread.progress_signal.connect(self.disk_info.setText)
+        self.disk_thread.result_signal.connect(self.on_disk_usage_analyzed)
+        self.disk_thread.finished_signal.connect(self.on_disk_task_finished)
+        self.disk_thread.start()
+    
+    def on_disk_usage_analyzed(self, report):
+        """显示磁盘分析结果"""
+        self.disk_usage_tree.clear()
+        versions = sorted(report["versions"].items(), key=lambda item: -item[1]["size"])
+        for version_id, usage in versions:
+            QTreeWidgetItem(self.disk_usage_tree,
+                            [version_id, format_size(usage["size"]), format_size(usage["exclusive"])])
+        item = QTreeWidgetItem(self.disk_usage_tree,
+                               ["未引用文件", format_size(report["orphan_size"]), f"{report['orphan_count']} 个文件"])
+        item.setForeground(0, QBrush(QColor("#D32F2F")))
+        self.disk_usage_tree.setVisible(True)
+        
+        for error in report["errors"]:
+            self.log_to_console(error)
+        self.log_to_console(f"磁盘分析完成: 共 {report['total_count']} 个文件, {format_size(report['total_size'])}; "
+                            f"未引用 {report['orphan_count']} 个, {format_size(report['orphan_size'])}")
+        self.sweep_disk_btn.setEnabled(report["orphan_count"] > 0 and not report["errors"])
+    
+    def sweep_orphaned_files(self):
+        """删除上次分析标记的未引用文件"""
+        if self.disk_thread is not None and self.disk_thread.isRunning():
+            return
+        
+        reply = QMessageBox.question(self, "确认", "确定要删除所有未被已安装版本引用的库文件和资源文件吗？",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        self.analyze_disk_btn.setEnabled(False)
+        self.sweep_disk_btn.setEnabled(False)
+        self.disk_thread = DiskCleanupThread(self.disk_analyzer(), sweep=True)
+        self.disk_thread.progress_signal.connect(self.disk_info.setText)
+        self.disk_thread.finished_signal.connect(self.on_disk_task_finished)
+        self.disk_thread.start()
+    
+    def on_disk_task_finished(self, success, message):
+        """磁盘分析或清理完成"""
+        self.analyze_disk_btn.setEnabled(True)
+        self.disk_info.setText(message)
+        self.log_to_console(message)
+        if not success:
+            QMessageBox.critical(self, "错误", f"磁盘清理失败: {message}")
+        elif self.disk_thread.sweep:
+            self.disk_usage_tree.setVisible(False)
+    
+    def refresh_launch_timings(self, record=None):
+        """在后台读取启动耗时记录并更新表格"""
+        task_runtime.call(launch_history.summary, on_result=self.show_launch_timings)
+    
+    def show_launch_timings(self, rows):
+        """显示启动耗时汇总"""
+        def seconds(value):
+            return "" if value is None else f"{value:.2f}s"
+        
+        self.launch_timing_tree.clear()
+        for row in rows:
+            prepare = [row[phase] for phase in ("load_json", "rules", "classpath", "natives") if row[phase] is not None]
+            # 没有识别到窗口就绪标记时, 用渲染线程首次输出代替
+            ready = row["ready"] if row["ready"] is not None else row["render_thread"]
+            java = f"{row['java_version']} ({row['java']})" if row['java_version'] else row['java']
+            item = QTreeWidgetItem(self.launch_timing_tree, [
+                row["version"], java, str(row["launches"]),
+                seconds(sum(prepare) if prepare else None), seconds(row["spawn"]),
+                seconds(row["first_output"]), seconds(ready)
+            ])
+            item.setToolTip(1, row['java'])
+    
+    def export_launch_timings(self):
+        """导出启动耗时记录"""
+        if not launch_history.path.exists():
+            QMessageBox.information(self, "信息", "还没有启动耗时记录")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出启动耗时", "launch_history.csv", "CSV 文件 (*.csv)")
+        if not path:
+            return
         try:
-            # 这里实现游戏文件修复逻辑
-            # 检查并重新下载损坏的文件
-            
-            self.log_to_console("开始检查游戏文件完整性...")
-            
-            # 模拟修复过程
-            for version_dir in self.versions_dir.iterdir():
-                if version_dir.is_dir():
-                    json_file = version_dir / f"{version_dir.name}.json"
-                    jar_file = version_dir / f"{version_dir.name}.jar"
-                    
-                    if json_file.exists() and not jar_file.exists():
-                        self.log_to_console(f"发现损坏版本: {version_dir.name}，需要重新下载")
-            
-            QMessageBox.information(self, "完成", "游戏文件检查完成")
-            self.log_to_console("游戏文件检查完成")
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"修复游戏文件失败: {str(e)}")
-            self.log_to_console(f"修复游戏文件错误: {str(e)}")
+            launch_history.export(path)
+            self.log_to_console(f"启动耗时已导出到 {path}")
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
     
     def open_directory(self, directory):
         """打开目录"""
@@ -1670,21 +6910,35 @@ class MinecraftLauncher(QMainWindow):
             QMessageBox.critical(self, "错误", f"无法打开目录: {str(e)}")
     
     def refresh_installed_versions(self):
-        """刷新已安装版本列表"""
-        self.installed_versions_combo.clear()
-        
-        if not self.versions_dir.exists():
-            return
-        
-        for version_dir in self.versions_dir.iterdir():
-            if version_dir.is_dir():
-                jar_file = version_dir / f"{version_dir.name}.jar"
-                if jar_file.exists():
-                    self.installed_versions_combo.addItem(version_dir.name)
+        """刷新已安装版本列表 (切换目录时重新加载索引, 否则在后台重新校验)"""
+        if self.version_index.versions_dir != self.versions_dir:
+            self.version_index.set_directory(self.versions_dir)
+        else:
+            self.version_index.rescan()
+    
+    def populate_installed_versions(self):
+        """用版本索引填充已安装版本列表, 保留当前选择"""
+        current = self.installed_versions_combo.currentText()
+        versions = self.version_index.launchable()
         
-        # 如果有已安装版本，启用启动按钮
-        if self.installed_versions_combo.count() > 0:
-            self.launch_btn.setEnabled(True)
+        self.installed_versions_combo.blockSignals(True)
+        self.installed_versions_combo.clear()
+        self.installed_versions_combo.addItems([entry['id'] for entry in versions])
+        for i, entry in enumerate(versions):
+            details = f"类型: {entry['type']}\n加载器: {entry['loader']}\n大小: {entry['size'] / 1024 / 1024:.1f} MB"
+            if entry.get('inheritsFrom'):
+                details += f"\n继承自: {entry['inheritsFrom']}"
+            if entry.get('last_played'):
+                details += f"\n上次游玩: {datetime.fromtimestamp(entry['last_played']).strftime('%Y-%m-%d %H:%M')}"
+            self.installed_versions_combo.setItemData(i, details, Qt.ToolTipRole)
+        index = self.installed_versions_combo.findText(current)
+        if index >= 0:
+            self.installed_versions_combo.setCurrentIndex(index)
+        self.installed_versions_combo.blockSignals(False)
+        
+        # 如果有已安装版本，启用启动按钮 (游戏运行中保持禁用)
+        if self.launch_thread is None or not self.launch_thread.isRunning():
+            self.launch_btn.setEnabled(self.installed_versions_combo.count() > 0)
     
     def find_java(self, version=None):
         """查找 Java 安装路径，根据版本号选择"""
@@ -1762,10 +7016,9 @@ class MinecraftLauncher(QMainWindow):
         return "java"
     
     def find_java_and_update(self):
-        """查找并更新 Java 路径"""
+        """在后台查找 Java 并更新路径 (需要启动Java进程检查版本)"""
         selected_version = self.installed_versions_combo.currentText()
-        java_path = self.find_java(selected_version)
-        self.java_path_entry.setText(java_path)
+        task_runtime.call(self.find_java, selected_version, on_result=self.java_path_entry.setText)
     
     def select_minecraft_dir(self):
         """选择 .minecraft 目录"""
@@ -1821,54 +7074,31 @@ class MinecraftLauncher(QMainWindow):
         self.save_config()
     
     def load_version_list(self):
-        """加载版本列表"""
-        try:
-            self.update_status("正在加载版本列表...")
-            
-            # 获取版本列表
-            version_manifest_url = f"{self.mirrors[self.current_mirror]}/mc/game/version_manifest.json"
-            response = requests.get(version_manifest_url)
-            version_manifest = response.json()
-            versions = [v['id'] for v in version_manifest['versions']]
-            
-            # 过滤旧版本 (只显示1.7.10及以上)
-            filtered_versions = [v for v in versions if self.is_version_supported(v)]
-            
-            # 更新模组和光影版本过滤器
-            self.mod_version_filter.clear()
-            self.mod_version_filter.addItem("所有版本")
-            self.mod_version_filter.addItems(filtered_versions)
-            
-            self.shader_version_filter.clear()
-            self.shader_version_filter.addItem("所有版本")
-            self.shader_version_filter.addItems(filtered_versions)
-            
-            self.update_status("版本列表加载完成")
-        except Exception as e:
-            # 切换下载源
-            self.current_mirror = (self.current_mirror + 1) % len(self.mirrors)
-            self.update_status(f"加载失败: {str(e)}，尝试切换下载源")
-            self.log_to_console(f"错误: {str(e)}")
-            self.load_version_list()
+        """在后台加载版本列表"""
+        self.update_status("正在加载版本列表...")
+        task_runtime.call(fetch_version_manifest, self.mirrors, self.current_mirror,
+                          on_result=self.on_version_manifest_loaded, on_error=self.on_version_list_error)
     
-    def is_version_supported(self, version_str):
-        """检查版本是否支持 (1.7.10及以上)"""
-        try:
-            parts = version_str.split('.')
-            major = int(parts[0])
-            minor = int(parts[1]) if len(parts) > 1 else 0
-            patch = int(parts[2]) if len(parts) > 2 else 0
-            
-            # 支持1.7.10及以上版本
-            if major > 1:
-                return True
-            if major == 1 and minor > 7:
-                return True
-            if major == 1 and minor == 7 and patch >= 10:
-                return True
-            return False
-        except:
-            return False
+    def on_version_manifest_loaded(self, result):
+        """版本列表加载完成 (GUI线程)"""
+        manifest, self.current_mirror = result
+        filtered_versions = supported_versions(manifest)
+        
+        # 更新模组和光影版本过滤器, 保留当前选择
+        for combo in (self.mod_version_filter, self.shader_version_filter):
+            selected = combo.currentText()
+            combo.clear()
+            combo.addItem("所有版本")
+            combo.addItems(filtered_versions)
+            combo.setCurrentText(selected)
+        
+        self.game_download_widget.set_version_manifest(result)
+        self.update_status("版本列表加载完成")
+    
+    def on_version_list_error(self, error):
+        """所有下载源都无法获取版本列表"""
+        self.update_status("版本列表加载失败")
+        self.log_to_console(f"错误: {error}")
     
     def start_launch_thread(self):
         """启动游戏线程"""
@@ -1877,11 +7107,11 @@ class MinecraftLauncher(QMainWindow):
             QMessageBox.critical(self, "错误", "请先选择一个版本！")
             return
         
-        # 检查版本是否已下载
+        # 检查版本是否已下载 (加载器版本没有自己的JAR, 启动时检查继承的JAR)
         version_dir = self.minecraft_dir / 'versions' / selected_version
-        jar_path = version_dir / f"{selected_version}.jar"
+        json_path = version_dir / f"{selected_version}.json"
         
-        if not jar_path.exists():
+        if not json_path.exists():
             QMessageBox.critical(self, "错误", f"版本 {selected_version} 尚未下载，请先下载！")
             return
         
@@ -1890,12 +7120,15 @@ class MinecraftLauncher(QMainWindow):
         username = self.username_entry.text()
         memory = self.memory_entry.text()
         
+        self.version_index.mark_played(selected_version)
+        
         # 创建并启动启动线程
         self.launch_thread = LaunchThread(
             selected_version, self.minecraft_dir, java_path, username, memory
         )
         self.launch_thread.log_signal.connect(self.log_to_console)
         self.launch_thread.finished_signal.connect(self.on_launch_finished)
+        self.launch_thread.timing_signal.connect(self.refresh_launch_timings)
         
         # 开始加载动画
         self.loading_label.start_animation()
@@ -1944,18 +7177,35 @@ class MinecraftLauncher(QMainWindow):
             version_filter = self.mod_version_filter.currentText()
         
         # 清空现有列表
-        self.mods_tree.clear()
+        self.mods_model.clear()
         
         # 更新状态
         self.update_status(f"正在搜索模组: {search_term}")
         
+        # 从第一页开始新的搜索
+        self.mod_search = PagedSearch(self.current_mod_api, search_term, version_filter, "mod")
+        self.load_next_mod_page()
+    
+    def load_next_mod_page(self):
+        """加载下一页模组搜索结果"""
+        search = self.mod_search
+        if search is None or search.loading or not search.has_more():
+            return
+        search.loading = True
+        
         # 开始加载动画
         self.loading_label.start_animation()
         
+        # 取消被替换的旧搜索
+        self.retire_thread(self.mod_search_thread)
+        
         # 创建并启动搜索线程
         self.mod_search_thread = ModSearchThread(
-            self.current_mod_api, search_term, version_filter, "mod"
+            search.api, self.search_providers(search.api), search.query, search.version_filter,
+            search.mod_type, search.next_offset
         )
+        self.mod_search_thread.results_signal.connect(self.on_mod_search_results)
+        self.mod_search_thread.warning_signal.connect(self.on_search_warning)
         self.mod_search_thread.finished_signal.connect(self.on_mod_search_finished)
         self.mod_search_thread.error_signal.connect(self.on_mod_search_error)
         self.mod_search_thread.start()
@@ -1973,86 +7223,184 @@ class MinecraftLauncher(QMainWindow):
             version_filter = self.shader_version_filter.currentText()
         
         # 清空现有列表
-        self.shaders_tree.clear()
+        self.shaders_model.clear()
         
         # 更新状态
         self.update_status(f"正在搜索光影: {search_term}")
         
+        # 从第一页开始新的搜索
+        self.shader_search = PagedSearch("Modrinth", search_term, version_filter, "shader")
+        self.load_next_shader_page()
+    
+    def load_next_shader_page(self):
+        """加载下一页光影搜索结果"""
+        search = self.shader_search
+        if search is None or search.loading or not search.has_more():
+            return
+        search.loading = True
+        
         # 开始加载动画
         self.loading_label.start_animation()
         
+        # 取消被替换的旧搜索
+        self.retire_thread(self.shader_search_thread)
+        
         # 创建并启动搜索线程
         self.shader_search_thread = ModSearchThread(
-            "Modrinth", search_term, version_filter, "shader"
+            search.api, self.search_providers(search.api), search.query, search.version_filter,
+            search.mod_type, search.next_offset
         )
+        self.shader_search_thread.results_signal.connect(self.on_shader_search_results)
+        self.shader_search_thread.warning_signal.connect(self.on_search_warning)
         self.shader_search_thread.finished_signal.connect(self.on_shader_search_finished)
         self.shader_search_thread.error_signal.connect(self.on_shader_search_error)
         self.shader_search_thread.start()
     
-    def on_mod_search_finished(self, results, api):
+    def retire_thread(self, thread):
+        """取消旧的搜索线程 (任务运行时保留引用直到线程结束)"""
+        if thread is not None and thread.isRunning():
+            thread.cancel()
+    
+    def on_mod_search_results(self, results, provider):
+        """某个搜索源返回了模组结果, 立即合并到列表"""
+        # 忽略已被取代的搜索结果
+        if self.sender() is not self.mod_search_thread:
+            return
+        self.mods_model.append(results)
+    
+    def on_mod_search_finished(self, api, offset, page_size, total):
         """模组搜索完成"""
+        if self.sender() is not self.mod_search_thread:
+            return
+        
         # 停止加载动画
         self.loading_label.stop_animation()
         
-        # 清空现有列表
-        self.mods_tree.clear()
+        # 记录分页位置, 空页表示没有更多结果
+        search = self.mod_search
+        search.loading = False
+        search.next_offset = offset + page_size
+        search.total = total if page_size else search.next_offset
         
-        # 添加结果到列表
-        for mod in results:
-            item = QTreeWidgetItem(self.mods_tree)
-            item.setText(0, mod["name"])
-            item.setText(1, ", ".join(mod["versions"][:3]) if mod["versions"] else "未知")
-            item.setText(2, str(mod["downloads"]))
-            # 存储完整数据
-            item.setData(0, Qt.UserRole, mod)
+        # 结果不足一屏时继续加载下一页
+        QTimer.singleShot(0, lambda: self.on_results_scrolled(self.mods_tree))
         
-        self.update_status(f"找到 {len(results)} 个模组")
+        self.update_status(f"已加载 {search.next_offset} / 共 {search.total} 个模组")
     
     def on_mod_search_error(self, error):
         """模组搜索错误"""
+        if self.sender() is not self.mod_search_thread:
+            return
+        
         # 停止加载动画
         self.loading_label.stop_animation()
+        self.mod_search.loading = False
         
         QMessageBox.critical(self, "错误", f"搜索模组时出错: {error}")
         self.update_status("搜索失败")
     
-    def on_shader_search_finished(self, results, api):
+    def on_shader_search_results(self, results, provider):
+        """某个搜索源返回了光影结果, 立即合并到列表"""
+        # 忽略已被取代的搜索结果
+        if self.sender() is not self.shader_search_thread:
+            return
+        self.shaders_model.append(results)
+    
+    def on_shader_search_finished(self, api, offset, page_size, total):
         """光影搜索完成"""
+        if self.sender() is not self.shader_search_thread:
+            return
+        
         # 停止加载动画
         self.loading_label.stop_animation()
         
-        # 清空现有列表
-        self.shaders_tree.clear()
+        # 记录分页位置, 空页表示没有更多结果
+        search = self.shader_search
+        search.loading = False
+        search.next_offset = offset + page_size
+        search.total = total if page_size else search.next_offset
         
-        # 添加结果到列表
-        for shader in results:
-            item = QTreeWidgetItem(self.shaders_tree)
-            item.setText(0, shader["name"])
-            item.setText(1, ", ".join(shader["versions"][:3]) if shader["versions"] else "未知")
-            item.setText(2, str(shader["downloads"]))
-            # 存储完整数据
-            item.setData(0, Qt.UserRole, shader)
+        # 结果不足一屏时继续加载下一页
+        QTimer.singleShot(0, lambda: self.on_results_scrolled(self.shaders_tree))
         
-        self.update_status(f"找到 {len(results)} 个光影")
+        self.update_status(f"已加载 {search.next_offset} / 共 {search.total} 个光影")
     
     def on_shader_search_error(self, error):
         """光影搜索错误"""
+        if self.sender() is not self.shader_search_thread:
+            return
+        
         # 停止加载动画
         self.loading_label.stop_animation()
+        self.shader_search.loading = False
         
         QMessageBox.critical(self, "错误", f"搜索光影时出错: {error}")
         self.update_status("搜索失败")
     
+    def create_result_view(self, model):
+        """创建搜索结果列表, 只绘制可见行"""
+        view = QTreeView()
+        view.setModel(model)
+        view.setStyleSheet("""
+            QTreeView {
+                background-color: rgba(240, 240, 240, 150);
+                border: 1px solid rgba(200, 200, 200, 100);
+                border-radius: 5px;
+                padding: 5px;
+            }
+        """)
+        view.setRootIsDecorated(False)
+        view.setUniformRowHeights(True)
+        view.setSelectionMode(QTreeView.SingleSelection)
+        view.setIconSize(QSize(self.icon_loader.icon_size, self.icon_loader.icon_size))
+        
+        # 默认保持相关度顺序, 点击表头后在模型内排序
+        view.header().setSortIndicator(-1, Qt.AscendingOrder)
+        view.setSortingEnabled(True)
+        
+        view.verticalScrollBar().valueChanged.connect(lambda: self.on_results_scrolled(view))
+        return view
+    
+    def search_providers(self, api):
+        """按选择的搜索源创建提供方; "全部" 包含所有已配置的搜索源"""
+        providers = []
+        if api in ("全部", "Modrinth"):
+            providers.append(ModrinthProvider(mod_catalog if self.use_offline_catalog else None))
+        if api == "CurseForge" or (api == "全部" and self.curseforge_api_key):
+            providers.append(CurseForgeProvider(self.curseforge_api_key))
+        if api == "本地目录" or (api == "全部" and self.local_mod_directory):
+            providers.append(LocalDirectoryProvider(self.local_mod_directory))
+        return providers
+    
+    def on_search_warning(self, message):
+        """部分搜索源失败或超时, 其余结果照常显示"""
+        self.log_to_console(f"部分搜索源不可用: {message}")
+    
+    def on_results_scrolled(self, view):
+        """滚动到列表底部附近时加载下一页"""
+        bar = view.verticalScrollBar()
+        if bar.value() < bar.maximum() - 5:
+            return
+        
+        if view is self.mods_tree:
+            self.load_next_mod_page()
+        else:
+            self.load_next_shader_page()
+    
+    def selected_result(self, view):
+        """列表中选中的结果数据"""
+        indexes = view.selectionModel().selectedRows()
+        if not indexes:
+            return None
+        return indexes[0].data(Qt.UserRole)
+    
     def on_mod_select(self):
         """模组列表选择事件"""
-        selected_items = self.mods_tree.selectedItems()
-        if not selected_items:
+        mod_data = self.selected_result(self.mods_tree)
+        if mod_data is None:
             self.download_mod_btn.setEnabled(False)
             return
         
-        item = selected_items[0]
-        mod_data = item.data(0, Qt.UserRole)
-        
         # 更新版本选择框
         self.mod_version_combo.clear()
         if mod_data["versions"]:
@@ -2071,9 +7419,9 @@ class MinecraftLauncher(QMainWindow):
         # 启用下载按钮
         self.download_mod_btn.setEnabled(True)
     
-    def on_shader_double_click(self, item, column):
+    def on_shader_double_click(self, index):
         """光影列表双击事件"""
-        shader_data = item.data(0, Qt.UserRole)
+        shader_data = index.data(Qt.UserRole)
         
         # 更新版本选择框
         self.shader_version_combo.clear()
@@ -2095,13 +7443,11 @@ class MinecraftLauncher(QMainWindow):
     
     def download_selected_mod(self):
         """下载选中的模组"""
-        selected_items = self.mods_tree.selectedItems()
-        if not selected_items:
+        mod_data = self.selected_result(self.mods_tree)
+        if mod_data is None:
             QMessageBox.warning(self, "警告", "请先选择一个模组")
             return
         
-        item = selected_items[0]
-        mod_data = item.data(0, Qt.UserRole)
         selected_version = self.mod_version_combo.currentText()
         selected_loader = self.mod_loader_combo.currentText()
         
@@ -2109,24 +7455,23 @@ class MinecraftLauncher(QMainWindow):
             QMessageBox.warning(self, "警告", "无法确定模组版本")
             return
         
+        if mod_data.get("source", "Modrinth") != "Modrinth":
+            QMessageBox.warning(self, "警告", "目前只支持下载Modrinth上的模组")
+            return
+        
         # 开始下载
         self.update_status(f"开始下载模组: {mod_data['name']}")
         self.log_to_console(f"开始下载模组: {mod_data['name']} ({selected_version}, {selected_loader})")
         
-        # 这里实现模组下载逻辑
-        # 注意: 实际实现需要根据API和版本下载正确的文件
-        
-        QMessageBox.information(self, "信息", f"模组 {mod_data['name']} 下载功能尚未完全实现")
+        self.start_mod_install(mod_data, selected_version, self.current_mod_loaders(), self.mods_dir, self.download_mod_btn)
     
     def download_selected_shader(self):
         """下载选中的光影"""
-        selected_items = self.shaders_tree.selectedItems()
-        if not selected_items:
+        shader_data = self.selected_result(self.shaders_tree)
+        if shader_data is None:
             QMessageBox.warning(self, "警告", "请先选择一个光影")
             return
         
-        item = selected_items[0]
-        shader_data = item.data(0, Qt.UserRole)
         selected_version = self.shader_version_combo.currentText()
         
         if selected_version == "未知":
@@ -2137,10 +7482,184 @@ class MinecraftLauncher(QMainWindow):
         self.update_status(f"开始下载光影: {shader_data['name']}")
         self.log_to_console(f"开始下载光影: {shader_data['name']} ({selected_version})")
         
-        # 这里实现光影下载逻辑
-        # 注意: 实际实现需要根据API和版本下载正确的文件
+        # 光影包不区分加载器, 也没有依赖
+        self.start_mod_install(shader_data, selected_version, None, self.shaderpacks_dir,
+                               self.download_shader_btn, resolve_dependencies=False)
+    
+    def start_mod_install(self, project_data, game_version, loaders, target_dir, button, resolve_dependencies=True):
+        """启动模组/光影安装线程"""
+        if self.mod_install_thread is not None and self.mod_install_thread.isRunning():
+            QMessageBox.warning(self, "警告", "已有安装任务正在进行")
+            return
+        
+        self.mod_install_thread = ModInstallThread(
+            project_data["id"], game_version, loaders, target_dir, resolve_dependencies
+        )
+        self.mod_install_thread.progress_signal.connect(lambda p, msg: self.update_status(f"{msg} ({p}%)"))
+        self.mod_install_thread.log_signal.connect(self.log_to_console)
+        self.mod_install_thread.finished_signal.connect(
+            lambda success, message: self.on_mod_install_finished(project_data["name"], button, success, message)
+        )
+        
+        button.setEnabled(False)
+        self.mod_install_thread.start()
+    
+    def on_mod_install_finished(self, name, button, success, message):
+        """模组/光影安装完成"""
+        button.setEnabled(True)
+        self.refresh_installed_mods()
+        
+        if success:
+            self.update_status(f"{name} 安装完成")
+            self.log_to_console(f"{name} 安装完成: {message}")
+            QMessageBox.information(self, "成功", f"{name} 安装完成\n{message}")
+        else:
+            self.update_status(f"{name} 安装失败: {message}")
+            QMessageBox.critical(self, "错误", f"{name} 安装失败: {message}")
+    
+    def on_tab_changed(self, index):
+        """切换选项卡"""
+        if self.tab_widget.widget(index) is self.mods_tab:
+            self.refresh_installed_mods()
+    
+    def on_mods_list_tab_changed(self, index):
+        """切换模组列表 (搜索结果/已安装)"""
+        if self.mods_list_tabs.widget(index) is self.installed_mods_tree:
+            self.refresh_installed_mods()
+    
+    def refresh_installed_mods(self):
+        """在后台刷新已安装模组索引"""
+        if self.mod_index_thread is not None and self.mod_index_thread.isRunning():
+            return
+        self.mod_index_thread = ModIndexThread(self.mod_index, self.mods_dir)
+        self.mod_index_thread.result_signal.connect(self.on_installed_mods_loaded)
+        self.mod_index_thread.error_signal.connect(lambda e: self.log_to_console(f"扫描已安装模组失败: {e}"))
+        self.mod_index_thread.start()
+    
+    def on_installed_mods_loaded(self, installed, issues):
+        """显示已安装模组及其问题"""
+        self.installed_mods_tree.clear()
+        for mod in installed:
+            item = QTreeWidgetItem(self.installed_mods_tree)
+            item.setText(0, mod["name"])
+            item.setText(1, mod["mod_id"])
+            item.setText(2, mod["version"])
+            item.setText(3, mod["loader"])
+            item.setToolTip(0, mod["filename"])
+            problems = issues.get(mod["path"], [])
+            if problems:
+                item.setText(4, "; ".join(problems))
+                for column in range(5):
+                    item.setForeground(column, QBrush(QColor("#C62828")))
+            item.setData(0, Qt.UserRole, mod)
+        
+        jars = len({mod["path"] for mod in installed})
+        self.installed_mods_tree.setHeaderLabels(
+            ["模组名称", "ID", "版本", "加载器", f"问题 ({len(issues)})" if issues else "问题"])
+        if self.mods_list_tabs.currentWidget() is self.installed_mods_tree:
+            self.update_status(f"已安装 {jars} 个模组文件" + (f", {len(issues)} 个存在问题" if issues else ""))
+    
+    def current_game_version(self):
+        """模组使用的游戏版本: 优先使用版本过滤器, 否则使用选中的已安装版本"""
+        if self.mod_version_filter.currentText() != "所有版本":
+            return self.mod_version_filter.currentText()
+        return self.installed_versions_combo.currentText() or None
+    
+    def current_mod_loaders(self):
+        """加载器选择对应的Modrinth加载器列表"""
+        return {"Forge": ["forge"], "Fabric": ["fabric"], "Quilt": ["quilt", "fabric"]}.get(
+            self.mod_loader_combo.currentText())
+    
+    def check_mod_updates(self):
+        """检查模组文件夹中所有模组的更新"""
+        if self.mod_update_thread is not None and self.mod_update_thread.isRunning():
+            return
+        
+        game_version = self.current_game_version()
+        loaders = self.current_mod_loaders()
+        self.log_to_console(f"检查模组更新 (游戏版本: {game_version or '任意'}, 加载器: {self.mod_loader_combo.currentText()})")
+        
+        self.mod_update_thread = ModUpdateCheckThread(self.mods_dir, game_version, loaders)
+        self.mod_update_thread.progress_signal.connect(lambda p, msg: self.update_status(f"{msg} ({p}%)"))
+        self.mod_update_thread.result_signal.connect(self.on_mod_updates_checked)
+        self.mod_update_thread.error_signal.connect(self.on_mod_update_error)
+        
+        self.check_updates_btn.setEnabled(False)
+        self.loading_label.start_animation()
+        self.mod_update_thread.start()
+    
+    def on_mod_updates_checked(self, updates):
+        """更新检查完成"""
+        self.check_updates_btn.setEnabled(True)
+        self.loading_label.stop_animation()
+        
+        if not updates:
+            self.update_status("所有模组都是最新版本")
+            QMessageBox.information(self, "信息", "所有模组都是最新版本")
+            return
+        
+        self.update_status(f"发现 {len(updates)} 个模组更新")
+        dialog = ModUpdateDialog(updates, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        
+        selected = dialog.selected_updates()
+        if not selected:
+            return
+        
+        self.mod_update_thread = ModUpdateApplyThread(selected, self.mods_dir)
+        self.mod_update_thread.progress_signal.connect(lambda p, msg: self.update_status(f"{msg} ({p}%)"))
+        self.mod_update_thread.log_signal.connect(self.log_to_console)
+        self.mod_update_thread.finished_signal.connect(
+            lambda success, message: self.on_mod_install_finished("模组更新", self.check_updates_btn, success, message)
+        )
+        self.check_updates_btn.setEnabled(False)
+        self.mod_update_thread.start()
+    
+    def on_mod_update_error(self, error):
+        """更新检查出错"""
+        self.check_updates_btn.setEnabled(True)
+        self.loading_label.stop_animation()
+        self.update_status("检查更新失败")
+        QMessageBox.critical(self, "错误", f"检查模组更新时出错: {error}")
+    
+    def import_modpack(self):
+        """导入Modrinth整合包, 导入中再次点击则取消"""
+        if self.modpack_thread is not None and self.modpack_thread.isRunning():
+            self.modpack_thread.cancel()
+            self.import_modpack_btn.setEnabled(False)
+            return
+        
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择整合包", "", "Modrinth整合包 (*.mrpack)"
+        )
+        if not file_path:
+            return
+        
+        self.modpack_thread = ModpackImportThread(file_path, self.minecraft_dir, self.mirrors, self.current_mirror,
+                                                 self.java_path_entry.text())
+        self.modpack_thread.progress_signal.connect(lambda p, msg: self.update_status(f"{msg} ({p}%)"))
+        self.modpack_thread.log_signal.connect(self.log_to_console)
+        self.modpack_thread.finished_signal.connect(self.on_modpack_imported)
         
-        QMessageBox.information(self, "信息", f"光影 {shader_data['name']} 下载功能尚未完全实现")
+        self.import_modpack_btn.setText("取消导入")
+        self.loading_label.start_animation()
+        self.modpack_thread.start()
+    
+    def on_modpack_imported(self, success, message):
+        """整合包导入完成"""
+        self.import_modpack_btn.setText("导入整合包")
+        self.import_modpack_btn.setEnabled(True)
+        self.loading_label.stop_animation()
+        self.refresh_installed_versions()
+        self.refresh_installed_mods()
+        
+        if success:
+            self.update_status(message)
+            QMessageBox.information(self, "成功", message)
+        else:
+            self.update_status(f"整合包导入失败: {message}")
+            QMessageBox.critical(self, "错误", f"整合包导入失败: {message}")
     
     def open_mods_folder(self):
         """打开模组文件夹"""
@@ -2184,11 +7703,105 @@ class MinecraftLauncher(QMainWindow):
             self.current_mod_api = new_mod_api
             self.mod_api_combo.setCurrentText(new_mod_api)
         
+        # 应用搜索源设置
+        self.curseforge_api_key = self.curseforge_key_entry.text().strip()
+        self.local_mod_directory = self.local_mod_dir_entry.text().strip()
+        
+        # 应用离线目录设置
+        self.use_offline_catalog = self.offline_catalog_check.isChecked()
+        
+        # 应用监控接口设置
+        try:
+            port = int(self.metrics_port_entry.text())
+            if not 0 < port < 65536:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "警告", "监控接口端口必须是 1-65535 之间的整数")
+            return
+        self.metrics_enabled = self.metrics_check.isChecked()
+        self.metrics_port = port
+        self.update_metrics_server()
+        
         # 保存设置
         self.save_config()
         
         QMessageBox.information(self, "成功", "设置已应用")
     
+    def update_metrics_server(self):
+        """按设置启动、重启或停止本地监控接口"""
+        server = self.metrics_server
+        if server and (not self.metrics_enabled or (server.host, server.port) != (self.metrics_host, self.metrics_port)):
+            server.stop()
+            self.metrics_server = None
+        
+        if self.metrics_enabled and self.metrics_server is None:
+            server = MetricsServer(self.metrics_host, self.metrics_port)
+            try:
+                server.start()
+            except OSError as e:
+                self.metrics_status_label.setText(f"无法启动: {str(e)}")
+                self.log_to_console(f"无法启动监控接口: {str(e)}")
+                return
+            self.metrics_server = server
+            self.log_to_console(f"监控接口已启动: {server.url()}")
+        
+        self.metrics_status_label.setText(self.metrics_server.url() if self.metrics_server else "未启用")
+    
+    def select_local_mod_directory(self):
+        """选择本地搜索目录"""
+        directory = QFileDialog.getExistingDirectory(self, "选择本地搜索目录", self.local_mod_dir_entry.text())
+        if directory:
+            self.local_mod_dir_entry.setText(directory)
+    
+    def update_catalog_status(self, message=None):
+        """更新离线目录状态"""
+        if message is None:
+            try:
+                message = f"已收录 {mod_catalog.count()} 个项目"
+            except sqlite3.Error as e:
+                message = f"目录不可用: {str(e)}"
+        self.catalog_status_label.setText(message)
+    
+    def start_catalog_thread(self, snapshot_path=None):
+        """启动离线目录同步或导入"""
+        if self.catalog_thread and self.catalog_thread.isRunning():
+            QMessageBox.warning(self, "警告", "目录正在同步中")
+            return
+        
+        self.catalog_thread = CatalogSyncThread(mod_catalog, snapshot_path)
+        self.catalog_thread.progress_signal.connect(lambda value, text: self.update_catalog_status(text))
+        self.catalog_thread.finished_signal.connect(self.on_catalog_synced)
+        self.catalog_thread.start()
+        self.update_catalog_status("正在同步...")
+    
+    def sync_catalog(self):
+        """从Modrinth同步离线目录"""
+        self.start_catalog_thread()
+    
+    def import_catalog_snapshot(self):
+        """导入离线目录快照"""
+        path, _ = QFileDialog.getOpenFileName(self, "导入目录快照", "", "目录快照 (*.jsonl)")
+        if path:
+            self.start_catalog_thread(path)
+    
+    def export_catalog_snapshot(self):
+        """导出离线目录快照"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出目录快照", "catalog.jsonl", "目录快照 (*.jsonl)")
+        if not path:
+            return
+        try:
+            mod_catalog.export_snapshot(path)
+            self.log_to_console(f"目录快照已导出: {path}")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+    
+    def on_catalog_synced(self, success, message):
+        """离线目录同步完成"""
+        self.update_catalog_status()
+        self.log_to_console(message if success else f"目录同步失败: {message}")
+        if not success:
+            QMessageBox.critical(self, "错误", f"目录同步失败: {message}")
+    
     def update_status(self, message):
         """更新状态标签"""
         self.status_label.setText(message)
@@ -2202,13 +7815,308 @@ class MinecraftLauncher(QMainWindow):
             self.console_text.verticalScrollBar().maximum()
         )
 
+# 安装基准测试使用的本地服务器 (合成的版本清单、客户端、库文件和资源文件, 可模拟延迟、带宽和错误)
+class BenchmarkFixture:
+    VERSION_ID = "benchmark"
+    
+    def __init__(self, libraries=300, objects=3000, library_size=32 * 1024, object_size=4 * 1024,
+                 client_size=4 * 1024 * 1024, latency=0.0, bandwidth=0, error_rate=0.0, seed=0):
+        self.libraries = libraries
+        self.objects = objects
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.seed = seed
+        self.files = {}
+        self.failed = set()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.lock = Lock()
+        self.server = None
+        self.base_url = None
+        
+        # 固定种子生成文件内容, 每次运行完全相同
+        rng = random.Random(seed)
+        self.client = rng.randbytes(client_size)
+        self.library_blobs = [rng.randbytes(library_size) for _ in range(libraries)]
+        self.object_blobs = [rng.randbytes(object_size) for _ in range(objects)]
+    
+    def start(self):
+        """启动服务器并发布版本清单等文件, 返回服务器地址"""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), BenchmarkRequestHandler)
+        self.server.daemon_threads = True
+        self.server.fixture = self
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.publish()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.base_url
+    
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    def add_file(self, path, data):
+        """发布文件, 返回版本JSON中使用的下载信息"""
+        self.files[path] = data
+        return {"url": self.base_url + path, "sha1": hashlib.sha1(data).hexdigest(), "size": len(data)}
+    
+    def publish(self):
+        version_id = self.VERSION_ID
+        libraries = []
+        for i, blob in enumerate(self.library_blobs):
+            name = f"benchmark.group{i % 16}:library{i}:1.0"
+            path = maven_path(name)
+            artifact = self.add_file(f"/libraries/{path}", blob)
+            artifact['path'] = path
+            libraries.append({"name": name, "downloads": {"artifact": artifact}})
+        
+        objects = {}
+        for i, blob in enumerate(self.object_blobs):
+            digest = hashlib.sha1(blob).hexdigest()
+            self.files[f"/assets/{digest[:2]}/{digest}"] = blob
+            objects[f"benchmark/object{i}.bin"] = {"hash": digest, "size": len(blob)}
+        asset_index = self.add_file(f"/indexes/{version_id}.json", json.dumps({"objects": objects}).encode())
+        asset_index['id'] = version_id
+        
+        version_json = {
+            "id": version_id,
+            "type": "release",
+            "mainClass": "net.minecraft.client.main.Main",
+            "assets": version_id,
+            "assetIndex": asset_index,
+            "downloads": {"client": self.add_file(f"/versions/{version_id}/client.jar", self.client)},
+            "libraries": libraries,
+        }
+        version = self.add_file(f"/versions/{version_id}.json", json.dumps(version_json).encode())
+        manifest = {
+            "latest": {"release": version_id, "snapshot": version_id},
+            "versions": [{"id": version_id, "type": "release", "url": version['url'],
+                          "sha1": version['sha1'], "releaseTime": "2020-01-01T00:00:00+00:00"}],
+        }
+        self.add_file("/mc/game/version_manifest.json", json.dumps(manifest).encode())
+    
+    def injected_error(self, path):
+        """按路径决定是否注入一次错误 (同一种子下每次运行相同)"""
+        if not self.error_rate or path in self.failed:
+            return False
+        digest = hashlib.sha1(f"{self.seed}:{path}".encode()).digest()
+        if int.from_bytes(digest[:4], 'big') / 2 ** 32 >= self.error_rate:
+            return False
+        self.failed.add(path)
+        return True
+    
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors, "bytes": self.bytes_sent}
+    
+    def handle(self, handler):
+        path = handler.path.split('?')[0]
+        with self.lock:
+            self.requests += 1
+            failing = self.injected_error(path)
+            if failing:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        
+        data = self.files.get(path)
+        if failing or data is None:
+            handler.send_response(503 if failing else 404)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        
+        # 支持断点续传
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', handler.headers.get('Range', ''))
+        if match and int(match.group(1)) < len(data):
+            start = int(match.group(1))
+            handler.send_response(206)
+            handler.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            handler.send_response(200)
+        handler.send_header('Content-Length', str(len(data) - start))
+        handler.end_headers()
+        
+        body = memoryview(data)[start:]
+        chunk_size = 64 * 1024
+        try:
+            for offset in range(0, len(body), chunk_size):
+                chunk = body[offset:offset + chunk_size]
+                handler.wfile.write(chunk)
+                if self.bandwidth:
+                    time.sleep(len(chunk) / self.bandwidth)
+        except OSError:
+            return
+        with self.lock:
+            self.bytes_sent += len(body)
+
+class BenchmarkRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头部和内容分开写出, 不关闭Nagle算法时每个请求会多等待一次延迟确认
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        self.server.fixture.handle(self)
+    
+    def log_message(self, format, *args):
+        pass
+
+# 安装基准测试: 冷安装、已安装后的检查、断点续传
+class InstallBenchmark:
+    MODES = ("cold", "warm", "resumed")
+    
+    def __init__(self, fixture, work_dir):
+        self.fixture = fixture
+        self.work_dir = Path(work_dir)
+        self.minecraft_dir = self.work_dir / '.minecraft'
+    
+    def install(self):
+        """与下载线程相同的安装流程"""
+        manifest, _ = fetch_version_manifest([self.fixture.base_url])
+        version_data = manifest['versions'][0]
+        GameInstaller(version_data).install(self.minecraft_dir)
+    
+    def prepare(self, mode):
+        if mode == "cold":
+            shutil.rmtree(self.minecraft_dir, ignore_errors=True)
+            return
+        if not (self.minecraft_dir / 'versions' / self.fixture.VERSION_ID).exists():
+            self.install()
+        if mode == "resumed":
+            # 把一半的库文件和资源文件截成中断下载留下的临时文件
+            files = sorted(p for p in (self.minecraft_dir / 'libraries').rglob('*.jar'))
+            files += sorted(p for p in (self.minecraft_dir / 'assets' / 'objects').rglob('*') if p.is_file())
+            for path in files[::2]:
+                tmp_path = path.with_name(path.name + '.part')
+                os.replace(path, tmp_path)
+                with open(tmp_path, 'r+b') as f:
+                    f.truncate(tmp_path.stat().st_size // 2)
+    
+    def run_mode(self, mode):
+        self.prepare(mode)
+        circuit_breakers.clear()
+        before = self.fixture.stats()
+        start = time.perf_counter()
+        self.install()
+        wall_time = time.perf_counter() - start
+        after = self.fixture.stats()
+        transferred = after['bytes'] - before['bytes']
+        return {
+            "mode": mode,
+            "wall_time": round(wall_time, 3),
+            "requests": after['requests'] - before['requests'],
+            "injected_errors": after['errors'] - before['errors'],
+            "bytes": transferred,
+            "throughput_mb_s": round(transferred / wall_time / 1e6, 2) if wall_time else 0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    
+    def run(self, modes):
+        """依次运行各模式; 使用独立的哈希缓存和重试状态, 不影响启动器本身"""
+        global ASSETS_URL, file_hash_cache, retry_budget
+        saved = ASSETS_URL, file_hash_cache, retry_budget
+        ASSETS_URL = self.fixture.base_url + "/assets"
+        file_hash_cache = FileHashCache(self.work_dir / 'file_hashes.json')
+        retry_budget = RetryBudget()
+        try:
+            return [self.run_mode(mode) for mode in modes]
+        finally:
+            ASSETS_URL, file_hash_cache, retry_budget = saved
+            circuit_breakers.clear()
+
+def peak_rss_mb():
+    """进程内存占用峰值 (MB), 不支持的系统返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位, Linux 以KB为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def benchmark_main(argv):
+    """命令行基准测试入口, 结果以JSON输出"""
+    parser = argparse.ArgumentParser(prog="minecraft_launcher.py --benchmark", description="安装性能基准测试")
+    parser.add_argument('--modes', default=",".join(InstallBenchmark.MODES), help="逗号分隔: cold,warm,resumed")
+    parser.add_argument('--libraries', type=int, default=300, help="库文件数量")
+    parser.add_argument('--objects', type=int, default=3000, help="资源文件数量")
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟 (秒)")
+    parser.add_argument('--bandwidth', type=float, default=0, help="每个连接的带宽 (字节/秒, 0 表示不限)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="首次请求返回503的文件比例")
+    parser.add_argument('--seed', type=int, default=0, help="生成文件使用的随机种子")
+    parser.add_argument('--work-dir', help="安装目录 (默认使用临时目录并在结束后删除)")
+    parser.add_argument('--output', help="结果写入的JSON文件 (默认输出到标准输出)")
+    args = parser.parse_args(argv)
+    
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in InstallBenchmark.MODES]
+    if unknown:
+        parser.error(f"未知的模式: {', '.join(unknown)}")
+    
+    fixture = BenchmarkFixture(args.libraries, args.objects, latency=args.latency, bandwidth=args.bandwidth,
+                               error_rate=args.error_rate, seed=args.seed)
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="launcher-benchmark-"))
+    fixture.start()
+    try:
+        results = InstallBenchmark(fixture, work_dir).run(modes)
+    finally:
+        fixture.stop()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    report = {
+        "fixture": {
+            "libraries": args.libraries, "objects": args.objects, "latency": args.latency,
+            "bandwidth": args.bandwidth, "error_rate": args.error_rate, "seed": args.seed,
+            "files": len(fixture.files), "total_bytes": sum(len(data) for data in fixture.files.values()),
+        },
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
 # 主函数
 def main():
+    argv = sys.argv[1:]
+    
+    # --trace 文件: 记录性能追踪, 退出时导出
+    if '--trace' in argv:
+        index = argv.index('--trace')
+        del argv[index]
+        # 文件名省略时 (后面是其他选项或没有参数) 使用默认位置
+        if index < len(argv) and not argv[index].startswith('-'):
+            tracer.enable(argv.pop(index))
+        else:
+            tracer.enable(str(CACHE_DIR / 'trace.json'))
+    
+    # 命令行基准测试, 不启动界面
+    if '--benchmark' in argv:
+        try:
+            code = benchmark_main([arg for arg in argv if arg != '--benchmark'])
+        finally:
+            tracer.export()
+        sys.exit(code)
+    
     app = QApplication(sys.argv)
     
     # 设置应用程序样式
     app.setStyle("Fusion")
     
+    # 监测主线程卡顿, 写入诊断日志
+    watchdog = EventLoopWatchdog()
+    watchdog.start()
+    app.aboutToQuit.connect(watchdog.stop)
+    app.aboutToQuit.connect(tracer.export)
+    
     # 创建并显示主窗口
     launcher = MinecraftLauncher()
     launcher.show()
@@ -2217,4 +8125,5 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# 测试不需要显示窗口
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,27 @@
+import minecraft_launcher as ml
+
+
+def test_benchmark_modes_install_and_resume(tmp_path, monkeypatch):
+    # 文件哈希缓存使用相对路径
+    monkeypatch.chdir(tmp_path)
+    ml.circuit_breakers.clear()
+    fixture = ml.BenchmarkFixture(libraries=3, objects=10, seed=1)
+    fixture.start()
+    try:
+        results = ml.InstallBenchmark(fixture, tmp_path / "work").run(list(ml.InstallBenchmark.MODES))
+    finally:
+        fixture.stop()
+
+    by_mode = {result["mode"]: result for result in results}
+    total = sum(len(data) for data in fixture.files.values())
+    assert by_mode["cold"]["bytes"] >= total
+    # 已安装时只重新获取版本清单和版本JSON
+    assert by_mode["warm"]["requests"] == 2
+    # 断点续传只下载被截断的部分
+    assert 0 < by_mode["resumed"]["bytes"] < total
+
+
+def test_fixture_is_reproducible():
+    first = ml.BenchmarkFixture(libraries=2, objects=5, seed=3)
+    second = ml.BenchmarkFixture(libraries=2, objects=5, seed=3)
+    assert first.files == second.files
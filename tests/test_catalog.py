@@ -0,0 +1,83 @@
+import random
+import string
+
+import pytest
+
+import minecraft_launcher as ml
+
+
+def project(index, title, downloads=0, versions=("1.20.1",), project_type="mod"):
+    return {"project_id": f"p{index}", "project_type": project_type, "slug": title.lower().replace(" ", "-"),
+            "title": title, "description": "", "categories": [], "versions": list(versions), "downloads": downloads}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ml.ModCatalog(tmp_path / "catalog.sqlite")
+    conn = catalog.connect()
+    catalog.upsert(conn, [
+        project(1, "Sodium", 900),
+        project(2, "Sodium Extra", 500, versions=("1.19.2",)),
+        project(3, "Iris Shaders", 800),
+        project(4, "Storage Drawers", 100),
+        project(5, "Complementary", 50, project_type="shader"),
+    ])
+    conn.commit()
+    conn.close()
+    return catalog
+
+
+def titles(results):
+    return [result["name"] for result in results[0]]
+
+
+def test_exact_and_prefix_matches(catalog):
+    assert titles(catalog.search("sodium", "mod")) == ["Sodium", "Sodium Extra"]
+    assert titles(catalog.search("sod", "mod")) == ["Sodium", "Sodium Extra"]
+
+
+def test_misspelled_query_matches(catalog):
+    assert titles(catalog.search("storgae", "mod")) == ["Storage Drawers"]
+    assert titles(catalog.search("sotrage drawrs", "mod")) == ["Storage Drawers"]
+
+
+def test_short_queries_do_not_match_fuzzily(catalog):
+    assert titles(catalog.search("iros", "mod")) == ["Iris Shaders"]
+    assert titles(catalog.search("irs", "mod")) == []
+
+
+def test_empty_query_pages_by_downloads(catalog):
+    results, total = catalog.search("", "mod", offset=1, limit=2)
+    assert total == 4
+    assert [result["name"] for result in results] == ["Iris Shaders", "Sodium Extra"]
+
+
+def test_version_filter(catalog):
+    assert titles(catalog.search("", "mod", "1.19.2")) == ["Sodium Extra"]
+    assert titles(catalog.search("sodium", "mod", "1.20.1")) == ["Sodium"]
+    assert catalog.search("", "shader")[1] == 1
+
+
+def test_bigram_candidates_cover_all_terms_within_edit_distance(tmp_path):
+    """二元组过滤不能漏掉编辑距离内的词"""
+    rng = random.Random(7)
+    words = {"".join(rng.choice("abcde") for _ in range(rng.randint(4, 9))) for _ in range(400)}
+    catalog = ml.ModCatalog(tmp_path / "catalog.sqlite")
+    conn = catalog.connect()
+    catalog.upsert(conn, [project(i, word) for i, word in enumerate(sorted(words))])
+    docs = {word: doc for doc, word in conn.execute("SELECT doc, title FROM projects")}
+    for query in rng.sample(sorted(words), 40):
+        query = query[:-1] + rng.choice(string.ascii_lowercase)
+        max_distance = 2 if len(query) >= 8 else 1
+        expected = {docs[word] for word in words if ml.within_edit_distance(query, word, max_distance)}
+        assert expected <= set(catalog.match_term(conn, query))
+    conn.close()
+
+
+def test_grams_are_backfilled_for_existing_catalogs(catalog):
+    conn = catalog.connect()
+    conn.execute("DELETE FROM grams")
+    conn.execute("DELETE FROM meta WHERE key = 'grams'")
+    conn.commit()
+    conn.close()
+    assert titles(catalog.search("storgae", "mod")) == ["Storage Drawers"]
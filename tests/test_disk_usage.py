@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+import pytest
+
+import minecraft_launcher as ml
+
+
+def write(root, relative, data=b"x", age=3600):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+
+def install_version(root, version_json):
+    version_dir = root / "versions" / version_json["id"]
+    version_dir.mkdir(parents=True, exist_ok=True)
+    (version_dir / f"{version_json['id']}.json").write_text(json.dumps(version_json))
+
+
+def library(name, path):
+    return {"name": name, "downloads": {"artifact": {"path": path, "url": "https://example.invalid/" + path, "size": 1}}}
+
+
+@pytest.fixture
+def minecraft_dir(tmp_path):
+    root = tmp_path / ".minecraft"
+    install_version(root, {"id": "1.20.1", "libraries": [library("org.used:used:1.0", "org/used/used/1.0/used-1.0.jar")]})
+    write(root, "libraries/org/used/used/1.0/used-1.0.jar")
+    write(root, "libraries/org/junk/junk/1.0/junk-1.0.jar")
+    return root
+
+
+def analyzer(root):
+    return ml.DiskUsageAnalyzer(root, root.parent / "disk.sqlite")
+
+
+def test_sweep_removes_only_unreferenced_files(minecraft_dir):
+    report = analyzer(minecraft_dir).analyze()
+    assert report["orphan_count"] == 1
+    assert analyzer(minecraft_dir).sweep() == (1, 1)
+    assert (minecraft_dir / "libraries/org/used/used/1.0/used-1.0.jar").exists()
+    assert not (minecraft_dir / "libraries/org/junk").exists()
+
+
+def test_recent_files_are_kept(minecraft_dir):
+    write(minecraft_dir, "libraries/org/new/new/1.0/new-1.0.jar", age=0)
+    analyzer(minecraft_dir).analyze()
+    assert analyzer(minecraft_dir).sweep() == (1, 1)
+    assert (minecraft_dir / "libraries/org/new/new/1.0/new-1.0.jar").exists()
+
+
+def test_recorded_processor_outputs_are_referenced(minecraft_dir):
+    srg = "net/minecraft/client/1.20.1-20230612/client-1.20.1-20230612-srg.jar"
+    install_version(minecraft_dir, {
+        "id": "1.20.1-forge-47.1.0", "inheritsFrom": "1.20.1",
+        "libraries": [library("net.minecraftforge:forge:1.20.1-47.1.0",
+                              "net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0.jar")],
+        "processorOutputs": [srg],
+    })
+    write(minecraft_dir, "libraries/net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0.jar")
+    write(minecraft_dir, "libraries/" + srg)
+    write(minecraft_dir, "libraries/net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0-client.jar")
+    analyzer(minecraft_dir).analyze()
+    assert analyzer(minecraft_dir).sweep() == (2, 2)
+    assert (minecraft_dir / "libraries" / srg).exists()
+    assert not (minecraft_dir / "libraries/net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0-client.jar").exists()
+
+
+def test_unrecorded_loader_versions_protect_processor_directories(minecraft_dir):
+    install_version(minecraft_dir, {
+        "id": "1.20.1-forge-47.1.0", "inheritsFrom": "1.20.1",
+        "libraries": [library("net.minecraftforge:forge:1.20.1-47.1.0",
+                              "net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0.jar")],
+    })
+    client = "libraries/net/minecraftforge/forge/1.20.1-47.1.0/forge-1.20.1-47.1.0-client.jar"
+    write(minecraft_dir, client)
+    analyzer(minecraft_dir).analyze()
+    assert analyzer(minecraft_dir).sweep() == (1, 1)
+    assert (minecraft_dir / client).exists()
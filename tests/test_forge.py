@@ -0,0 +1,56 @@
+import hashlib
+import json
+
+import pytest
+
+import minecraft_launcher as ml
+
+
+@pytest.fixture
+def installer(tmp_path):
+    return ml.ForgeInstaller("forge", cache_dir=tmp_path / "cache")
+
+
+def cache_output(installer, key, relative, data):
+    digest = hashlib.sha1(data).hexdigest()
+    cache_dir = installer.cache_dir / "processors"
+    obj = cache_dir / "objects" / digest[:2] / digest
+    obj.parent.mkdir(parents=True, exist_ok=True)
+    obj.write_bytes(data)
+    (cache_dir / f"{key}.json").write_text(json.dumps({"name": "p", "outputs": {relative: digest}}))
+    return obj, digest
+
+
+def test_restore_outputs_copies_cached_files(installer, tmp_path):
+    root = tmp_path / "mc"
+    _, digest = cache_output(installer, "k", "${root}/libraries/out.jar", b"output")
+    task = {"name": "p", "expected": {str(root / "libraries" / "out.jar"): digest}}
+    assert installer.restore_outputs("k", task, root)
+    assert (root / "libraries" / "out.jar").read_bytes() == b"output"
+
+
+def test_corrupted_cache_entry_is_rejected_and_dropped(installer, tmp_path):
+    root = tmp_path / "mc"
+    obj, digest = cache_output(installer, "k", "${root}/libraries/out.jar", b"output")
+    obj.write_bytes(b"outp")
+    task = {"name": "p", "expected": {str(root / "libraries" / "out.jar"): digest}}
+    assert not installer.restore_outputs("k", task, root)
+    assert not obj.exists()
+    assert not (installer.cache_dir / "processors" / "k.json").exists()
+
+
+def test_cached_output_must_match_declared_hash(installer, tmp_path):
+    root = tmp_path / "mc"
+    cache_output(installer, "k", "${root}/libraries/out.jar", b"stale")
+    task = {"name": "p", "expected": {str(root / "libraries" / "out.jar"): hashlib.sha1(b"fresh").hexdigest()}}
+    assert not installer.restore_outputs("k", task, root)
+
+
+def test_processor_waves_keep_dependent_processors_in_order(installer):
+    plan = [
+        {"name": "a", "inputs": ["in"], "outputs": ["x"]},
+        {"name": "b", "inputs": ["in"], "outputs": ["y"]},
+        {"name": "c", "inputs": ["x", "y"], "outputs": ["z"]},
+    ]
+    waves = installer.processor_waves(plan)
+    assert [[task["name"] for task in wave] for wave in waves] == [["a", "b"], ["c"]]
@@ -0,0 +1,53 @@
+import zipfile
+
+import minecraft_launcher as ml
+
+
+def test_exit_codes_are_matched_by_record_id(tmp_path):
+    history = ml.LaunchHistory(tmp_path / "history.csv")
+    # 同一秒内启动同一版本两次
+    first = history.add("1.20.1", "java", {"ready": 2.0})
+    second = history.add("1.20.1", "java", {"ready": 3.0})
+    history.set_exit_code(second, 0)
+    history.set_exit_code(first, 1)
+    records = history.records()
+    assert [(record["ready"], record["exit_code"]) for record in records] == [("2.0", "1"), ("3.0", "0")]
+
+
+def test_summary_uses_medians(tmp_path):
+    history = ml.LaunchHistory(tmp_path / "history.csv")
+    for ready in (1.0, 2.0, 9.0):
+        history.add("1.20.1", "java", {"ready": ready, "spawn": 0.1})
+    history.add("1.19.2", "java", {"ready": 4.0})
+    rows = {row["version"]: row for row in history.summary()}
+    assert rows["1.20.1"]["launches"] == 3
+    assert rows["1.20.1"]["ready"] == 2.0
+    assert rows["1.19.2"]["spawn"] is None
+
+
+def test_export_writes_one_row_per_launch(tmp_path):
+    history = ml.LaunchHistory(tmp_path / "history.csv")
+    history.set_exit_code(history.add("1.20.1", "java", {}), 0)
+    history.export(tmp_path / "export.csv")
+    lines = (tmp_path / "export.csv").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert lines[1].endswith(",0")
+
+
+def test_extract_natives_stays_inside_natives_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "os_name", lambda: "linux")
+    libraries_dir = tmp_path / "libraries"
+    jar_path = libraries_dir / "org/lwjgl/lwjgl/lwjgl/2.9.4/lwjgl-2.9.4-natives-linux.jar"
+    jar_path.parent.mkdir(parents=True)
+    with zipfile.ZipFile(jar_path, "w") as jar:
+        jar.writestr("liblwjgl.so", "ok")
+        jar.writestr("META-INF/MANIFEST.MF", "skip")
+        jar.writestr("../escape.so", "bad")
+        jar.writestr(str(tmp_path / "absolute.so"), "bad")
+    lib = {"name": "org.lwjgl.lwjgl:lwjgl:2.9.4", "natives": {"linux": "natives-linux"},
+           "extract": {"exclude": ["META-INF/"]}}
+    natives_dir = tmp_path / "natives"
+    assert ml.extract_natives({"libraries": [lib]}, libraries_dir, natives_dir) == 1
+    assert [path.name for path in natives_dir.iterdir()] == ["liblwjgl.so"]
+    assert not (tmp_path / "escape.so").exists()
+    assert not (tmp_path / "absolute.so").exists()
@@ -0,0 +1,60 @@
+import pytest
+
+import minecraft_launcher as ml
+
+
+@pytest.mark.parametrize("text, path", [
+    ("org.lwjgl:lwjgl:3.3.1", "org/lwjgl/lwjgl/3.3.1/lwjgl-3.3.1.jar"),
+    ("org.lwjgl:lwjgl:3.3.1:natives-linux", "org/lwjgl/lwjgl/3.3.1/lwjgl-3.3.1-natives-linux.jar"),
+    ("de.oceanlabs.mcp:mcp_config:1.20.1-20230612@zip", "de/oceanlabs/mcp/mcp_config/1.20.1-20230612/mcp_config-1.20.1-20230612.zip"),
+    ("net.minecraft:client:1.20.1:mappings@txt", "net/minecraft/client/1.20.1/client-1.20.1-mappings.txt"),
+])
+def test_parse_path_and_round_trip(text, path):
+    coordinate = ml.MavenCoordinate.parse(text)
+    assert coordinate.path() == path
+    assert str(coordinate) == text
+    assert str(ml.MavenCoordinate.from_path(path)) == text
+    assert ml.maven_path(text) == path
+
+
+def test_key_ignores_version():
+    assert ml.MavenCoordinate.parse("a.b:c:1.0:natives").key() == "a.b:c:natives"
+    assert ml.MavenCoordinate.parse("a.b:c:2.0").key() == "a.b:c"
+
+
+@pytest.mark.parametrize("text", ["a:b", "a:b:c:d:e", "a::1", ""])
+def test_invalid_coordinates(text):
+    with pytest.raises(ValueError):
+        ml.MavenCoordinate.parse(text)
+
+
+@pytest.mark.parametrize("path", ["a/b.jar", "org/x/y/1.0/z-1.0.jar", "org/x/y/1.0/y-1.0"])
+def test_unrecognized_paths(path):
+    with pytest.raises(ValueError):
+        ml.MavenCoordinate.from_path(path)
+
+
+def test_library_coordinate_falls_back_to_download_path():
+    lib = {"downloads": {"artifact": {"path": "com/google/guava/guava/31.0/guava-31.0.jar"}}}
+    assert str(ml.library_coordinate(lib)) == "com.google.guava:guava:31.0"
+    assert ml.library_coordinate({"name": "broken"}) is None
+
+
+def test_resolve_libraries_keeps_newest_in_first_position():
+    libraries = [{"name": "a:asm:9.3"}, {"name": "b:gson:2.8"}, {"name": "a:asm:9.5"}, {"name": "a:asm:9.1"}]
+    kept, superseded = ml.resolve_libraries(libraries)
+    assert [lib["name"] for lib in kept] == ["a:asm:9.5", "b:gson:2.8"]
+    assert sorted(lib["name"] for lib in superseded) == ["a:asm:9.1", "a:asm:9.3"]
+
+
+def test_resolve_libraries_keeps_classifiers_natives_and_unknown_entries():
+    libraries = [
+        {"name": "org.lwjgl:lwjgl:3.3.1"},
+        {"name": "org.lwjgl:lwjgl:3.3.1:natives-linux"},
+        {"name": "org.lwjgl.lwjgl:lwjgl:2.9.4", "natives": {"linux": "natives-linux"}},
+        {"name": "org.lwjgl.lwjgl:lwjgl:2.9.4"},
+        {"url": "no-name"},
+    ]
+    kept, superseded = ml.resolve_libraries(libraries)
+    assert kept == libraries
+    assert superseded == []
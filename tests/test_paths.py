@@ -0,0 +1,13 @@
+import pytest
+
+import minecraft_launcher as ml
+
+
+def test_safe_join_allows_nested_paths(tmp_path):
+    assert ml.safe_join(tmp_path, "mods/a.jar") == (tmp_path / "mods" / "a.jar").resolve()
+
+
+@pytest.mark.parametrize("name", ["../evil.jar", "mods/../../evil.jar", "/etc/passwd"])
+def test_safe_join_rejects_escaping_paths(tmp_path, name):
+    with pytest.raises(Exception, match="非法路径"):
+        ml.safe_join(tmp_path / "mods", name)
@@ -0,0 +1,103 @@
+import pytest
+import requests
+
+import minecraft_launcher as ml
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ml.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    ml.circuit_breakers.clear()
+    yield
+    ml.circuit_breakers.clear()
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_retryable_errors():
+    policy = ml.RetryPolicy()
+    assert policy.retryable(requests.ConnectionError())
+    assert policy.retryable(requests.Timeout())
+    assert policy.retryable(http_error(503))
+    assert policy.retryable(http_error(429))
+    assert not policy.retryable(http_error(404))
+    assert not policy.retryable(ValueError())
+
+
+def test_delay_is_capped_and_honours_retry_after():
+    policy = ml.RetryPolicy(base_delay=0.5, max_delay=4)
+    for attempt in range(10):
+        assert 0 <= policy.delay(attempt) <= 4
+    assert policy.delay(1, retry_after=3) >= 3
+    assert policy.delay(1, retry_after=60) <= 4
+
+
+def test_retry_budget_limits_retries(clock):
+    budget = ml.RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    budget.tokens = 0
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_breaker_opens_on_failure_rate_not_single_failures(clock):
+    breaker = ml.CircuitBreaker("https://example.invalid", window=10, min_requests=10, failure_rate=0.8)
+    for _ in range(9):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    # 10 次中 9 次失败, 超过 80%
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+
+def test_breaker_sends_one_probe_after_reset_timeout(clock):
+    breaker = ml.CircuitBreaker("https://example.invalid", min_requests=1, reset_timeout=15)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock[0] += 15
+    assert breaker.allow()
+    # 探测进行中时其他请求仍然被拒绝
+    assert not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = ml.CircuitBreaker("https://example.invalid", min_requests=1, reset_timeout=15)
+    breaker.record_failure()
+    clock[0] += 15
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert breaker.retry_after() == 15
+
+
+def test_route_url_uses_mirror_while_breaker_is_open(clock):
+    url = "https://libraries.minecraft.net/a/b/1/b-1.jar"
+    for _ in range(10):
+        ml.circuit_breaker(url).record_failure()
+    target, _ = ml.route_url(url)
+    assert target == "https://bmclapi2.bangbang93.com/maven/a/b/1/b-1.jar"
+
+
+def test_route_url_raises_when_no_alternate(clock):
+    url = "https://example.invalid/file"
+    for _ in range(10):
+        ml.circuit_breaker(url).record_failure()
+    with pytest.raises(ml.CircuitOpenError):
+        ml.route_url(url)
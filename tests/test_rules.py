@@ -0,0 +1,52 @@
+import pytest
+
+import minecraft_launcher as ml
+
+
+@pytest.fixture
+def linux_x64(monkeypatch):
+    monkeypatch.setattr(ml, "os_name", lambda: "linux")
+    monkeypatch.setattr(ml, "os_arch", lambda: "x86_64")
+    monkeypatch.setattr(ml, "os_version", lambda: "6.1.0-generic")
+
+
+@pytest.mark.parametrize("rule_os, expected", [
+    ({}, True),
+    ({"name": "linux"}, True),
+    ({"name": "osx"}, False),
+    ({"arch": "x86"}, False),
+    ({"arch": "x86_64"}, True),
+    ({"arch": "amd64"}, True),
+    ({"name": "linux", "arch": "x86"}, False),
+    ({"version": "^6\\."}, True),
+    ({"name": "linux", "version": "^5\\."}, False),
+    ({"version": "("}, False),
+])
+def test_os_rule_matches_only_present_keys(linux_x64, rule_os, expected):
+    assert ml.os_rule_matches(rule_os) is expected
+
+
+def test_no_rules_allow(linux_x64):
+    assert ml.rules_allow(None)
+    assert ml.rules_allow([])
+
+
+def test_last_matching_rule_wins(linux_x64):
+    rules = [{"action": "allow"}, {"action": "disallow", "os": {"name": "linux"}}]
+    assert not ml.rules_allow(rules)
+    rules = [{"action": "allow"}, {"action": "disallow", "os": {"name": "osx"}}]
+    assert ml.rules_allow(rules)
+
+
+def test_os_only_rule_without_name_checks_arch(linux_x64):
+    assert not ml.rules_allow([{"action": "allow", "os": {"arch": "x86"}}])
+    assert ml.rules_allow([{"action": "allow", "os": {"arch": "x86_64"}}])
+
+
+def test_feature_rules_do_not_apply(linux_x64):
+    assert not ml.rules_allow([{"action": "allow", "features": {"is_demo_user": True}}])
+
+
+def test_library_allowed_uses_library_rules(linux_x64):
+    assert ml.library_allowed({"name": "a:b:1"})
+    assert not ml.library_allowed({"name": "a:b:1", "rules": [{"action": "allow", "os": {"name": "windows"}}]})
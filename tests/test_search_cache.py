@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+import minecraft_launcher as ml
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ml.time, "time", lambda: now[0])
+    return now
+
+
+def test_make_key_is_stable_and_distinguishes_parameters(tmp_path):
+    cache = ml.SearchCache(tmp_path)
+    assert cache.make_key("mod", "sodium", 0) == cache.make_key("mod", "sodium", 0)
+    assert cache.make_key("mod", "sodium", 0) != cache.make_key("mod", "sodium", 20)
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = ml.SearchCache(tmp_path, ttl=60)
+    cache.put("k", {"hits": [1]})
+    clock[0] += 59
+    assert cache.get("k") == {"hits": [1]}
+    clock[0] += 2
+    assert cache.get("k") is None
+    # 过期的磁盘缓存同时被删除
+    assert not (tmp_path / "k.json").exists()
+
+
+def test_disk_entry_is_shared_between_instances(tmp_path, clock):
+    ml.SearchCache(tmp_path, ttl=60).put("k", [1, 2])
+    assert ml.SearchCache(tmp_path, ttl=60).get("k") == [1, 2]
+
+
+def test_memory_cache_evicts_least_recently_used(tmp_path):
+    cache = ml.SearchCache(tmp_path, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_identical_requests_are_coalesced(tmp_path):
+    cache = ml.SearchCache(tmp_path)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not cache.inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+    assert cache.inflight == {}
+
+
+def test_fetch_error_reaches_waiters_and_is_not_cached(tmp_path):
+    cache = ml.SearchCache(tmp_path)
+
+    def fetch():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_fetch("k", fetch)
+    assert cache.get("k") is None
+    assert cache.get_or_fetch("k", lambda: "ok") == "ok"
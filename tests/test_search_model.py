@@ -0,0 +1,42 @@
+import pytest
+
+import minecraft_launcher as ml
+
+
+def result(project_id, name, source, slug, downloads=1):
+    return {"id": project_id, "name": name, "description": "", "downloads": downloads, "versions": [],
+            "url": "", "icon_url": "", "source": source, "slug": slug}
+
+
+@pytest.fixture
+def model():
+    return ml.SearchResultModel(["名称", "版本", "下载量"])
+
+
+def test_same_project_from_two_providers_is_merged(model):
+    model.append([result("m1", "Backpacks", "Modrinth", "backpacks", 10)])
+    model.append([result("c1", "Backpacks!", "CurseForge", "backpacks", 30)])
+    assert model.rowCount() == 1
+    assert model.providers[0] == ("Modrinth", "CurseForge")
+    assert model.downloads[0] == 30
+    # 保留可直接下载的Modrinth条目
+    assert model.row_data(0)["id"] == "m1"
+
+
+def test_same_name_projects_from_one_provider_stay_separate(model):
+    model.append([result("m1", "Backpacks", "Modrinth", "backpacks"),
+                  result("m2", "Backpacks", "Modrinth", "backpacks-mod")])
+    model.append([result("c1", "Backpacks", "CurseForge", "other-backpacks")])
+    assert model.rowCount() == 3
+
+
+def test_repeated_result_updates_existing_row(model):
+    model.append([result("m1", "Sodium", "Modrinth", "sodium", 5)])
+    model.append([result("m1", "Sodium", "Modrinth", "sodium", 8)])
+    assert model.rowCount() == 1
+    assert model.downloads[0] == 8
+
+
+def test_local_provider_rejects_unset_directory():
+    with pytest.raises(FileNotFoundError):
+        ml.LocalDirectoryProvider("").fetch("sodium", "mod", None, 0, 20)
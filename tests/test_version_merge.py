@@ -0,0 +1,74 @@
+import minecraft_launcher as ml
+
+
+def lib(name, os_name=None, exclude=None):
+    entry = {"name": name}
+    if os_name:
+        entry["rules"] = [{"action": "allow", "os": {"name": os_name}}]
+    if exclude:
+        entry["rules"] = [{"action": "allow"}, {"action": "disallow", "os": {"name": exclude}}]
+    return entry
+
+
+def parent_json():
+    return {
+        "id": "1.16.5",
+        "mainClass": "net.minecraft.client.main.Main",
+        "libraries": [
+            lib("org.lwjgl:lwjgl:3.2.2", exclude="osx"),
+            lib("org.lwjgl:lwjgl:3.2.1", os_name="osx"),
+            lib("com.google.guava:guava:21.0"),
+        ],
+        "arguments": {"game": ["--username", "${auth_player_name}"], "jvm": ["-cp", "${classpath}"]},
+        "assetIndex": {"id": "1.16"},
+    }
+
+
+def child_json():
+    return {
+        "id": "fabric-loader-0.14.0-1.16.5",
+        "inheritsFrom": "1.16.5",
+        "mainClass": "net.fabricmc.loader.impl.launch.knot.KnotClient",
+        "libraries": [lib("net.fabricmc:fabric-loader:0.14.0"), lib("com.google.guava:guava:31.0")],
+        "arguments": {"game": [], "jvm": ["-DFabricMcEmu= net.minecraft.client.main.Main "]},
+    }
+
+
+def names(merged):
+    return [entry["name"] for entry in merged["libraries"]]
+
+
+def test_parent_entries_with_the_same_key_are_all_kept():
+    merged = ml.merge_version_json(parent_json(), child_json())
+    assert names(merged) == ["net.fabricmc:fabric-loader:0.14.0", "com.google.guava:guava:31.0",
+                             "org.lwjgl:lwjgl:3.2.2", "org.lwjgl:lwjgl:3.2.1"]
+
+
+def test_each_system_keeps_its_lwjgl(monkeypatch):
+    merged = ml.merge_version_json(parent_json(), child_json())
+    for system, version in (("osx", "3.2.1"), ("linux", "3.2.2"), ("windows", "3.2.2")):
+        monkeypatch.setattr(ml, "os_name", lambda: system)
+        allowed = [entry["name"] for entry in merged["libraries"] if ml.library_allowed(entry)]
+        assert f"org.lwjgl:lwjgl:{version}" in allowed
+        assert len([name for name in allowed if name.startswith("org.lwjgl:lwjgl:")]) == 1
+
+
+def test_child_settings_and_arguments():
+    merged = ml.merge_version_json(parent_json(), child_json())
+    assert merged["id"] == "fabric-loader-0.14.0-1.16.5"
+    assert merged["mainClass"] == "net.fabricmc.loader.impl.launch.knot.KnotClient"
+    assert merged["assetIndex"] == {"id": "1.16"}
+    assert merged["arguments"]["jvm"] == ["-cp", "${classpath}", "-DFabricMcEmu= net.minecraft.client.main.Main "]
+    assert merged["jar"] == "1.16.5"
+    assert "inheritsFrom" not in merged
+
+
+def test_resolve_version_follows_inherits_from(tmp_path):
+    import json
+    for version in (parent_json(), child_json()):
+        version_dir = tmp_path / "versions" / version["id"]
+        version_dir.mkdir(parents=True)
+        (version_dir / f"{version['id']}.json").write_text(json.dumps(version))
+    merged = ml.resolve_version(tmp_path, "fabric-loader-0.14.0-1.16.5", cache_dir=tmp_path / "cache")
+    assert merged["jar"] == "1.16.5"
+    assert "org.lwjgl:lwjgl:3.2.1" in names(merged)